@@ -0,0 +1,245 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import typing as t
+import urllib.parse
+
+from oauth2link import metrics, utils
+from oauth2link.context import reset_state
+from oauth2link.exceptions import AdmissionRejected, StateError, UpstreamUnavailable
+
+
+class Request:
+    """
+    精简的ASGI请求对象, 接口与Starlette保持一致
+    """
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.path = scope.get("path", "")
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        self.query_params = dict(urllib.parse.parse_qsl(query_string))
+        self.headers = {k.decode("latin-1"): v.decode("latin-1")
+                        for k, v in scope.get("headers", [])}
+        self.cookies = {}
+        for item in self.headers.get("cookie", "").split(";"):
+            name, sep, value = item.strip().partition("=")
+            if sep:
+                self.cookies.setdefault(name, value)
+
+
+async def send_response(send, body: t.Union[str, bytes], status: int = 200,
+                        headers: t.Optional[t.List[t.Tuple[bytes, bytes]]] = None) -> None:
+    """
+    发送响应
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    headers = list(headers or [])
+    if not any(k.lower() == b"content-type" for k, _ in headers):
+        headers.append((b"content-type", b"text/html; charset=utf-8"))
+    headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ASGICallBackHandler:
+    """
+    ASGI回调处理器, 可直接作为Starlette的endpoint使用
+    """
+
+    def __init__(self, oauth_client) -> None:
+        self.oauth_client = oauth_client
+
+    async def do_call(self, request: Request):
+        """
+        第三方授权回调, 返回 str/bytes、(body, status) 或 ASGI响应对象
+        """
+        with self.phase("token"):
+            await self.oauth_client.async_get_access_token(request)
+        with self.phase("profile"):
+            await self.oauth_client.async_get_user_info()
+        with self.phase("save"):
+            await self.oauth_client.async_save_model()
+        return "login successful"
+
+    def phase(self, name: str):
+        """
+        记录回调中某个阶段的耗时
+        """
+        return metrics.timer("oauth2link_phase_seconds", self.oauth_client.Type, phase=name)
+
+    async def aclose(self) -> None:
+        await self.oauth_client.async_close()
+
+    async def __call__(self, scope, receive, send) -> None:
+        reset_state()
+        try:
+            with self.oauth_client.callback_deadline():
+                async with self.oauth_client.async_admit():
+                    with self.phase("callback"):
+                        result = await self.do_call(Request(scope))
+        except StateError:
+            result = ("invalid state", 400)
+        except UpstreamUnavailable:
+            result = ("service unavailable", 503)
+        except AdmissionRejected as e:
+            result = ("service unavailable", 503, [(b"retry-after", str(e.retry_after).encode())])
+        await respond(result, scope, receive, send)
+
+
+async def respond(result, scope, receive, send) -> None:
+    """
+    将处理器返回值转换为ASGI响应
+    """
+    if callable(result):
+        await result(scope, receive, send)
+    elif isinstance(result, tuple):
+        await send_response(send, *result)
+    else:
+        await send_response(send, result)
+
+
+class LoginHandler:
+    """
+    内置登录路由, 直接重定向至第三方授权页面
+    """
+
+    def __init__(self, oauth_client) -> None:
+        self.oauth_client = oauth_client
+
+    async def __call__(self, scope, receive, send) -> None:
+        request = Request(scope)
+        return_url = utils.safe_return_url(request.query_params.get("next"))
+        browser_id = self.oauth_client.get_browser_id(request)
+        location = self.oauth_client.redirect_url(return_url, browser_id).encode("latin-1")
+        headers = [(b"location", location)]
+        if browser_id:
+            # 回调时校验state由同一浏览器发起
+            cookie = utils.dump_cookie(**self.oauth_client.state_cookie(browser_id))
+            headers.append((b"set-cookie", cookie.encode("latin-1")))
+        await send_response(send, b"", 302, headers)
+
+    async def aclose(self) -> None:
+        await self.oauth_client.async_close()
+
+
+class MetricsHandler:
+    """
+    Prometheus指标路由
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send_response(send, metrics.registry.render(), 200,
+                            [(b"content-type", metrics.CONTENT_TYPE.encode())])
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OAuth2App:
+    """
+    按路径分发回调请求的ASGI应用, 可独立运行, 也可以挂载到Starlette中
+
+        app = OAuth2App({"LINKS_WEIBO_CLIENT_ID": ...}, WeiBoOauth2(), GitHubOauth2())
+    """
+
+    def __init__(self, config: t.Mapping, *oauth_clients, handler=ASGICallBackHandler):
+        self.routes = {}
+        for oauth_client in oauth_clients:
+            oauth_client.configure(config)
+            path = urllib.parse.urlparse(oauth_client.get_callback_url()).path
+            self.routes[path] = handler(oauth_client)
+            if oauth_client.login_uri:
+                self.routes[oauth_client.login_uri] = LoginHandler(oauth_client)
+            if oauth_client.metrics_uri:
+                self.routes[oauth_client.metrics_uri] = MetricsHandler()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        endpoint = self.routes.get(scope.get("path"))
+        if scope["type"] != "http" or endpoint is None:
+            return await send_response(send, "Not Found", 404)
+        await endpoint(scope, receive, send)
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for endpoint in self.routes.values():
+                    await endpoint.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+class TenantApp:
+    """
+    多租户ASGI应用, 按路径 <prefix>/<tenant>/<platform>/callback|login 分发
+
+        app = TenantApp(TenantRegistry(config, redirect_uri=...))
+    """
+
+    def __init__(self, registry, handler=ASGICallBackHandler):
+        self.registry = registry
+        self.handler = handler
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        route = self.registry.parse_path(scope.get("path", "")) if scope["type"] == "http" else None
+        oauth_client = self.registry.get(route[0], route[1]) if route else None
+        if oauth_client is None:
+            return await send_response(send, "Not Found", 404)
+        if route[2] == "login":
+            return await LoginHandler(oauth_client)(scope, receive, send)
+        await self.handler(oauth_client)(scope, receive, send)
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.registry.aclose()
+                self.registry.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def starlette_routes(*oauth_clients, handler=ASGICallBackHandler) -> list:
+    """
+    生成Starlette路由列表, 平台需已调用configure
+    """
+    from starlette.routing import Route
+
+    routes = []
+    for c in oauth_clients:
+        routes.append(Route(urllib.parse.urlparse(c.get_callback_url()).path, endpoint=handler(c)))
+        if c.login_uri:
+            routes.append(Route(c.login_uri, endpoint=LoginHandler(c)))
+        if c.metrics_uri and all(r.path != c.metrics_uri for r in routes):
+            routes.append(Route(c.metrics_uri, endpoint=MetricsHandler()))
+    return routes
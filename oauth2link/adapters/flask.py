@@ -0,0 +1,117 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from flask import Flask, abort, redirect, request
+from oauth2link import metrics, utils
+from oauth2link.callback import BaseCallBackHandler
+from oauth2link.context import reset_state
+
+
+def _reset_state() -> None:
+    reset_state()
+
+
+def register_state(app: Flask) -> None:
+    """
+    每个请求开始时清空授权信息, 避免线程复用时读到上一个请求的数据
+    """
+    if _reset_state not in app.before_request_funcs.get(None, []):
+        app.before_request(_reset_state)
+
+
+def register_callback(oauth_client, app: Flask) -> None:
+    """
+    在Flask应用中注册回调路由
+    """
+    handler = oauth_client.CALLBACK_HANDLER or BaseCallBackHandler
+    callback_url = oauth_client.get_callback_url()
+    app.add_url_rule(callback_url,
+                     view_func=handler.as_view(name="Oauth2_%s" % oauth_client.name,
+                                               oauth_client=oauth_client))
+
+
+def login_redirect(oauth_client):
+    """
+    重定向至第三方授权页面, 开启state校验时写入浏览器标识cookie
+    """
+    browser_id = oauth_client.get_browser_id(request)
+    resp = redirect(oauth_client.redirect_url(utils.safe_return_url(request.args.get("next")), browser_id))
+    if browser_id:
+        resp.set_cookie(**oauth_client.state_cookie(browser_id))
+    return resp
+
+
+def register_login(oauth_client, app: Flask) -> None:
+    """
+    注册内置登录路由, 直接重定向至第三方授权页面
+    """
+    app.add_url_rule(oauth_client.login_uri,
+                     endpoint="Oauth2_login_%s" % oauth_client.name,
+                     view_func=lambda: login_redirect(oauth_client))
+
+
+def register_metrics(oauth_client, app: Flask) -> None:
+    """
+    注册Prometheus指标路由, 多个平台共用
+    """
+    if "Oauth2_metrics" in app.view_functions:
+        return
+    app.add_url_rule(oauth_client.metrics_uri, endpoint="Oauth2_metrics",
+                     view_func=lambda: (metrics.registry.render(), 200,
+                                        {"Content-Type": metrics.CONTENT_TYPE}))
+
+
+def register_tenant_routes(registry, app: Flask) -> None:
+    """
+    注册多租户的回调及登录路由, 按路径中的租户及平台分发
+    """
+
+    def get_client(tenant: str, platform: str):
+        oauth_client = registry.get(tenant, platform)
+        if oauth_client is None:
+            abort(404)
+        return oauth_client
+
+    def callback(tenant: str, platform: str):
+        oauth_client = get_client(tenant, platform)
+        handler = oauth_client.CALLBACK_HANDLER or BaseCallBackHandler
+        return handler(oauth_client=oauth_client).dispatch_request()
+
+    def login(tenant: str, platform: str):
+        return login_redirect(get_client(tenant, platform))
+
+    app.add_url_rule("%s/<tenant>/<platform>/callback" % registry.prefix,
+                     endpoint="Oauth2_tenant_callback", view_func=callback)
+    app.add_url_rule("%s/<tenant>/<platform>/login" % registry.prefix,
+                     endpoint="Oauth2_tenant_login", view_func=login)
+
+
+def register_cli(oauth_client, app: Flask) -> None:
+    """
+    记录已初始化的平台, 并注册 `flask links` 管理命令
+    """
+    from oauth2link.cli import links_cli
+
+    app.extensions.setdefault("oauth2link", {})[oauth_client.Type] = oauth_client
+    if links_cli.name not in app.cli.commands:
+        app.cli.add_command(links_cli)
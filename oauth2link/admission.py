@@ -0,0 +1,183 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import collections
+import contextlib
+import threading
+import typing as t
+
+from oauth2link import deadline, metrics
+from oauth2link.exceptions import AdmissionRejected
+
+
+class _Waiter:
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake: t.Callable[[], None]):
+        self.wake = wake
+        self.granted = False    # 已由释放的调用直接转交并发名额
+
+
+def _wake_future(future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    回调并发控制: 最多limit个回调同时处理, 超出的回调最多queue_size个按先后顺序排队,
+    排队超过queue_timeout(及回调剩余时间预算)或队列已满时抛出AdmissionRejected;
+    同步及异步回调共用同一组名额
+
+        with controller.admit():
+            ...
+    """
+
+    def __init__(self, name: str = "", limit: int = 32, queue_size: t.Optional[int] = None,
+                 queue_timeout: float = 1.0, retry_after: int = 1):
+        self.name = name
+        self.limit = limit
+        self.queue_size = limit if queue_size is None else queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0     # 正在处理的回调数
+        self.rejected = 0   # 被拒绝的回调数
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _wait_timeout(self) -> float:
+        left = deadline.remaining()
+        return self.queue_timeout if left is None else max(0.0, min(self.queue_timeout, left))
+
+    def _enter(self, wake: t.Callable[[], None], timeout: float) -> t.Optional[_Waiter]:
+        """
+        有空闲名额时直接占用并返回None, 需要排队时返回排队对象, 无法排队时抛出AdmissionRejected
+        """
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return None
+            if len(self._waiters) < self.queue_size and timeout > 0:
+                waiter = _Waiter(wake)
+                self._waiters.append(waiter)
+                return waiter
+        self._reject()
+
+    def _leave(self, waiter: _Waiter) -> None:
+        """
+        排队结束, 未获得名额时退出队列并抛出AdmissionRejected
+        """
+        with self._lock:
+            if waiter.granted:
+                return
+            self._waiters.remove(waiter)
+        self._reject()
+
+    def _reject(self) -> t.NoReturn:
+        with self._lock:
+            self.rejected += 1
+        metrics.inc("oauth2link_admission_rejected_total", self.name)
+        raise AdmissionRejected("回调并发已满", self.retry_after)
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                # 名额直接转交给最早排队的回调, active不变
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self.active -= 1
+
+    def acquire(self) -> None:
+        """
+        占用一个名额, 失败时抛出AdmissionRejected
+        """
+        timeout = self._wait_timeout()
+        event = threading.Event()
+        waiter = self._enter(event.set, timeout)
+        if waiter is not None:
+            event.wait(timeout)
+            self._leave(waiter)
+
+    async def async_acquire(self) -> None:
+        """
+        占用一个名额(异步), 失败时抛出AdmissionRejected
+        """
+        import asyncio
+
+        timeout = self._wait_timeout()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = self._enter(lambda: loop.call_soon_threadsafe(_wake_future, future), timeout)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # 客户端断开等原因取消时, 已转交的名额需要归还
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release()
+            raise
+        self._leave(waiter)
+
+    @contextlib.contextmanager
+    def admit(self) -> t.Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def async_admit(self) -> t.AsyncIterator[None]:
+        await self.async_acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission(platform: str, **options: t.Any) -> AdmissionController:
+    """
+    获取平台共用的回调并发控制器
+    """
+    with _controllers_lock:
+        controller = _controllers.get(platform)
+        if controller is None:
+            controller = _controllers[platform] = AdmissionController(platform, **options)
+        return controller
@@ -0,0 +1,80 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import json
+import time
+
+import click
+
+from oauth2link.bench.runner import run_benchmark
+from oauth2link.bench.stub import StubProvider
+
+
+def parse_options(options) -> dict:
+    """
+    解析 KEY=VALUE 形式的额外配置, 值按JSON解析, 失败时作为字符串
+    """
+    config = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        try:
+            config[key] = json.loads(value)
+        except ValueError:
+            config[key] = value
+    return config
+
+
+@click.command(help="使用本地模拟平台压测 登录跳转 -> 授权回调 -> 保存账号 流程")
+@click.option("--platform", type=click.Choice(["github", "weibo"]), default="github", show_default=True)
+@click.option("-n", "--requests", "total", default=1000, show_default=True, help="登录次数")
+@click.option("-c", "--concurrency", default=16, show_default=True, help="并发数")
+@click.option("--users", type=int, default=None, help="模拟用户数, 小于登录次数时重复登录走更新路径")
+@click.option("--latency", default=0.0, show_default=True, help="模拟平台每个请求的延迟(秒)")
+@click.option("--jitter", default=0.0, show_default=True, help="模拟平台额外的随机延迟上限(秒)")
+@click.option("--error-rate", default=0.0, show_default=True, help="模拟平台返回502的比例")
+@click.option("--rate-limit", type=int, default=None, help="模拟平台每个窗口的请求额度")
+@click.option("--rate-window", default=60.0, show_default=True, help="模拟平台限流窗口(秒)")
+@click.option("--database-uri", default=None, help="数据库地址, 默认为临时sqlite文件")
+@click.option("-o", "--option", "options", multiple=True, help="额外配置, 如 -o LINKS_UPSERT=true")
+@click.option("--serve", is_flag=True, help="只启动模拟平台, 不压测")
+@click.option("--port", default=0, help="模拟平台端口, 默认随机")
+@click.option("--json", "as_json", is_flag=True, help="以JSON格式输出结果")
+def main(platform, total, concurrency, users, latency, jitter, error_rate, rate_limit, rate_window,
+         database_uri, options, serve, port, as_json):
+    stub = StubProvider(port=port, latency=latency, jitter=jitter, error_rate=error_rate,
+                        rate_limit=rate_limit, rate_window=rate_window)
+    with stub:
+        if serve:
+            click.echo("模拟平台已启动: %s (Ctrl+C退出)" % stub.url)
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                return
+        report = run_benchmark(platform, total, concurrency, users=users, database_uri=database_uri,
+                               config=parse_options(options), stub=stub)
+    click.echo(json.dumps(report.to_dict()) if as_json else str(report))
+
+
+if __name__ == "__main__":
+    main()
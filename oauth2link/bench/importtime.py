@@ -0,0 +1,98 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import statistics
+import subprocess
+import sys
+import typing as t
+
+import click
+
+DEFAULT_STATEMENT = "from oauth2link.platform import GitHubOauth2, WeiBoOauth2"
+# 导入平台类时不应加载的重量级依赖, 应在首次使用时导入
+HEAVY_MODULES = ("requests", "sqlalchemy", "flask", "httpx", "asyncio")
+
+
+def measure(statement: str = DEFAULT_STATEMENT) -> t.Tuple[float, t.Dict[str, float]]:
+    """
+    在子进程中以 -X importtime 执行语句, 返回 (总耗时ms, 各顶层模块的累计耗时ms), 不含解释器启动时导入的模块
+    """
+    def run(code: str) -> t.List[t.Tuple[str, int, float]]:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                capture_output=True, text=True, check=True)
+        entries = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if not cumulative.strip().isdigit():
+                continue    # 表头
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((name.strip(), depth, int(cumulative) / 1000))
+        return entries
+
+    startup = {name for name, _, _ in run("pass")}
+    modules = {name: cumulative for name, depth, cumulative in run(statement)
+               if depth == 0 and name not in startup}
+    return sum(modules.values()), modules
+
+
+def imported_modules(statement: str = DEFAULT_STATEMENT) -> t.List[str]:
+    """
+    执行语句后已加载的重量级依赖
+    """
+    code = "import sys; %s; print(','.join(m for m in %r if m in sys.modules))" % (
+        statement, HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+@click.command(help="检查导入耗时及重量级依赖是否被提前导入, 超出预算时返回非0")
+@click.option("-s", "--statement", default=DEFAULT_STATEMENT, show_default=True, help="待检查的导入语句")
+@click.option("--budget-ms", default=50.0, show_default=True, help="导入耗时预算(毫秒, 取多次运行的中位数)")
+@click.option("--runs", default=5, show_default=True, help="运行次数")
+@click.option("--top", default=10, show_default=True, help="输出耗时最高的模块数")
+def main(statement: str, budget_ms: float, runs: int, top: int):
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        total, modules = measure(statement)
+        totals.append(total)
+    median = statistics.median(totals)
+    click.echo("%s: 中位数 %.1fms (预算 %.1fms)" % (statement, median, budget_ms))
+    for name, cumulative in sorted(modules.items(), key=lambda i: -i[1])[:top]:
+        click.echo("  %8.1fms  %s" % (cumulative, name))
+
+    failed = False
+    heavy = imported_modules(statement)
+    if heavy:
+        click.echo("提前导入了重量级依赖: %s" % ", ".join(heavy), err=True)
+        failed = True
+    if median > budget_ms:
+        click.echo("导入耗时超出预算", err=True)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import collections
+import os
+import tempfile
+import threading
+import time
+import typing as t
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from oauth2link.bench.stub import StubProvider
+from oauth2link.platform import get_platform
+from oauth2link.types import PlatformType
+
+
+class BenchReport:
+    """
+    压测结果
+    """
+
+    def __init__(self, platform: str, concurrency: int):
+        self.platform = platform
+        self.concurrency = concurrency
+        self.latencies = []     # 每次完整登录流程的耗时(秒)
+        self.statuses = collections.Counter()
+        self.elapsed = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def errors(self) -> int:
+        return sum(n for status, n in self.statuses.items() if status != 200)
+
+    @property
+    def rps(self) -> float:
+        """
+        每秒完成的登录数
+        """
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: float) -> float:
+        """
+        耗时分位数(秒), p取值0~100
+        """
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, max(0, int(round(p / 100 * len(latencies))) - 1))
+        return latencies[index]
+
+    def to_dict(self) -> dict:
+        return {
+            "platform": self.platform,
+            "concurrency": self.concurrency,
+            "total": self.total,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "elapsed": round(self.elapsed, 3),
+            "rps": round(self.rps, 1),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+        }
+
+    def __str__(self) -> str:
+        return "%s: 并发%d, 共%d次, 失败%d次, 耗时%.2fs, %.1f次/秒, p50 %.2fms, p99 %.2fms" % (
+            self.platform, self.concurrency, self.total, self.errors, self.elapsed, self.rps,
+            self.percentile(50) * 1000, self.percentile(99) * 1000)
+
+
+def build_app(platform: str, stub: StubProvider, database_uri: t.Optional[str] = None,
+              config: t.Optional[t.Mapping] = None):
+    """
+    创建压测用的Flask应用, 平台接口指向本地模拟服务; 返回 (app, 平台实例)
+    """
+    from flask import Flask
+
+    if database_uri is None:
+        database_uri = "sqlite:///%s" % os.path.join(tempfile.mkdtemp(prefix="oauth2link-bench-"),
+                                                     "bench.db")
+    prefix = "LINKS_%s_" % platform.upper()
+    app = Flask("oauth2link_bench")
+    app.config.update({
+        "SQLALCHEMY_DATABASE_URI": database_uri,
+        prefix + "CLIENT_ID": "bench-client",
+        prefix + "CLIENT_SECRET": "bench-secret",
+        prefix + "REDIRECT_URI": "http://localhost/bench/%s/callback" % platform,
+        prefix + "LOGIN_URI": "/bench/%s/login" % platform,
+    })
+    app.config.update(config or {})
+
+    oauth_client = get_platform(platform)()
+    # 先指向模拟服务再初始化, 预热连接及预编译地址都使用本地地址
+    oauth_client.API = stub.api(platform)
+    oauth_client.init_app(app)
+    return app, oauth_client
+
+
+def login_once(test_client, oauth_client, code: str) -> int:
+    """
+    完成一次 登录跳转 -> 授权回调 -> 保存账号 流程, 返回回调的状态码
+    """
+    resp = test_client.get(oauth_client.login_uri)
+    location = urllib.parse.urlparse(resp.headers["Location"])
+    state = dict(urllib.parse.parse_qsl(location.query)).get("state")
+    query = {"code": code}
+    if state:
+        query["state"] = state
+    resp = test_client.get("%s?%s" % (oauth_client.get_callback_url(),
+                                      urllib.parse.urlencode(query)))
+    return resp.status_code
+
+
+def run_benchmark(platform: str = PlatformType.GitHub, total: int = 1000, concurrency: int = 16,
+                  users: t.Optional[int] = None, warmup: int = 10,
+                  database_uri: t.Optional[str] = None, config: t.Optional[t.Mapping] = None,
+                  stub: t.Optional[StubProvider] = None) -> BenchReport:
+    """
+    并发压测完整登录流程; users为模拟的用户数, 小于total时重复登录走更新路径, 默认每次都是新用户
+
+    账号表绑定在类级别, 同一进程中只能压测一次
+    """
+    own_stub = stub is None
+    if own_stub:
+        stub = StubProvider()
+        stub.start()
+    try:
+        app, oauth_client = build_app(platform, stub, database_uri, config)
+        local = threading.local()
+        report = BenchReport(platform, concurrency)
+
+        def login(i: int):
+            test_client = getattr(local, "client", None)
+            if test_client is None:
+                test_client = local.client = app.test_client()
+            code = "bench-%d" % (i % users if users else i)
+            started = time.perf_counter()
+            try:
+                status = login_once(test_client, oauth_client, code)
+            except Exception:
+                status = "error"
+            return status, time.perf_counter() - started
+
+        for i in range(warmup):
+            login(-1 - i)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="oauth2link-bench") as pool:
+            for status, latency in pool.map(login, range(total)):
+                report.latencies.append(latency)
+                report.statuses[status] += 1
+        report.elapsed = time.perf_counter() - started
+        oauth_client.flush_writer()
+        return report
+    finally:
+        if own_stub:
+            stub.stop()
@@ -0,0 +1,213 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+import typing as t
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from oauth2link.types import PlatformType
+
+
+class StubProvider:
+    """
+    本地模拟平台, 实现GitHub及微博的token及用户信息接口, 可配置延迟、错误率及限流响应头
+
+        with StubProvider(latency=0.02, error_rate=0.01) as stub:
+            stub.attach(links)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit: t.Optional[int] = None,
+                 rate_window: float = 60.0):
+        self.host = host
+        self.port = port
+        self.latency = latency          # 每个请求的固定延迟(秒)
+        self.jitter = jitter            # 额外的随机延迟上限(秒)
+        self.error_rate = error_rate    # 返回502的比例
+        self.rate_limit = rate_limit    # 每个窗口的请求额度, None时不返回限流响应头
+        self.rate_window = rate_window  # 限流窗口(秒)
+        self.revoked = set()            # 已失效的refresh_token, 刷新时返回invalid_grant
+        self.requests = 0
+        self._window_start = time.time()
+        self._window_used = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return "http://%s:%d" % (self.host, self._server.server_port)
+
+    def start(self) -> str:
+        """
+        在后台线程中启动, 返回服务地址
+        """
+        handler = type("StubHandler", (_StubHandler,), {"provider": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="oauth2link-stub", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubProvider":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def api(self, platform: str) -> type:
+        """
+        生成指向本地服务的接口地址类
+        """
+        if platform == PlatformType.GitHub:
+            return type("GitHubStubApi", (), {
+                "BASE_API": self.url,
+                "OAUTH_API": self.url + "/login/oauth",
+                "GET_USER_INFO_API": self.url + "/user",
+            })
+        return type("WeiBoStubApi", (), {
+            "BASE_API": self.url,
+            "OAUTH_API": self.url + "/oauth2",
+            "GET_USER_INFO_API": self.url + "/2/users/show.json",
+        })
+
+    def attach(self, oauth_client) -> None:
+        """
+        将平台的接口地址指向本地服务, 只影响当前实例
+        """
+        oauth_client.API = self.api(oauth_client.Type)
+        oauth_client.compile_urls()
+
+    def rate_headers(self) -> t.Tuple[bool, t.List[t.Tuple[str, str]]]:
+        """
+        消耗一次额度, 返回 (是否超限, 限流响应头)
+        """
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return False, []
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._window_used = 0
+            self._window_used += 1
+            remaining = max(0, self.rate_limit - self._window_used)
+            reset = self._window_start + self.rate_window
+            limited = self._window_used > self.rate_limit
+        headers = [("X-RateLimit-Limit", str(self.rate_limit)),
+                   ("X-RateLimit-Remaining", str(remaining)),
+                   ("X-RateLimit-Reset", str(int(reset)))]
+        if limited:
+            headers.append(("Retry-After", str(max(1, int(reset - now)))))
+        return limited, headers
+
+
+def _user_id(token: str) -> int:
+    return int(hashlib.sha1(token.encode()).hexdigest()[:12], 16)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024    # 响应头及响应体合并发送, 请求处理完后统一flush
+    provider: StubProvider = None
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _reply(self, status: int, data: dict, headers: t.List[t.Tuple[str, str]]) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, params: dict) -> None:
+        provider = self.provider
+        delay = provider.latency + (random.random() * provider.jitter if provider.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        limited, headers = provider.rate_headers()
+        if limited:
+            return self._reply(429, {"message": "API rate limit exceeded"}, headers)
+        if provider.error_rate and random.random() < provider.error_rate:
+            return self._reply(502, {"message": "Bad Gateway"}, headers)
+
+        path = urllib.parse.urlparse(self.path).path
+        if path in ("/login/oauth/access_token", "/oauth2/access_token"):
+            code = params.get("code") or params.get("refresh_token") or ""
+            if not code:
+                return self._reply(400, {"error": "bad_verification_code"}, headers)
+            if params.get("refresh_token") in provider.revoked:
+                # GitHub以200返回错误, 微博以400返回
+                if path.startswith("/login"):
+                    return self._reply(200, {"error": "bad_refresh_token"}, headers)
+                return self._reply(400, {"error": "invalid_grant"}, headers)
+            data = {"access_token": "tok-" + code, "expires_in": 28800}
+            if path.startswith("/login"):
+                data["refresh_token"] = "ref-" + code
+            else:
+                data["uid"] = str(_user_id(code))
+            return self._reply(200, data, headers)
+        if path == "/user":
+            token = self.headers.get("Authorization", "").rpartition(" ")[2]
+            if not token:
+                return self._reply(401, {"message": "Requires authentication"}, headers)
+            uid = _user_id(token)
+            return self._reply(200, {"id": uid, "login": "user%d" % uid,
+                                     "avatar_url": "https://avatars.example.com/u/%d" % uid}, headers)
+        if path == "/2/users/show.json":
+            uid = params.get("uid", "")
+            return self._reply(200, {"id": uid, "name": "user%s" % uid,
+                                     "avatar_hd": "https://avatars.example.com/w/%s" % uid}, headers)
+        self._reply(404, {"message": "Not Found"}, headers)
+
+    def do_GET(self) -> None:
+        self._handle(dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query)))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+        params.update(urllib.parse.parse_qsl(self.rfile.read(length).decode("latin-1")))
+        self._handle(params)
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
@@ -0,0 +1,125 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import collections
+import threading
+import time
+import typing as t
+
+from oauth2link.exceptions import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    熔断器: 最近window次调用中失败率或慢调用率超过阈值时熔断, reset_timeout秒后进入半开状态,
+    放行少量探测请求, 探测成功则恢复, 失败则继续熔断
+    """
+
+    def __init__(self, name: str = "", window: int = 20, min_calls: int = 10,
+                 error_rate: float = 0.5, slow_call: float = 5.0, slow_rate: float = 0.8,
+                 reset_timeout: float = 30.0, half_open_calls: int = 1):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._calls = collections.deque(maxlen=window)  # (是否成功, 是否慢调用)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        调用前检查, 熔断中抛出CircuitOpenError
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("%s 熔断中" % self.name)
+                self.state = HALF_OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    # 探测请求长时间无结果时允许重新探测
+                    if time.monotonic() - self._opened_at < self.reset_timeout:
+                        raise CircuitOpenError("%s 熔断探测中" % self.name)
+                    self._opened_at = time.monotonic()
+                    self._probes = 0
+                self._probes += 1
+
+    def record(self, success: bool, latency: float) -> None:
+        """
+        记录调用结果
+        """
+        slow = latency >= self.slow_call
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if success and not slow:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+            self._calls.append((success, slow))
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                total = len(self._calls)
+                errors = sum(1 for ok, _ in self._calls if not ok)
+                slows = sum(1 for _, s in self._calls if s)
+                if errors / total >= self.error_rate or slows / total >= self.slow_rate:
+                    self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": len(self._calls),
+                "errors": sum(1 for ok, _ in self._calls if not ok),
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(platform: str, **options: t.Any) -> CircuitBreaker:
+    """
+    获取平台共用的熔断器
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(platform)
+        if breaker is None:
+            breaker = _breakers[platform] = CircuitBreaker(platform, **options)
+        return breaker
@@ -0,0 +1,512 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import contextlib
+import errno
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+MISSING = object()  # 缓存未命中标记, 用于区分缓存的None值
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    进程内缓存, 容量有限, 按LRU淘汰
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: t.Hashable) -> t.Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: t.Hashable, value: t.Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key: t.Hashable, value: t.Any, ttl: float) -> bool:
+        """
+        键不存在(或已过期)时写入并返回True, 否则返回False
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] >= time.monotonic():
+                return False
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def delete(self, key: t.Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LocalKeyValueClient:
+    """
+    本地键值服务替身, 提供与redis客户端一致的 get/set/delete/scan_iter 接口,
+    便于在开发和测试环境中替代真实服务
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> t.Optional[bytes]:
+        with self._lock:
+            item = self._data.get(name)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value: t.Union[str, bytes], ex: t.Optional[int] = None,
+            nx: bool = False) -> t.Optional[bool]:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self._lock:
+            if nx:
+                item = self._data.get(name)
+                if item is not None and (item[1] is None or item[1] >= time.monotonic()):
+                    return None
+            self._data[name] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*") -> t.Iterator[str]:
+        prefix = match.rstrip("*")
+        with self._lock:
+            names = [name for name in self._data if name.startswith(prefix)]
+        return iter(names)
+
+
+class KeyValueBackend:
+    """
+    基于键值服务的缓存(redis客户端或LocalKeyValueClient), 值以JSON存储
+    """
+
+    def __init__(self, client, prefix: str = "oauth2link:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: t.Hashable) -> str:
+        if isinstance(key, tuple):
+            key = ":".join("" if k is None else str(k) for k in key)
+        return "%s%s" % (self.prefix, key)
+
+    def get(self, key: t.Hashable) -> t.Any:
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            return MISSING
+        return json.loads(raw)
+
+    def set(self, key: t.Hashable, value: t.Any, ttl: float) -> None:
+        self.client.set(self._key(key), json.dumps(value), ex=max(1, int(ttl)))
+
+    def add(self, key: t.Hashable, value: t.Any, ttl: float) -> bool:
+        """
+        键不存在时写入并返回True, 否则返回False(SET NX)
+        """
+        return bool(self.client.set(self._key(key), json.dumps(value), ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, key: t.Hashable) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        for name in self.client.scan_iter(match="%s*" % self.prefix):
+            self.client.delete(name)
+
+
+class SharedMemoryBackend:
+    """
+    基于内存映射文件的缓存, 同一主机的多个工作进程共用, 无需外部服务;
+    文件划分为固定大小的槽位, 每8个槽位为一组, 按键的摘要定位分组, 组内替换已过期或最早过期的槽位;
+    分组按条带加锁(进程间fcntl记录锁, 同一进程内每个条带一把线程锁), 值以JSON存储,
+    超出槽位大小的值不缓存(计入oversize并记录警告日志); 加锁或读写失败时get视为未命中, set及delete不生效,
+    add返回False(防重放时拒绝), 不影响其他请求处理
+
+        SharedMemoryBackend("/dev/shm/oauth2link.cache", slots=16384, slot_size=2048)
+
+    同一进程中同一文件只应打开一次(关闭任一文件描述符会释放该进程在文件上的所有记录锁), 请使用get_shared_backend
+    """
+    MAGIC = b"O2LSHM01"
+    WAYS = 8    # 每组槽位数
+    _HEADER = struct.Struct("<8sIII")   # 标记, 槽位数, 槽位大小, 条带数
+    _SLOT = struct.Struct("<16sdI")     # 键摘要, 过期时间(unix时间戳), 值长度
+    _DATA_OFFSET = 64
+
+    def __init__(self, path: str, slots: int = 16384, slot_size: int = 2048, stripes: int = 64):
+        import fcntl
+        import mmap
+
+        if slot_size <= self._SLOT.size:
+            raise ValueError("槽位大小至少为%d字节" % (self._SLOT.size + 1))
+        self._fcntl = fcntl
+        self.path = path
+        self.buckets = max(1, slots // self.WAYS)
+        self.slots = self.buckets * self.WAYS
+        self.slot_size = slot_size
+        self.stripes = max(1, min(stripes, self.buckets))
+        self._locks = [threading.Lock() for _ in range(self.stripes)]
+        self._empty = bytes(self._SLOT.size)
+        self.oversize = 0   # 超出槽位大小未缓存的次数
+
+        size = self._DATA_OFFSET + self.slots * slot_size
+        header = self._HEADER.pack(self.MAGIC, self.slots, slot_size, self.stripes)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # 多个进程同时启动时由第一个进程初始化文件
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+            try:
+                if os.fstat(self._fd).st_size == 0:
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, header, 0)
+                elif os.pread(self._fd, self._HEADER.size, 0) != header:
+                    raise ValueError("共享缓存文件%s的槽位配置不一致" % path)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+            self._mm = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    @staticmethod
+    def _digest(key: t.Hashable) -> bytes:
+        return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+
+    @contextlib.contextmanager
+    def _locked(self, bucket: int, exclusive: bool = False) -> t.Iterator[None]:
+        stripe = bucket % self.stripes
+        fcntl = self._fcntl
+        # 记录锁属于进程, 同一进程的线程之间不互斥, 由条带的线程锁保证;
+        # 内核的死锁检测将同一进程的所有线程视为同一持有者, 多个进程交叉持有条带时可能误报EDEADLK, 退避重试
+        with self._locks[stripe]:
+            for attempt in range(10):
+                try:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH, 1, stripe + 1)
+                    break
+                except OSError as e:
+                    if e.errno != errno.EDEADLK or attempt == 9:
+                        raise
+                    time.sleep(0.001 * (attempt + 1))
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe + 1)
+
+    def _locate(self, key: t.Hashable) -> t.Tuple[bytes, int, int]:
+        digest = self._digest(key)
+        bucket = int.from_bytes(digest[:8], "little") % self.buckets
+        return digest, bucket, self._DATA_OFFSET + bucket * self.WAYS * self.slot_size
+
+    def get(self, key: t.Hashable) -> t.Any:
+        try:
+            return self._get(key)
+        except (OSError, ValueError):
+            logger.warning("读取共享缓存失败, 视为未命中", exc_info=True)
+            return MISSING
+
+    def set(self, key: t.Hashable, value: t.Any, ttl: float) -> None:
+        try:
+            self._set(key, value, ttl)
+        except (OSError, TypeError, ValueError):
+            logger.warning("写入共享缓存失败, 已忽略", exc_info=True)
+
+    def add(self, key: t.Hashable, value: t.Any, ttl: float) -> bool:
+        """
+        键不存在(或已过期)时写入并返回True, 否则返回False; 读写失败时返回False, 防重放时按已使用处理
+        """
+        try:
+            return self._set(key, value, ttl, only_if_absent=True)
+        except (OSError, TypeError, ValueError):
+            logger.warning("写入共享缓存失败, 视为已存在", exc_info=True)
+            return False
+
+    def delete(self, key: t.Hashable) -> None:
+        try:
+            self._delete(key)
+        except (OSError, ValueError):
+            logger.warning("删除共享缓存失败, 已忽略", exc_info=True)
+
+    def _get(self, key: t.Hashable) -> t.Any:
+        digest, bucket, base = self._locate(key)
+        raw = None
+        with self._locked(bucket):
+            for pos in range(base, base + self.WAYS * self.slot_size, self.slot_size):
+                slot_digest, expires, length = self._SLOT.unpack_from(self._mm, pos)
+                if slot_digest == digest:
+                    if expires >= time.time():
+                        start = pos + self._SLOT.size
+                        raw = self._mm[start:start + length]
+                    break
+        if raw is None:
+            return MISSING
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return MISSING
+
+    def _set(self, key: t.Hashable, value: t.Any, ttl: float, only_if_absent: bool = False) -> bool:
+        raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        if len(raw) > self.slot_size - self._SLOT.size:
+            self.oversize += 1
+            logger.warning("共享缓存的值(%d字节)超出槽位大小%d, 未缓存", len(raw), self.slot_size)
+            self._delete(key)
+            return False
+        digest, bucket, base = self._locate(key)
+        now = time.time()
+        with self._locked(bucket, exclusive=True):
+            target, oldest = None, None
+            for pos in range(base, base + self.WAYS * self.slot_size, self.slot_size):
+                slot_digest, expires, _ = self._SLOT.unpack_from(self._mm, pos)
+                if slot_digest == digest:
+                    if only_if_absent and expires >= now:
+                        return False
+                    target = pos
+                    break
+                if expires < now:
+                    if target is None:
+                        target = pos
+                elif oldest is None or expires < oldest[1]:
+                    oldest = pos, expires
+            if target is None:
+                target = oldest[0]
+            # 先清空槽位头再写入数据, 写入中途退出时不会读到不完整的值
+            self._mm[target:target + self._SLOT.size] = self._empty
+            start = target + self._SLOT.size
+            self._mm[start:start + len(raw)] = raw
+            self._SLOT.pack_into(self._mm, target, digest, now + ttl, len(raw))
+        return True
+
+    def _delete(self, key: t.Hashable) -> None:
+        digest, bucket, base = self._locate(key)
+        with self._locked(bucket, exclusive=True):
+            for pos in range(base, base + self.WAYS * self.slot_size, self.slot_size):
+                if self._mm[pos:pos + 16] == digest:
+                    self._mm[pos:pos + self._SLOT.size] = self._empty
+                    break
+
+    def clear(self) -> None:
+        for bucket in range(self.buckets):
+            base = self._DATA_OFFSET + bucket * self.WAYS * self.slot_size
+            with self._locked(bucket, exclusive=True):
+                for pos in range(base, base + self.WAYS * self.slot_size, self.slot_size):
+                    self._mm[pos:pos + self._SLOT.size] = self._empty
+
+    def __len__(self) -> int:
+        """
+        未过期的条目数(不加锁, 为近似值)
+        """
+        now = time.time()
+        count = 0
+        for pos in range(self._DATA_OFFSET, self._DATA_OFFSET + self.slots * self.slot_size, self.slot_size):
+            slot_digest, expires, _ = self._SLOT.unpack_from(self._mm, pos)
+            if slot_digest != self._empty[:16] and expires >= now:
+                count += 1
+        return count
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+
+_shared_backends: t.Dict[str, SharedMemoryBackend] = {}
+_shared_backends_lock = threading.Lock()
+
+
+def get_shared_backend(path: str, slots: int = 16384, slot_size: int = 2048) -> SharedMemoryBackend:
+    """
+    获取进程内按文件路径共用的SharedMemoryBackend
+    """
+    path = os.path.abspath(path)
+    with _shared_backends_lock:
+        backend = _shared_backends.get(path)
+        if backend is None:
+            backend = _shared_backends[path] = SharedMemoryBackend(path, slots, slot_size)
+        return backend
+
+
+class CacheStats:
+    """
+    缓存命中统计
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def to_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class ProfileCache:
+    """
+    用户信息缓存, 以 (平台, token, uid) 为键
+
+        ProfileCache(ttl=300)
+        ProfileCache(KeyValueBackend(redis_client), ttl={"github": 600, "weibo": 120})
+    """
+
+    def __init__(self, backend=None, ttl: t.Union[float, t.Mapping[str, float]] = 300,
+                 maxsize: int = 1024):
+        self.backend = backend if backend is not None else MemoryBackend(maxsize)
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def get_ttl(self, platform: str) -> float:
+        if isinstance(self.ttl, t.Mapping):
+            return self.ttl.get(platform, 0)
+        return self.ttl
+
+    def get(self, platform: str, token: str, uid: t.Optional[str] = None) -> t.Any:
+        value = self.backend.get(("profile", platform, token, uid))
+        if value is MISSING:
+            self.stats.miss()
+        else:
+            self.stats.hit()
+        return value
+
+    def set(self, platform: str, token: str, uid: t.Optional[str], value: t.Any) -> None:
+        ttl = self.get_ttl(platform)
+        if ttl > 0:
+            self.backend.set(("profile", platform, token, uid), value, ttl)
+
+    def invalidate(self, platform: str, token: str, uid: t.Optional[str] = None) -> None:
+        self.backend.delete(("profile", platform, token, uid))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+class AccountCache:
+    """
+    账号查询缓存, 以 (平台, 第三方用户ID) 为键, 只缓存轻量字段(不含token);
+    未绑定的账号以None缓存较短时间, 账号写入后需调用invalidate
+
+        AccountCache(ttl=60, negative_ttl=10)
+    """
+    FIELDS = ("id", "user", "source", "username")   # 缓存的字段
+
+    def __init__(self, backend=None, ttl: float = 60, negative_ttl: float = 10,
+                 maxsize: int = 10000):
+        self.backend = backend if backend is not None else MemoryBackend(maxsize)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+
+    def get(self, source: str, uid: t.Any) -> t.Any:
+        """
+        返回账号字段字典, 已缓存为未绑定时返回None, 未缓存时返回MISSING
+        """
+        value = self.backend.get(("account", source, str(uid)))
+        if value is MISSING:
+            self.stats.miss()
+        else:
+            self.stats.hit()
+        return value
+
+    def set(self, source: str, uid: t.Any, row: t.Any) -> t.Optional[dict]:
+        """
+        缓存查询结果(ORM对象、Row或None), 返回缓存的字段字典
+        """
+        if row is None:
+            if self.negative_ttl > 0:
+                self.backend.set(("account", source, str(uid)), None, self.negative_ttl)
+            return None
+        value = {name: getattr(row, name) for name in self.FIELDS}
+        if self.ttl > 0:
+            self.backend.set(("account", source, str(uid)), value, self.ttl)
+        return value
+
+    def invalidate(self, source: str, uid: t.Any) -> None:
+        self.backend.delete(("account", source, str(uid)))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+_account_cache = None
+_account_cache_lock = threading.Lock()
+
+
+def get_account_cache(ttl: float = 60, negative_ttl: float = 10, maxsize: int = 10000,
+                      backend=None) -> AccountCache:
+    """
+    获取进程内共用的账号查询缓存, 所有平台共用, 以便批量写入后统一失效
+    """
+    global _account_cache
+    with _account_cache_lock:
+        if _account_cache is None:
+            _account_cache = AccountCache(backend, ttl=ttl, negative_ttl=negative_ttl, maxsize=maxsize)
+        return _account_cache
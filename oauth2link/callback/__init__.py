@@ -21,6 +21,20 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-from .callback import BaseCallBackHandler
+import importlib
+import typing as t
 
-__all__ = ["BaseCallBackHandler"]
+__all__ = ["BaseCallBackHandler", "AsyncBaseCallBackHandler"]
+
+
+def __getattr__(name: str) -> t.Any:
+    # 回调处理器依赖Flask, 使用时才导入
+    if name not in __all__:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module(".callback", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> t.List[str]:
+    return sorted(set(globals()) | set(__all__))
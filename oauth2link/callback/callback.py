@@ -23,6 +23,8 @@ SOFTWARE.
 """
 from flask.views import MethodView
 from flask import request
+from oauth2link import metrics
+from oauth2link.exceptions import AdmissionRejected, StateError, UpstreamUnavailable
 
 
 class _BaseCallBackHandler(MethodView):
@@ -36,14 +38,62 @@ class _BaseCallBackHandler(MethodView):
         """
         raise NotImplementedError
 
+    def phase(self, name: str):
+        """
+        记录回调中某个阶段的耗时
+        """
+        return metrics.timer("oauth2link_phase_seconds", self.oauth_client.Type, phase=name)
+
     def get(self):
-        return self.do_call()
+        try:
+            with self.oauth_client.callback_deadline(), self.oauth_client.admit(), self.phase("callback"):
+                return self.do_call()
+        except StateError:
+            return "invalid state", 400
+        except UpstreamUnavailable:
+            return "service unavailable", 503
+        except AdmissionRejected as e:
+            return "service unavailable", 503, {"Retry-After": str(e.retry_after)}
 
 
 class BaseCallBackHandler(_BaseCallBackHandler):
 
     def do_call(self):
-        self.oauth_client.get_access_token(request)
-        self.oauth_client.get_user_info()
-        self.oauth_client.save_model()
+        with self.phase("token"):
+            self.oauth_client.get_access_token(request)
+        with self.phase("profile"):
+            self.oauth_client.get_user_info()
+        with self.phase("save"):
+            self.oauth_client.save_model()
+        return "login successful"
+
+
+class AsyncBaseCallBackHandler(_BaseCallBackHandler):
+    """
+    异步回调处理器, 需要 Flask 安装 async 扩展(`pip install flask[async]`)
+    """
+
+    async def do_call(self):
+        with self.phase("token"):
+            await self.oauth_client.async_get_access_token(request)
+        with self.phase("profile"):
+            await self.oauth_client.async_get_user_info()
+        with self.phase("save"):
+            await self.oauth_client.async_save_model()
         return "login successful"
+
+    async def get(self):
+        try:
+            with self.oauth_client.callback_deadline():
+                async with self.oauth_client.async_admit():
+                    with self.phase("callback"):
+                        return await self.do_call()
+        except StateError:
+            return "invalid state", 400
+        except UpstreamUnavailable:
+            return "service unavailable", 503
+        except AdmissionRejected as e:
+            return "service unavailable", 503, {"Retry-After": str(e.retry_after)}
+        finally:
+            # Flask每个异步请求使用新的事件循环, 请求结束后关闭该事件循环的HTTP会话
+            await self.oauth_client.async_close()
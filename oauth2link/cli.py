@@ -0,0 +1,111 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+links_cli = AppGroup("links", help="oauth2link 管理命令")
+
+
+def get_clients(platform: str) -> list:
+    """
+    获取已注册到当前应用的平台, platform为all时返回全部; 未注册任何平台时报告用法错误
+    """
+    clients = current_app.extensions.get("oauth2link", {})
+    if not clients:
+        raise click.UsageError("当前应用未注册任何平台")
+    if platform == "all":
+        return list(clients.values())
+    if platform not in clients:
+        raise click.BadParameter("未注册的平台: %s, 可选: %s" % (platform, ", ".join(clients)))
+    return [clients[platform]]
+
+
+@links_cli.command("migrate")
+@click.option("--dedupe", is_flag=True, help="创建唯一索引前删除重复的 (source, username) 记录")
+def migrate_command(dedupe: bool):
+    """
+    为已有账号表补充新版本的字段及索引, 可重复执行; 部署时执行一次, 不在应用启动时执行
+    """
+    from oauth2link.exceptions import DuplicateAccountsError
+
+    try:
+        created = get_clients("all")[0].ensure_indexes(dedupe=dedupe)
+    except DuplicateAccountsError as e:
+        raise click.ClickException(str(e))
+    click.echo("完成, 新建索引: %s" % (", ".join(created) or "无"))
+
+
+@links_cli.command("sync-profiles")
+@click.option("--platform", default="all", help="平台类型, 如 github、weibo, 默认全部")
+@click.option("--chunk-size", default=500, show_default=True, help="每批读取条数")
+@click.option("--workers", default=8, show_default=True, help="每个平台的并发请求数")
+def sync_profiles_command(platform: str, chunk_size: int, workers: int):
+    """
+    批量重新同步第三方用户名及头像
+    """
+    from oauth2link.sync import sync_profiles
+
+    for oauth_client in get_clients(platform):
+        report = sync_profiles(oauth_client, chunk_size=chunk_size, workers=workers,
+                               progress=lambda r: click.echo(str(r)))
+        click.echo("完成 %s" % report)
+
+
+@links_cli.command("export")
+@click.argument("path")
+@click.option("--platform", default="all", help="只导出某个平台的账号, 默认全部")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default=None,
+              help="文件格式, 默认按扩展名判断(jsonl)")
+@click.option("--chunk-size", default=1000, show_default=True, help="每批读取条数")
+@click.option("--checkpoint", default=None, help="断点文件, 存在时从上次中断处继续导出")
+def export_command(path: str, platform: str, fmt: str, chunk_size: int, checkpoint: str):
+    """
+    流式导出账号表至jsonl或csv文件
+    """
+    from oauth2link.transfer import export_accounts
+
+    oauth_client = get_clients(platform)[0]
+    report = export_accounts(oauth_client, path, fmt, source=None if platform == "all" else oauth_client.Type,
+                             chunk_size=chunk_size, checkpoint=checkpoint,
+                             progress=lambda r: click.echo(str(r)))
+    click.echo("完成 %s" % report)
+
+
+@links_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default=None,
+              help="文件格式, 默认按扩展名判断(jsonl)")
+@click.option("--chunk-size", default=1000, show_default=True, help="每批写入条数")
+@click.option("--checkpoint", default=None, help="断点文件, 存在时从上次中断处继续导入")
+@click.option("--keep-ids", is_flag=True, help="保留导出文件中的id")
+def import_command(path: str, fmt: str, chunk_size: int, checkpoint: str, keep_ids: bool):
+    """
+    从导出文件批量写入账号表, 已存在的账号按 (source, username) 更新
+    """
+    from oauth2link.transfer import import_accounts
+
+    report = import_accounts(get_clients("all")[0], path, fmt, chunk_size=chunk_size, checkpoint=checkpoint,
+                             keep_ids=keep_ids, progress=lambda r: click.echo(str(r)))
+    click.echo("完成 %s" % report)
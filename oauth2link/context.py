@@ -0,0 +1,78 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import contextvars
+import sys
+import typing as t
+
+_state: contextvars.ContextVar = contextvars.ContextVar("oauth2link_state", default=None)
+_g_shim = False     # 是否同时写入 flask.g, 兼容读取 g._<平台> 的旧代码
+
+
+def _flask_g():
+    """
+    处于Flask应用上下文时返回 flask.g, 否则返回None(不主动导入Flask)
+    """
+    flask = sys.modules.get("flask")
+    if flask is not None and flask.has_app_context():
+        return flask.g
+    return None
+
+
+def enable_g_shim(enabled: bool = True) -> None:
+    """
+    开启后授权信息同时写入 flask.g._<平台>
+    """
+    global _g_shim
+    _g_shim = enabled
+
+
+def get_state(name: str) -> t.Any:
+    """
+    获取当前请求(或协程)中某个平台的授权信息
+    """
+    state = _state.get()
+    if state is None:
+        return None
+    return state.get(name)
+
+
+def set_state(name: str, value: t.Any) -> None:
+    """
+    设置当前请求(或协程)中某个平台的授权信息
+    """
+    # 复制后再写入, 避免修改父上下文中共享的字典
+    state = dict(_state.get() or ())
+    state[name] = value
+    _state.set(state)
+    if _g_shim:
+        g = _flask_g()
+        if g is not None:
+            setattr(g, "_%s" % name, value)
+
+
+def reset_state() -> contextvars.Token:
+    """
+    清空当前上下文中的授权信息, 每个请求开始时调用(Flask中由init_app注册)
+    """
+    return _state.set({})
@@ -0,0 +1,90 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import contextlib
+import contextvars
+import time
+import typing as t
+
+from oauth2link.exceptions import DeadlineExceeded
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("oauth2link_deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline(seconds: t.Optional[float]) -> t.Iterator[None]:
+    """
+    为当前请求(或协程)设置时间预算, 期间的平台请求超时由剩余时间决定; seconds为None时不限制
+    """
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> t.Optional[float]:
+    """
+    剩余时间(秒), 未设置预算时为None
+    """
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def check() -> None:
+    """
+    预算已用完时抛出DeadlineExceeded
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("已超出回调时间预算")
+
+
+def allows(seconds: float) -> bool:
+    """
+    剩余时间是否足够等待seconds秒
+    """
+    left = remaining()
+    return left is None or left > seconds
+
+
+def clamp_timeout(timeout: t.Union[None, float, t.Tuple[float, float]]):
+    """
+    按剩余时间收紧请求超时, 支持 (连接超时, 读取超时) 形式
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    check()
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return min(timeout[0], left), min(timeout[1], left)
+    return min(timeout, left)
@@ -0,0 +1,80 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import typing as t
+
+
+class OAuth2LinkError(Exception):
+    """
+    oauth2link异常基类
+    """
+
+
+class StateError(OAuth2LinkError):
+    """
+    state校验失败: 签名错误、已过期或被重复使用
+    """
+
+
+class DuplicateAccountsError(OAuth2LinkError):
+    """
+    账号表存在重复的 (source, username) 记录, 无法创建唯一索引; duplicates为 (source, username, 条数) 列表
+    """
+
+    def __init__(self, message: str = "", duplicates: t.Sequence[tuple] = ()):
+        super().__init__(message)
+        self.duplicates = list(duplicates)
+
+
+class UpstreamUnavailable(OAuth2LinkError):
+    """
+    第三方平台暂不可用, 回调返回503
+    """
+
+
+class RateLimitExceeded(UpstreamUnavailable):
+    """
+    等待平台限流额度超时
+    """
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """
+    平台熔断中, 请求被快速拒绝
+    """
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """
+    回调处理超出时间预算
+    """
+
+
+class AdmissionRejected(OAuth2LinkError):
+    """
+    回调并发及排队已满, 请求被快速拒绝, 回调返回503及Retry-After
+    """
+
+    def __init__(self, message: str = "", retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
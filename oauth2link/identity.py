@@ -0,0 +1,111 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import datetime
+import typing as t
+
+# 兼容旧版授权信息字典的键 -> 属性名
+_KEYS = {
+    "access_token": "token",
+    "expires_in": "expires",
+    "refresh_token": "refresh_token",
+    "uid": "uid",
+    "username": "username",
+    "avatar": "avatar",
+}
+
+
+class OAuthIdentity:
+    """
+    一次授权得到的第三方账号信息, 不依赖请求上下文, 可在后台任务中使用;
+    兼容旧版字典的 get 及 [] 取值, 未声明的键从平台原始数据raw中读取
+    """
+    __slots__ = ("platform", "token", "expires", "refresh_token", "uid", "username", "avatar", "raw")
+
+    def __init__(self, platform: t.Optional[str] = None, token: t.Optional[str] = None,
+                 expires: t.Optional[int] = None, refresh_token: t.Optional[str] = None,
+                 uid: t.Any = None, username: t.Optional[str] = None,
+                 avatar: t.Optional[str] = None, raw: t.Optional[dict] = None):
+        self.platform = platform
+        self.token = token
+        self.expires = expires      # 有效期(秒)
+        self.refresh_token = refresh_token
+        self.uid = uid
+        self.username = username
+        self.avatar = avatar
+        self.raw = raw              # 用户信息接口的原始数据
+
+    def update(self, fields: t.Mapping[str, t.Any], raw: t.Optional[dict] = None) -> "OAuthIdentity":
+        """
+        合并按PROFILE_SCHEMA提取的用户信息
+        """
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if raw is not None:
+            self.raw = raw
+        return self
+
+    def expires_at(self, now: t.Optional[datetime.datetime] = None) -> datetime.datetime:
+        """
+        过期时间
+        """
+        return (now or datetime.datetime.now()) + datetime.timedelta(seconds=self.expires or 0)
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        name = _KEYS.get(key)
+        if name is not None:
+            value = getattr(self, name)
+            return default if value is None else value
+        if key in self.__slots__:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.raw is not None:
+            return self.raw.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> t.Any:
+        """
+        与旧版字典一致: 已声明的字段及平台原始数据中存在的键返回其值(可能为None), 其他键抛出KeyError
+        """
+        name = _KEYS.get(key)
+        if name is None and key in self.__slots__:
+            name = key
+        if name is not None:
+            return getattr(self, name)
+        if self.raw is not None and key in self.raw:
+            return self.raw[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def to_dict(self) -> dict:
+        """
+        转换为旧版授权信息字典
+        """
+        return {key: getattr(self, name) for key, name in _KEYS.items()
+                if getattr(self, name) is not None}
+
+    def __repr__(self) -> str:
+        return "OAuthIdentity(platform=%r, uid=%r, username=%r)" % (self.platform, self.uid,
+                                                                    self.username)
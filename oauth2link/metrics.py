@@ -0,0 +1,223 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import bisect
+import threading
+import time
+import typing as t
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  # Prometheus文本格式
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "oauth2link_phase_seconds": ("histogram", "回调各阶段耗时(token/profile/save/callback)"),
+    "oauth2link_upstream_requests_total": ("counter", "平台接口请求数, 按状态码统计"),
+    "oauth2link_upstream_seconds": ("histogram", "平台接口请求耗时"),
+    "oauth2link_retries_total": ("counter", "平台接口重试次数"),
+    "oauth2link_cache_requests_total": ("counter", "用户信息缓存命中情况"),
+    "oauth2link_db_seconds": ("histogram", "账号表读写耗时"),
+    "oauth2link_admission_rejected_total": ("counter", "并发及排队已满时被拒绝的回调数"),
+}
+
+
+class MetricsSink:
+    """
+    指标输出接口, 自定义输出(如statsd、OpenTelemetry)需实现inc及observe
+    """
+
+    def inc(self, name: str, labels: t.Tuple[t.Tuple[str, str], ...], value: float = 1.0) -> None:
+        """
+        计数器累加
+        """
+        raise NotImplementedError
+
+    def observe(self, name: str, labels: t.Tuple[t.Tuple[str, str], ...], value: float) -> None:
+        """
+        记录一次耗时等观测值
+        """
+        raise NotImplementedError
+
+
+class PrometheusRegistry(MetricsSink):
+    """
+    进程内指标汇总, 以Prometheus文本格式输出
+    """
+
+    def __init__(self, buckets: t.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [各区间计数, 总和, 总数]
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1.0):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                hist[0][index] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """
+        生成Prometheus文本格式
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._histograms.items())
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name not in seen:
+                seen.add(name)
+                kind, doc = HELP.get(name, ("untyped", name))
+                lines.append("# HELP %s %s" % (name, doc))
+                lines.append("# TYPE %s %s" % (name, kind))
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append("%s%s %s" % (name, _format_labels(labels), _format_value(value)))
+        for (name, labels), (counts, total, count) in histograms:
+            header(name)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append("%s_bucket%s %d" % (name, _format_labels(labels + (("le", repr(bound)),)),
+                                                 cumulative))
+            lines.append("%s_bucket%s %d" % (name, _format_labels(labels + (("le", "+Inf"),)), count))
+            lines.append("%s_sum%s %s" % (name, _format_labels(labels), _format_value(total)))
+            lines.append("%s_count%s %d" % (name, _format_labels(labels), count))
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: t.Tuple[t.Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                             for k, v in labels)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+registry = PrometheusRegistry()     # 内置的Prometheus汇总
+_sinks: t.List[MetricsSink] = []
+
+
+def add_sink(sink: MetricsSink) -> None:
+    """
+    添加指标输出, 未添加任何输出时不采集指标
+    """
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_sink(sink: MetricsSink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def enabled() -> bool:
+    return bool(_sinks)
+
+
+def _labels(platform: str, labels: dict) -> t.Tuple[t.Tuple[str, str], ...]:
+    return (("platform", platform or ""),) + tuple(sorted(labels.items()))
+
+
+def inc(name: str, platform: str, value: float = 1.0, **labels) -> None:
+    """
+    计数器累加, 按平台打标签
+    """
+    if not _sinks:
+        return
+    key = _labels(platform, labels)
+    for sink in _sinks:
+        sink.inc(name, key, value)
+
+
+def observe(name: str, platform: str, value: float, **labels) -> None:
+    """
+    记录观测值, 按平台打标签
+    """
+    if not _sinks:
+        return
+    key = _labels(platform, labels)
+    for sink in _sinks:
+        sink.observe(name, key, value)
+
+
+class _Timer:
+    __slots__ = ("name", "platform", "labels", "started")
+
+    def __init__(self, name: str, platform: str, labels: dict):
+        self.name = name
+        self.platform = platform
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, self.platform, time.perf_counter() - self.started, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str, platform: str, **labels):
+    """
+    记录代码块耗时, 未开启指标时为空操作
+
+        with metrics.timer("oauth2link_phase_seconds", "github", phase="token"):
+            ...
+    """
+    if not _sinks:
+        return _NULL_TIMER
+    return _Timer(name, platform, labels)
@@ -0,0 +1,411 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import contextlib
+import datetime
+import logging
+import typing as t
+
+import sqlalchemy as sa
+
+from oauth2link.exceptions import DuplicateAccountsError
+from oauth2link.types import DEFAULT_TABLE_NAME
+
+UPDATE_COLUMNS = ("access_token", "refresh_token", "expires", "avatar", "modifytime")  # 账号已存在时更新的字段
+UPSERT_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")  # 支持单语句upsert的数据库
+
+logger = logging.getLogger(__name__)
+
+_upsert_ready: t.Dict[t.Tuple[str, str], bool] = {}  # (数据库地址, 表名) -> 是否已有upsert所需的唯一索引
+
+
+def make_table(metadata: sa.MetaData, name: str = DEFAULT_TABLE_NAME) -> sa.Table:
+    """
+    第三方账号表结构, Flask模型与非Flask环境共用
+    """
+    return sa.Table(
+        name, metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user", sa.Integer, comment="用户表id"),
+        sa.Column("username", sa.String(1024), comment="用户名"),
+        sa.Column("realname", sa.String(1024), comment="用户第三方名"),
+        sa.Column("source", sa.String(1024), comment="来源"),
+        sa.Column("access_token", sa.String(1024), comment="授权token"),
+        sa.Column("refresh_token", sa.String(1024), nullable=True, comment="刷新token"),
+        sa.Column("avatar", sa.String(1024), comment="头像"),
+        sa.Column("expires", sa.DateTime, comment="过期时间"),
+        sa.Column("createtime", sa.DateTime, default=datetime.datetime.now),
+        sa.Column("modifytime", sa.DateTime, default=datetime.datetime.now),
+        # upsert依赖(source, username)唯一索引, MySQL下使用前缀索引避免超出索引长度限制
+        sa.Index("ux_%s_source_username" % name, "source", "username", unique=True,
+                 mysql_length={"source": 64, "username": 191}),
+        sa.Index("ix_%s_user" % name, "user"),
+        sa.Index("ix_%s_source_expires" % name, "source", "expires",
+                 mysql_length={"source": 64}),
+    )
+
+
+def create_table(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table) -> None:
+    """
+    创建账号表; 不修改已存在的表, 缺少新版本增加的字段时记录警告, 由迁移步骤(ensure_columns)补充,
+    避免多个进程启动时同时执行ALTER TABLE
+    """
+    table.create(bind, checkfirst=True)
+    missing = missing_columns(bind, table)
+    if missing:
+        logger.warning("账号表%s缺少字段%s, 请执行 `flask links migrate` 或 links.ensure_indexes() 补充",
+                       table.name, ", ".join(missing))
+
+
+def missing_columns(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table) -> t.List[str]:
+    """
+    已存在的表中缺少的可空字段
+    """
+    existing = {c["name"] for c in sa.inspect(bind).get_columns(table.name)}
+    return [c.name for c in table.columns if c.name not in existing and c.nullable]
+
+
+def ensure_columns(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table) -> t.List[str]:
+    """
+    为已存在的表补充缺少的可空字段, 可重复执行, 返回新增的字段名; 字段已由其他进程同时补充时跳过
+    """
+    added = []
+    for name in missing_columns(bind, table):
+        column = table.c[name]
+        ddl = sa.schema.CreateColumn(column).compile(dialect=bind.dialect)
+        statement = "ALTER TABLE %s ADD COLUMN %s" % (bind.dialect.identifier_preparer.format_table(table), ddl)
+        try:
+            if isinstance(bind, sa.engine.Engine):
+                with bind.begin() as conn:
+                    conn.exec_driver_sql(statement)
+            else:
+                bind.exec_driver_sql(statement)
+        except sa.exc.DBAPIError:
+            if name in missing_columns(bind, table):
+                raise
+            continue
+        added.append(name)
+    return added
+
+
+def find_duplicates(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table,
+                    limit: t.Optional[int] = None) -> t.List[t.Tuple[str, str, int]]:
+    """
+    查询重复的 (source, username) 记录, 返回 (source, username, 条数) 列表
+    """
+    count = sa.func.count().label("count")
+    stmt = sa.select(table.c.source, table.c.username, count).group_by(
+        table.c.source, table.c.username).having(count > 1).order_by(count.desc()).limit(limit)
+    with _connect(bind) as conn:
+        return [tuple(row) for row in conn.execute(stmt)]
+
+
+def dedupe_accounts(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table) -> int:
+    """
+    删除重复的 (source, username) 记录, 每组优先保留已绑定本地用户、最近更新的记录, 返回删除的条数
+    """
+    removed = 0
+    with _connect(bind) as conn:
+        for source, username, _ in find_duplicates(conn, table):
+            rows = list(conn.execute(sa.select(table.c.id, table.c.user, table.c.modifytime).where(
+                table.c.source == source, table.c.username == username)))
+            keep = max(rows, key=lambda r: (r.user is not None, r.modifytime or datetime.datetime.min, r.id))
+            ids = [r.id for r in rows if r.id != keep.id]
+            removed += conn.execute(sa.delete(table).where(table.c.id.in_(ids))).rowcount
+    return removed
+
+
+@contextlib.contextmanager
+def _connect(bind: t.Union[sa.engine.Engine, sa.engine.Connection]) -> t.Iterator[sa.engine.Connection]:
+    if isinstance(bind, sa.engine.Engine):
+        with bind.begin() as conn:
+            yield conn
+    else:
+        yield bind
+
+
+def ensure_indexes(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table,
+                   dedupe: bool = False) -> t.List[str]:
+    """
+    为已存在的表补充索引, 可重复执行; 已存在相同字段的索引时跳过, 返回新建的索引名
+
+    创建 (source, username) 唯一索引前检查重复记录, 存在时抛出DuplicateAccountsError;
+    dedupe为True时先删除重复记录(见dedupe_accounts)
+    """
+    inspector = sa.inspect(bind)
+    existing = set()
+    for index in inspector.get_indexes(table.name):
+        existing.add((tuple(index["column_names"]), bool(index.get("unique"))))
+    for constraint in inspector.get_unique_constraints(table.name):
+        existing.add((tuple(constraint["column_names"]), True))
+
+    created = []
+    for index in table.indexes:
+        columns = tuple(c.name for c in index.columns)
+        if (columns, index.unique) in existing or (columns, True) in existing:
+            continue
+        if index.unique and set(columns) == {"source", "username"}:
+            if dedupe:
+                removed = dedupe_accounts(bind, table)
+                if removed:
+                    logger.warning("账号表%s删除了%d条重复的(source, username)记录", table.name, removed)
+            duplicates = find_duplicates(bind, table, limit=20)
+            if duplicates:
+                raise DuplicateAccountsError(
+                    "账号表%s存在重复的(source, username)记录, 无法创建唯一索引%s, 请先清理或使用dedupe: %s" % (
+                        table.name, index.name,
+                        ", ".join("%s/%s(%d条)" % d for d in duplicates)), duplicates)
+        index.create(bind)
+        created.append(index.name)
+    _upsert_ready.pop((str(bind.engine.url), table.name), None)
+    return created
+
+
+def get_account(conn: sa.engine.Connection, table: sa.Table,
+                source: str, username: str) -> t.Optional[sa.engine.Row]:
+    """
+    查询第三方账号记录
+    """
+    stmt = sa.select(table).where(table.c.source == source,
+                                  table.c.username == username)
+    return conn.execute(stmt).first()
+
+
+def get_account_by_id(conn: sa.engine.Connection, table: sa.Table,
+                      account_id: int) -> t.Optional[sa.engine.Row]:
+    """
+    按主键查询第三方账号记录
+    """
+    return conn.execute(sa.select(table).where(table.c.id == account_id)).first()
+
+
+def get_accounts_by_user(conn: sa.engine.Connection, table: sa.Table,
+                         user: int) -> t.List[sa.engine.Row]:
+    """
+    查询本地用户绑定的所有第三方账号
+    """
+    stmt = sa.select(table).where(table.c.user == user).order_by(table.c.id)
+    return list(conn.execute(stmt))
+
+
+def save_account(conn: sa.engine.Connection, table: sa.Table, values: dict) -> t.Optional[sa.engine.Row]:
+    """
+    保存第三方账号记录, 已存在时更新token、过期时间、头像及修改时间
+    """
+    row = get_account(conn, table, values["source"], values["username"])
+    if row is None:
+        conn.execute(sa.insert(table).values(**values))
+    else:
+        conn.execute(sa.update(table).where(table.c.id == row.id).values(
+            **{k: values[k] for k in UPDATE_COLUMNS if k in values}
+        ))
+    return get_account(conn, table, values["source"], values["username"])
+
+
+def supports_upsert(dialect: str) -> bool:
+    return dialect in UPSERT_DIALECTS
+
+
+def has_unique_key(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table) -> bool:
+    """
+    账号表是否已有 (source, username) 唯一索引或唯一约束
+    """
+    inspector = sa.inspect(bind)
+    keys = [index["column_names"] for index in inspector.get_indexes(table.name) if index.get("unique")]
+    keys += [constraint["column_names"] for constraint in inspector.get_unique_constraints(table.name)]
+    return any(set(columns) == {"source", "username"} for columns in keys)
+
+
+def can_upsert(bind: t.Union[sa.engine.Engine, sa.engine.Connection], table: sa.Table) -> bool:
+    """
+    数据库支持upsert且账号表已有 (source, username) 唯一索引, 检查结果按数据库及表缓存;
+    缺少唯一索引时upsert在SQLite下报错、在MySQL下插入重复记录, 此时回退为先查询再写入
+    """
+    if not supports_upsert(bind.dialect.name):
+        return False
+    key = (str(bind.engine.url), table.name)
+    ready = _upsert_ready.get(key)
+    if ready is None:
+        ready = _upsert_ready[key] = has_unique_key(bind, table)
+        if not ready:
+            logger.warning("账号表%s缺少(source, username)唯一索引, 不使用upsert; "
+                           "请执行ensure_indexes补充索引", table.name)
+    return ready
+
+
+def upsert_statement(dialect: str, table: sa.Table, update_columns: t.Sequence[str] = UPDATE_COLUMNS):
+    """
+    生成以(source, username)为键的upsert语句, 已存在时更新update_columns, 参数在执行时传入, 支持批量执行
+    """
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.source, table.c.username],
+            set_={k: stmt.excluded[k] for k in update_columns},
+        )
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(
+            {k: stmt.inserted[k] for k in update_columns}
+        )
+    raise NotImplementedError("%s 不支持upsert" % dialect)
+
+
+def upsert_accounts(conn: sa.engine.Connection, table: sa.Table, rows: t.List[dict]) -> None:
+    """
+    批量upsert第三方账号记录, 单条语句完成插入或更新
+    """
+    if rows:
+        conn.execute(upsert_statement(conn.dialect.name, table), rows)
+
+
+def upsert_returning(dialect: sa.engine.Dialect) -> bool:
+    """
+    upsert语句能否通过RETURNING返回保存后的记录(PostgreSQL、SQLite 3.35+); MySQL不支持, 需再查询一次
+    """
+    return dialect.name in ("sqlite", "postgresql") and bool(getattr(dialect, "insert_returning", False))
+
+
+def upsert_account(conn: sa.engine.Connection, table: sa.Table, values: dict) -> t.Optional[sa.engine.Row]:
+    """
+    upsert单条第三方账号记录并返回保存后的记录
+    """
+    stmt = upsert_statement(conn.dialect.name, table)
+    if upsert_returning(conn.dialect):
+        return conn.execute(stmt.returning(*table.c), values).one()
+    conn.execute(stmt, values)
+    return get_account(conn, table, values["source"], values["username"])
+
+
+def write_accounts(conn: sa.engine.Connection, table: sa.Table, rows: t.List[dict]) -> None:
+    """
+    批量保存第三方账号记录, 数据库不支持upsert或缺少唯一索引时逐条保存
+    """
+    if can_upsert(conn, table):
+        upsert_accounts(conn, table, rows)
+        return
+    for row in rows:
+        save_account(conn, table, row)
+
+
+def merge_accounts(conn: sa.engine.Connection, table: sa.Table, rows: t.List[dict]) -> None:
+    """
+    批量导入账号记录, 已存在的账号(按 (source, username))更新导入的全部字段(id除外), 每行的字段需一致
+    """
+    if not rows:
+        return
+    columns = [k for k in rows[0] if k not in ("id", "source", "username")]
+    if can_upsert(conn, table):
+        conn.execute(upsert_statement(conn.dialect.name, table, columns), rows)
+        return
+    for row in rows:
+        existing = get_account(conn, table, row["source"], row["username"])
+        if existing is None:
+            conn.execute(sa.insert(table).values(**row))
+        elif columns:
+            conn.execute(sa.update(table).where(table.c.id == existing.id).values(
+                **{k: row[k] for k in columns}))
+
+
+def reset_id_sequence(conn: sa.engine.Connection, table: sa.Table) -> None:
+    """
+    写入指定id的记录后, 将PostgreSQL的id序列调整为当前最大id, 避免后续插入主键冲突; 其他数据库无需处理
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(sa.text(
+        "SELECT setval(pg_get_serial_sequence(:table, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+        "FROM %s" % conn.dialect.identifier_preparer.format_table(table)
+    ), {"table": conn.dialect.identifier_preparer.format_table(table)})
+
+
+def get_due_accounts(conn: sa.engine.Connection, table: sa.Table, source: str,
+                     before: datetime.datetime, after_id: int = 0, limit: int = 100) -> t.List[sa.engine.Row]:
+    """
+    查询即将过期且可刷新的账号, 按id分批
+    """
+    stmt = sa.select(table.c.id, table.c.access_token, table.c.refresh_token,
+                     table.c.expires).where(
+        table.c.source == source,
+        table.c.expires < before,
+        table.c.refresh_token.isnot(None),
+        table.c.id > after_id,
+    ).order_by(table.c.id).limit(limit)
+    return list(conn.execute(stmt))
+
+
+def update_accounts(conn: sa.engine.Connection, table: sa.Table, rows: t.List[dict],
+                    match: t.Sequence[str] = ()) -> int:
+    """
+    按id批量更新账号记录, 每行的字段需一致, id以"_id"为键;
+    match中的字段需与行中"_<字段>"的原值一致时才更新(避免覆盖并发写入), 返回更新的条数
+    """
+    if not rows:
+        return 0
+    columns = [k for k in rows[0] if not k.startswith("_")]
+    stmt = sa.update(table).where(
+        table.c.id == sa.bindparam("_id"),
+        *[table.c[k] == sa.bindparam("_" + k) for k in match]
+    ).values(**{k: sa.bindparam(k) for k in columns})
+    return conn.execute(stmt, rows).rowcount
+
+
+def iter_account_chunks(conn: sa.engine.Connection, table: sa.Table, source: str,
+                        chunk_size: int = 500, after_id: int = 0) -> t.Iterator[t.List[sa.engine.Row]]:
+    """
+    按id分批读取某平台有token的账号, 每批单独查询, 不会一次性加载整张表
+    """
+    while True:
+        stmt = sa.select(table.c.id, table.c.username, table.c.access_token).where(
+            table.c.source == source,
+            table.c.access_token.isnot(None),
+            table.c.id > after_id,
+        ).order_by(table.c.id).limit(chunk_size)
+        rows = list(conn.execute(stmt))
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        after_id = rows[-1].id
+
+
+def stream_accounts(conn: sa.engine.Connection, table: sa.Table, source: t.Optional[str] = None,
+                    after_id: int = 0, chunk_size: int = 1000) -> t.Iterator[t.List[sa.engine.Row]]:
+    """
+    使用服务端游标按id顺序分批读取账号记录(全部字段), 内存占用与每批条数相关, 与表大小无关
+    """
+    stmt = sa.select(table).where(table.c.id > after_id).order_by(table.c.id)
+    if source is not None:
+        stmt = stmt.where(table.c.source == source)
+    result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(stmt)
+    try:
+        for rows in result.partitions(chunk_size):
+            yield rows
+    finally:
+        result.close()
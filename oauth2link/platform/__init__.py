@@ -21,8 +21,83 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-from .platform import BaseOauth2, BaseOauth2Impl
-from .weibo_platform import WeiBoOauth2
-from .github_platform import GitHubOauth2
+import importlib
+import typing as t
 
-__all__ = ["BaseOauth2", "BaseOauth2Impl", "WeiBoOauth2", "GitHubOauth2"]
+# 平台类型 -> "模块:类名", 首次使用时才导入平台模块
+PLATFORMS: t.Dict[str, t.Union[str, type]] = {
+    "github": "oauth2link.platform.github_platform:GitHubOauth2",
+    "weibo": "oauth2link.platform.weibo_platform:WeiBoOauth2",
+}
+ENTRY_POINT_GROUP = "oauth2link.platforms"  # 第三方包通过该入口点注册平台
+
+_EXPORTS = {
+    "BaseOauth2": ".platform",
+    "BaseOauth2Impl": ".platform",
+    "WeiBoOauth2": ".weibo_platform",
+    "GitHubOauth2": ".github_platform",
+}
+_entry_points_loaded = False
+
+__all__ = ["BaseOauth2", "BaseOauth2Impl", "WeiBoOauth2", "GitHubOauth2",
+           "register_platform", "get_platform", "platform_types"]
+
+
+def register_platform(platform: str, target: t.Union[str, type]) -> None:
+    """
+    注册平台, target为平台类或 "模块:类名" 字符串(首次使用时导入)
+    """
+    PLATFORMS[platform] = target
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    from importlib import metadata
+
+    try:
+        entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python 3.9
+        entry_points = metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+    for entry_point in entry_points:
+        PLATFORMS.setdefault(entry_point.name, entry_point.value)
+
+
+def get_platform(platform: str) -> type:
+    """
+    按平台类型获取平台类, 未注册时抛出ValueError
+    """
+    target = PLATFORMS.get(platform)
+    if target is None:
+        _load_entry_points()
+        target = PLATFORMS.get(platform)
+        if target is None:
+            raise ValueError("不支持的平台: %s" % platform)
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        target = PLATFORMS[platform] = getattr(importlib.import_module(module_name), attr)
+    return target
+
+
+def platform_types() -> t.List[str]:
+    """
+    已注册的平台类型(含入口点注册的平台)
+    """
+    _load_entry_points()
+    return list(PLATFORMS)
+
+
+def __getattr__(name: str) -> t.Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> t.List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
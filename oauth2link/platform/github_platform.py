@@ -21,10 +21,12 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-import requests
-from flask import g
-from flask.wrappers import Request
-from oauth2link import utils
+import typing as t
+import urllib.parse
+
+from oauth2link import schema
+from oauth2link.exceptions import UpstreamUnavailable
+from oauth2link.identity import OAuthIdentity
 from oauth2link.types import PlatformType
 
 from .platform import BaseOauth2Impl
@@ -50,46 +52,58 @@ class GitHubOauth2(BaseOauth2Impl):
     }
     API = GitHubAccessApi
     Type = PlatformType.GitHub
+    REFRESH_GRANT = True  # GitHub App开启token过期后返回refresh_token
+    AUTHORIZE_ARGS = ("client_id",)
+    ACCESS_TOKEN_ARGS = ("client_id", "client_secret")
+    TOKEN_SCHEMA = schema.Schema("access_token", token="access_token",
+                                 expires="expires_in", refresh_token="refresh_token")
+    PROFILE_SCHEMA = schema.Schema("id", uid="id", username="login", avatar="avatar_url")
+
+    def _access_token_request(self, code: str) -> tuple:
+        full_url = "%s&accept=:json&%s" % (self.access_token_url, self.make_token_query(code))
+        return "POST", full_url, {"accept": 'application/json'}
+
+    def get_access_token(self, req) -> OAuthIdentity:
+        return self._parse_access_token(self._fetch_access_token(self.get_callback_code(req)))
+
+    async def async_get_access_token(self, req) -> OAuthIdentity:
+        return self._parse_access_token(await self._async_fetch_access_token(self.get_callback_code(req)))
 
-    def redirect_url(self) -> str:
-        arg_list = ["client_id",]
-        full_url = "%s/authorize?%s" % (self.API.OAUTH_API,
-                                        self.make_url(arg_list))
-        return full_url
-
-    def get_access_token(self, req: Request) -> dict:
-        arg_list = ["client_id", "client_secret"]
-        full_url = "%s/access_token?%s&accept=:json&code=%s" % (self.API.OAUTH_API,
-                                                                self.make_url(
-                                                                    arg_list),
-                                                                self.get_callback_code(req))
-        resp = requests.post(full_url, headers={"accept": 'application/json'})
-        resp_dict = utils.parse_json(resp.json(), "access_token", (
-            "access_token",
-        ))
-        setattr(g, "_%s" % self.name, resp_dict)
-        return resp_dict
-
-    def get_user_info(self):
+    def refresh_access_token(self, refresh_token: str) -> t.Optional[OAuthIdentity]:
+        full_url = "%s&grant_type=refresh_token&refresh_token=%s" % (
+            self.access_token_url, urllib.parse.quote(refresh_token, safe=""))
+        resp = self._request("POST", full_url, headers={"accept": 'application/json'})
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise UpstreamUnavailable("刷新token失败: HTTP %d" % resp.status_code)
+        data = schema.loads(resp.content)
+        fields = self.TOKEN_SCHEMA.extract(data)
+        if fields:
+            return OAuthIdentity(self.Type, **fields)
+        error = data.get("error") if isinstance(data, dict) else None
+        if error in self.INVALID_GRANT_ERRORS:
+            return None
+        raise UpstreamUnavailable("刷新token失败: %s" % (error or "HTTP %d" % resp.status_code))
+
+    def get_user_info(self) -> OAuthIdentity:
         return self.get_user_info_by_token(self.get_token())
 
-    def get_user_info_by_token(self, token: str) -> dict:
+    async def async_get_user_info(self) -> OAuthIdentity:
+        return await self.async_get_user_info_by_token(self.get_token())
+
+    def _user_info_request(self, token: str, uid: str = None) -> tuple:
+        return "GET", self.API.GET_USER_INFO_API, {
+            "Authorization": "Bearer " + token,
+            "accept": 'application/json'
+        }
+
+    def get_user_info_by_token(self, token: str) -> OAuthIdentity:
         """
         获取用户信息
         """
-        resp = requests.get(self.API.GET_USER_INFO_API, headers={
-            "Authorization": "Bearer " + token,
-            "accept": 'application/json'
-        })
-        resp_dict = utils.parse_json(resp.json(), "id", (
-            "id",
-            "login",
-            "avatar_url",
-        ))
-        origin_dict = getattr(g, "_%s" % self.name, {})
-        origin_dict.update(resp_dict)
-        setattr(g, "_%s" % self.name, origin_dict)
-        return resp.json()
-
-    def get_username(self):
-        return self.get_info("login")
+        return self._parse_user_info(self._fetch_user_info(token), token)
+
+    async def async_get_user_info_by_token(self, token: str) -> OAuthIdentity:
+        """
+        获取用户信息(异步)
+        """
+        return self._parse_user_info(await self._async_fetch_user_info(token), token)
@@ -21,13 +21,29 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import contextlib
 import datetime
+import functools
+import secrets
+import threading
+import time
 import typing as t
 import urllib.parse
 
-from flask import Flask, g
-from flask.wrappers import Request
-from oauth2link.callback import BaseCallBackHandler
+from oauth2link import context, deadline, metrics, schema, transport, utils
+from oauth2link.breaker import get_breaker
+from oauth2link.cache import MISSING, AccountCache, ProfileCache, get_account_cache, get_shared_backend
+from oauth2link.context import get_state, set_state
+from oauth2link.exceptions import DeadlineExceeded
+from oauth2link.identity import OAuthIdentity
+from oauth2link.ratelimit import RateLimiter, get_bucket
+from oauth2link.types import DEFAULT_TABLE_NAME
+
+if t.TYPE_CHECKING:
+    import requests
+    import sqlalchemy as sa
+    from flask import Flask
+    from oauth2link.writer import WriteBehindWriter
 
 
 class Base:
@@ -38,69 +54,585 @@ class Base:
     DEFAULT_CONFIG = {
         "redirect_uri": "",  # 回调地址
     }
-    CALLBACK_HANDLER = BaseCallBackHandler  # 回调处理器
+    CALLBACK_HANDLER = None  # 回调处理器, 默认为BaseCallBackHandler
     API = None  # api地址
+    AUTHORIZE_ARGS = ()     # 授权地址中的配置参数
+    TOKEN_SCHEMA = None     # token接口响应结构, 归一化为 token/expires/refresh_token/uid
+    PROFILE_SCHEMA = None   # 用户信息接口响应结构, 归一化为 uid/username/avatar
+    STATE_COOKIE = "oauth2link_browser"     # 登录时写入的浏览器标识, 回调时校验state由同一浏览器发起
+    ACCESS_TOKEN_ARGS = ()  # token地址中的配置参数
 
     __TABLE = "LINKS_TABLE_NAME"    # 表名配置
-    __TABLE_NAME = "link_oauths"    # 表名
+    __TABLE_NAME = DEFAULT_TABLE_NAME   # 表名
     __Model = None                  # 表模型
     __DB = None                     # db对象
+    __Engine = None                 # 非Flask环境下的数据库引擎
+    __Table = None                  # 非Flask环境下的表对象
+    __Writer = None                 # 异步批量写入器
+    __Pending = None                # 待绑定的表模型参数, 首次使用时绑定
+    __Lock = threading.Lock()
+    __WriterLock = threading.Lock()
+
+    __CREATE_TABLES = "LINKS_CREATE_TABLES"     # 建表时机: True启动时, "lazy"首次使用时, False不建表
+
+    __STATE_SECRET = "LINKS_STATE_SECRET"       # state签名密钥, 列表时第一个用于签名(密钥轮换)
+    __STATE_MAX_AGE = "LINKS_STATE_MAX_AGE"     # state有效期(秒)
+
+    __HTTP_POOL_SIZE = "LINKS_HTTP_POOL_SIZE"   # 单个host连接池大小配置
+    __HTTP_TIMEOUT = "LINKS_HTTP_TIMEOUT"       # 请求超时配置, 如 "3,10"
+    __HTTP_PREWARM = "LINKS_HTTP_PREWARM"       # 是否在init_app时预热连接
+    __HTTP_RETRIES = "LINKS_HTTP_RETRIES"       # 限流或临时错误时的重试次数
+
+    __RATE_LIMIT = "LINKS_RATE_LIMIT"           # 每秒请求数上限, 配置后开启限流
+    __RATE_BURST = "LINKS_RATE_BURST"           # 突发请求数
+
+    __CALLBACK_BUDGET = "LINKS_CALLBACK_BUDGET"     # 回调处理的总时间预算(秒)
+    __CALLBACK_CONCURRENCY = "LINKS_CALLBACK_CONCURRENCY"   # 每个平台同时处理的回调数, 配置后开启并发控制
+    __CALLBACK_QUEUE = "LINKS_CALLBACK_QUEUE"               # 排队等待的回调数, 默认与并发数相同
+    __CALLBACK_QUEUE_TIMEOUT = "LINKS_CALLBACK_QUEUE_TIMEOUT"   # 排队等待时间(秒)
+    __CALLBACK_RETRY_AFTER = "LINKS_CALLBACK_RETRY_AFTER"   # 拒绝时返回的Retry-After(秒)
+    __BREAKER = "LINKS_BREAKER"                     # 是否开启熔断
+    __BREAKER_OPTIONS = {                           # 熔断器配置
+        "LINKS_BREAKER_WINDOW": ("window", int),            # 统计最近的调用次数
+        "LINKS_BREAKER_MIN_CALLS": ("min_calls", int),      # 最少调用次数
+        "LINKS_BREAKER_ERROR_RATE": ("error_rate", float),  # 失败率阈值
+        "LINKS_BREAKER_SLOW_CALL": ("slow_call", float),    # 慢调用耗时(秒)
+        "LINKS_BREAKER_SLOW_RATE": ("slow_rate", float),    # 慢调用率阈值
+        "LINKS_BREAKER_RESET": ("reset_timeout", float),    # 熔断持续时间(秒)
+    }
+
+    __METRICS = "LINKS_METRICS"             # 是否开启内置的Prometheus指标汇总
+    __METRICS_URI = "LINKS_METRICS_URI"     # Prometheus指标路由, 配置后同时开启指标
 
-    def __init__(self, app=None):
+    __SHARED_CACHE = "LINKS_SHARED_CACHE"   # 多进程共用的缓存文件路径, 如 "/dev/shm/oauth2link.cache"
+    __SHARED_CACHE_SLOTS = "LINKS_SHARED_CACHE_SLOTS"           # 共享缓存槽位数
+    __SHARED_CACHE_SLOT_SIZE = "LINKS_SHARED_CACHE_SLOT_SIZE"   # 共享缓存槽位大小(字节)
+
+    __PROFILE_CACHE_TTL = "LINKS_PROFILE_CACHE_TTL"     # 用户信息缓存时间(秒), 配置后开启缓存
+    __PROFILE_CACHE_SIZE = "LINKS_PROFILE_CACHE_SIZE"   # 用户信息缓存容量
+
+    __ACCOUNT_CACHE_TTL = "LINKS_ACCOUNT_CACHE_TTL"     # 账号查询缓存时间(秒), 配置后开启缓存
+    __ACCOUNT_CACHE_NEGATIVE_TTL = "LINKS_ACCOUNT_CACHE_NEGATIVE_TTL"   # 未绑定账号的缓存时间(秒)
+    __ACCOUNT_CACHE_SIZE = "LINKS_ACCOUNT_CACHE_SIZE"   # 账号查询缓存容量
+
+    __SINGLE_FLIGHT = "LINKS_SINGLE_FLIGHT"     # 是否合并重复回调(相同code)及相同token的用户信息请求
+    __SINGLE_FLIGHT_TTL = "LINKS_SINGLE_FLIGHT_TTL"     # 授权结果保留时间(秒), 期间重复回调直接返回结果
+
+    __FLASK_G = "LINKS_FLASK_G"     # 授权信息是否同时写入flask.g(兼容旧代码)
+
+    __UPSERT = "LINKS_UPSERT"   # 是否使用单语句upsert保存账号
+
+    __WRITE_BEHIND = "LINKS_WRITE_BEHIND"                   # 是否开启异步批量写入
+    __WRITE_BEHIND_BATCH = "LINKS_WRITE_BEHIND_BATCH"       # 每批写入条数
+    __WRITE_BEHIND_INTERVAL = "LINKS_WRITE_BEHIND_INTERVAL"  # 写入间隔(毫秒)
+    __WRITE_BEHIND_MAXSIZE = "LINKS_WRITE_BEHIND_MAXSIZE"   # 队列容量
+    __WRITE_BEHIND_RETRIES = "LINKS_WRITE_BEHIND_RETRIES"   # 同一账号连续写入失败的次数上限
+
+    def __init__(self, app=None, session: t.Optional["requests.Session"] = None,
+                 profile_cache: t.Optional[ProfileCache] = None, db=None,
+                 account_cache: t.Optional[AccountCache] = None):
         self.name = self.__module__.rsplit(".", 1)[-1]
+        self.tenant = None          # 所属租户, 由TenantRegistry创建时设置
+        # 复制类级别的默认配置, 同一进程中的多个实例(应用/租户)互不影响
+        self.DEFAULT_CONFIG = dict(self.DEFAULT_CONFIG)
+        self._oauth_state_key = "%s_oauth_state" % self.name
+        self.pool_size = transport.DEFAULT_POOL_SIZE
+        self.timeout = transport.DEFAULT_TIMEOUT
+        self._session = session
+        self._async_sessions = transport.AsyncSessions()   # 每个事件循环一个异步会话
+        self.profile_cache = profile_cache
+        self.account_cache = account_cache
+        self.token_flight = None    # 合并相同code的token请求, 开启后为SingleFlight
+        self.profile_flight = None  # 合并相同token的用户信息请求
+        self.upsert = False
+        self.write_behind = None    # 异步批量写入配置, 开启后为WriteBehindWriter参数
+        self.login_uri = None       # 内置登录跳转路由
+        self.state_signer = None    # state签名器, 配置密钥后开启state校验
+        self.pkce = False
+        self.rate_limiter = None    # 限流器, 配置速率后开启
+        self.callback_budget = None  # 回调处理的总时间预算(秒)
+        self.breaker = None         # 熔断器
+        self.admission = None       # 回调并发控制器
+        self.metrics_uri = None     # Prometheus指标路由
+        self._authorize_url = None
+        self._access_token_url = None
         if app is not None:
-            self.init_app(app)
+            self.init_app(app, db=db)
 
     @classmethod
-    def oauth_models(cls, app: Flask, table: str) -> None:
+    def oauth_models(cls, app: "Flask", table: str, db=None, create_tables: bool = True) -> None:
+        """
+        绑定表模型, 可传入应用已有的SQLAlchemy对象以共用引擎及连接池
+        """
         if not (cls.__Model and cls.__DB):
-            from flask_sqlalchemy import SQLAlchemy
-            db = SQLAlchemy(app)
+            from oauth2link import models
+
+            if db is None:
+                from flask_sqlalchemy import SQLAlchemy
+                db = SQLAlchemy(app)
 
             class Oauth(db.Model):
-                __tablename__ = table
-
-                id = db.Column(db.Integer, primary_key=True)
-                user = db.Column(db.Integer, comment="用户表id")
-                username = db.Column(db.String(1024), comment="用户名")
-                realname = db.Column(db.String(1024), comment="用户第三方名")
-                source = db.Column(db.String(1024), comment="来源")
-                access_token = db.Column(db.String(1024), comment="授权token")  # noqa
-                avatar = db.Column(db.String(1024), comment="头像")
-                expires = db.Column(db.DateTime, comment="过期时间")
-                createtime = db.Column(db.DateTime, default=datetime.datetime.now)  # noqa
-                modifytime = db.Column(db.DateTime, default=datetime.datetime.now)  # noqa
-
-            with app.app_context():
-                db.create_all()
+                __table__ = models.make_table(db.metadata, table)
+
+            if create_tables:
+                # 只创建账号表, 不影响共用db中的其他表
+                with app.app_context():
+                    models.create_table(db.engine, Oauth.__table__)
 
             cls.__Model = Oauth
             cls.__DB = db
 
-    def init_app(self, app: Flask):
+    @classmethod
+    def _bind_models(cls) -> tuple:
+        """
+        首次使用时绑定表模型
+        """
+        if Base.__Model is None and Base.__Pending is not None:
+            with Base.__Lock:
+                if Base.__Model is None:
+                    Base.oauth_models(**Base.__Pending)
+                    Base.__Pending = None
+        return Base.__DB, Base.__Model
+
+    @classmethod
+    def bind_engine(cls, engine: "sa.engine.Engine", table: str = DEFAULT_TABLE_NAME,
+                    create: bool = True) -> None:
+        """
+        非Flask环境下绑定数据库引擎, 使用SQLAlchemy Core读写账号表
+        """
+        import sqlalchemy as sa
+        from oauth2link import models
+
+        metadata = sa.MetaData()
+        oauth_table = models.make_table(metadata, table)
+        if create:
+            models.create_table(engine, oauth_table)
+        Base.__Engine = engine
+        Base.__Table = oauth_table
+
+    @classmethod
+    def ensure_indexes(cls, dedupe: bool = False) -> t.List[str]:
+        """
+        为已有账号表补充字段及索引, 可重复执行; Flask环境下需在应用上下文中调用
+
+        存在重复的 (source, username) 记录时抛出DuplicateAccountsError, dedupe为True时先删除重复记录
+        """
+        from oauth2link import models
+
+        if Base.__Engine is not None:
+            models.ensure_columns(Base.__Engine, Base.__Table)
+            return models.ensure_indexes(Base.__Engine, Base.__Table, dedupe)
+        db, model = Base._bind_models()
+        models.ensure_columns(db.engine, model.__table__)
+        return models.ensure_indexes(db.engine, model.__table__, dedupe)
+
+    @classmethod
+    def flush_writer(cls, timeout: t.Optional[float] = None) -> bool:
+        """
+        等待异步批量写入队列中的数据全部落库
+        """
+        if Base.__Writer is None:
+            return True
+        return Base.__Writer.flush(timeout)
+
+    @classmethod
+    def close_writer(cls, timeout: t.Optional[float] = 5) -> None:
+        """
+        关闭异步批量写入器并写入剩余数据, 应用退出前调用(进程退出时也会自动调用)
+        """
+        with Base.__WriterLock:
+            writer, Base.__Writer = Base.__Writer, None
+        if writer is not None:
+            writer.close(timeout)
+
+    def get_writer(self) -> "WriteBehindWriter":
+        """
+        获取异步批量写入器, 首次使用时创建, 所有平台共用
+        """
+        if Base.__Writer is None:
+            with Base.__WriterLock:
+                if Base.__Writer is None:
+                    app = None
+                    if self.db is not None:
+                        from flask import current_app
+                        app = current_app._get_current_object()
+                    from oauth2link.writer import WriteBehindWriter
+
+                    Base.__Writer = WriteBehindWriter(lambda rows: self._write_rows(rows, app),
+                                                      **self.write_behind)
+        return Base.__Writer
+
+    def _write_rows(self, rows: t.List[dict], app=None) -> None:
+        from oauth2link import models
+
+        with self.begin(app) as (conn, table):
+            models.write_accounts(conn, table, rows)
+        if self.account_cache is not None:
+            for row in rows:
+                self.account_cache.invalidate(row["source"], row["username"])
+
+    @property
+    def account_table(self) -> "sa.Table":
+        """
+        获取账号表对象
+        """
+        if self.db is None:
+            return self.sql_table
+        return self.sql_session_model.__table__
+
+    @contextlib.contextmanager
+    def begin(self, app=None) -> t.Iterator[t.Tuple["sa.engine.Connection", "sa.Table"]]:
+        """
+        开启账号表的数据库事务, Flask环境下需传入app或处于应用上下文中
+
+            with links.begin(app) as (conn, table):
+                ...
+        """
+        if self.db is None:
+            with self.engine.begin() as conn:
+                yield conn, self.sql_table
+            return
+        ctx = app.app_context() if app is not None else contextlib.nullcontext()
+        with ctx, self.db.engine.begin() as conn:
+            yield conn, self.sql_session_model.__table__
+
+    def configure(self, config: t.Mapping) -> None:
+        """
+        读取配置, 不依赖具体web框架
+        """
         app_config = dict()
 
         for key in self.DEFAULT_CONFIG:
             _key = ("%s%s" % (self.DEFAULT_PREFIX, key)).upper()
-            if _key in app.config:
-                app_config[key] = app.config[_key]
+            if _key in config:
+                app_config[key] = config[_key]
 
         self.DEFAULT_CONFIG.update(app_config)
 
-        if self.__TABLE in app.config:
-            self.__TABLE_NAME = app.config[self.__TABLE]
+        if self.__TABLE in config:
+            self.__TABLE_NAME = config[self.__TABLE]
+
+        if self.__HTTP_POOL_SIZE in config:
+            self.pool_size = int(config[self.__HTTP_POOL_SIZE])
+        if self.__HTTP_TIMEOUT in config:
+            self.timeout = transport.parse_timeout(config[self.__HTTP_TIMEOUT])
+        if config.get(self.__HTTP_PREWARM):
+            transport.prewarm(self.session, self.get_api_urls(), self.timeout)
+
+        self.login_uri = config.get("%sLOGIN_URI" % self.DEFAULT_PREFIX, self.login_uri)
+
+        self.metrics_uri = config.get(self.__METRICS_URI, self.metrics_uri)
+        if config.get(self.__METRICS) or self.metrics_uri:
+            metrics.add_sink(metrics.registry)
 
-        callback_url = self.get_callback_url()
-        app.add_url_rule(callback_url,
-                         view_func=self.CALLBACK_HANDLER.as_view(name="Oauth2_%s" % self.name,
-                                                                 oauth_client=self))
-        Base.oauth_models(app, self.__TABLE_NAME)
+        budget = config.get("%sCALLBACK_BUDGET" % self.DEFAULT_PREFIX, config.get(self.__CALLBACK_BUDGET))
+        if budget:
+            self.callback_budget = float(budget)
 
-    def make_url(self, arg_list: t.List[str]) -> str:
-        url = "&".join(["%s=%s" % (k, v)
-                       for k, v in self.DEFAULT_CONFIG.items() if k in arg_list])
+        concurrency = config.get("%sCALLBACK_CONCURRENCY" % self.DEFAULT_PREFIX,
+                                 config.get(self.__CALLBACK_CONCURRENCY))
+        if concurrency and self.admission is None:
+            from oauth2link.admission import get_admission
+
+            queue = config.get(self.__CALLBACK_QUEUE)
+            self.admission = get_admission(
+                self.Type, limit=int(concurrency),
+                queue_size=int(queue) if queue is not None else None,
+                queue_timeout=float(config.get(self.__CALLBACK_QUEUE_TIMEOUT, 1)),
+                retry_after=int(config.get(self.__CALLBACK_RETRY_AFTER, 1)))
+
+        if config.get("%sBREAKER" % self.DEFAULT_PREFIX, config.get(self.__BREAKER)) and self.breaker is None:
+            options = {name: cast(config[key]) for key, (name, cast) in self.__BREAKER_OPTIONS.items()
+                       if key in config}
+            self.breaker = get_breaker(self.Type, **options)
+
+        # 平台级配置(如LINKS_GITHUB_RATE_LIMIT)优先于全局配置
+        rate = config.get("%sRATE_LIMIT" % self.DEFAULT_PREFIX, config.get(self.__RATE_LIMIT))
+        if rate and self.rate_limiter is None:
+            burst = config.get("%sRATE_BURST" % self.DEFAULT_PREFIX, config.get(self.__RATE_BURST))
+            bucket = get_bucket(self.Type, self.DEFAULT_CONFIG.get("client_id", ""), float(rate),
+                                float(burst) if burst else None)
+            self.rate_limiter = RateLimiter(bucket, int(config.get(self.__HTTP_RETRIES, 2)),
+                                            platform=self.Type)
+
+        # 配置共享缓存后, 用户信息、账号查询、state防重放及授权结果均保存在多进程共用的缓存中
+        shared = None
+        if config.get(self.__SHARED_CACHE):
+            shared = get_shared_backend(config[self.__SHARED_CACHE],
+                                        slots=int(config.get(self.__SHARED_CACHE_SLOTS, 16384)),
+                                        slot_size=int(config.get(self.__SHARED_CACHE_SLOT_SIZE, 2048)))
+
+        if config.get(self.__STATE_SECRET) and self.state_signer is None:
+            from oauth2link.state import StateSigner
+
+            self.state_signer = StateSigner(config[self.__STATE_SECRET],
+                                            int(config.get(self.__STATE_MAX_AGE, 600)),
+                                            replay_cache=shared)
+        self.pkce = bool(config.get("%sPKCE" % self.DEFAULT_PREFIX, self.pkce))
+
+        if config.get(self.__FLASK_G):
+            context.enable_g_shim()
+
+        if self.__UPSERT in config:
+            self.upsert = bool(config[self.__UPSERT])
+
+        if config.get(self.__WRITE_BEHIND):
+            self.write_behind = dict(
+                batch_size=int(config.get(self.__WRITE_BEHIND_BATCH, 100)),
+                interval=float(config.get(self.__WRITE_BEHIND_INTERVAL, 50)) / 1000,
+                maxsize=int(config.get(self.__WRITE_BEHIND_MAXSIZE, 10000)),
+                max_retries=int(config.get(self.__WRITE_BEHIND_RETRIES, 5)),
+            )
+
+        # 平台级配置(如LINKS_GITHUB_PROFILE_CACHE_TTL)优先于全局配置
+        cache_ttl = config.get("%sPROFILE_CACHE_TTL" % self.DEFAULT_PREFIX,
+                               config.get(self.__PROFILE_CACHE_TTL))
+        if cache_ttl and self.profile_cache is None:
+            self.profile_cache = ProfileCache(shared, ttl=float(cache_ttl),
+                                              maxsize=int(config.get(self.__PROFILE_CACHE_SIZE, 1024)))
+
+        if config.get(self.__ACCOUNT_CACHE_TTL) and self.account_cache is None:
+            self.account_cache = get_account_cache(
+                ttl=float(config[self.__ACCOUNT_CACHE_TTL]),
+                negative_ttl=float(config.get(self.__ACCOUNT_CACHE_NEGATIVE_TTL, 10)),
+                maxsize=int(config.get(self.__ACCOUNT_CACHE_SIZE, 10000)),
+                backend=shared)
+
+        if config.get(self.__SINGLE_FLIGHT):
+            from oauth2link.singleflight import get_single_flight
+
+            self.token_flight = get_single_flight(
+                "token", ttl=float(config.get(self.__SINGLE_FLIGHT_TTL, 30)), backend=shared)
+            self.profile_flight = get_single_flight("profile")
+
+        self.compile_urls()
+
+    def init_app(self, app: "Flask", db=None):
+        from oauth2link.adapters import flask as flask_adapter
+
+        self.configure(app.config)
+        flask_adapter.register_state(app)
+        flask_adapter.register_callback(self, app)
+        flask_adapter.register_cli(self, app)
+        if self.login_uri:
+            flask_adapter.register_login(self, app)
+        if self.metrics_uri:
+            flask_adapter.register_metrics(self, app)
+        self.init_models(app, db)
+
+    def init_models(self, app: "Flask", db=None) -> None:
+        """
+        为Flask应用绑定账号表模型, 按LINKS_CREATE_TABLES决定建表时机; 所有平台共用, 只绑定一次
+        """
+        if Base.__Model is not None or Base.__Pending is not None:
+            return
+        create_tables = app.config.get(self.__CREATE_TABLES, True)
+        if db is None:
+            # SQLAlchemy需在首个请求前注册到app, 创建引擎不会连接数据库
+            from flask_sqlalchemy import SQLAlchemy
+            db = SQLAlchemy(app)
+        Base.__Pending = dict(app=app, table=self.__TABLE_NAME, db=db,
+                              create_tables=bool(create_tables))
+        if create_tables is True:
+            Base._bind_models()
+
+    @property
+    def table_name(self) -> str:
+        return self.__TABLE_NAME
+
+    @property
+    def session(self) -> "requests.Session":
+        """
+        获取当前平台的HTTP会话(连接池)
+        """
+        if self._session is None:
+            self._session = transport.build_session(self.pool_size)
+        return self._session
+
+    @session.setter
+    def session(self, session: "requests.Session"):
+        self._session = session
+
+    def close(self):
+        """
+        关闭HTTP会话, 释放连接池
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    @property
+    def async_session(self):
+        """
+        获取当前事件循环的异步HTTP会话, 异步连接不能跨事件循环复用
+        """
+        import asyncio
+
+        return self._async_sessions.get(
+            asyncio.get_running_loop(),
+            lambda: transport.build_async_session(self.pool_size, self.timeout))
+
+    async def async_close(self):
+        """
+        关闭当前事件循环的异步HTTP会话; 每个请求使用新事件循环时(如Flask异步视图)需在请求结束时调用
+        """
+        import asyncio
+
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.aclose()
+
+    def get_api_urls(self) -> t.List[str]:
+        """
+        获取平台使用的接口地址
+        """
+        return [v for k, v in vars(self.API).items()
+                if k.endswith("_API") and isinstance(v, str)] if self.API else []
+
+    def _request(self, method: str, url: str, app_quota: bool = True, **kwargs) -> "requests.Response":
+        """
+        通过连接池发起请求; app_quota为False表示请求使用用户token, 平台按用户计算额度
+        """
+        import requests
+
+        kwargs["timeout"] = deadline.clamp_timeout(kwargs.get("timeout", self.timeout))
+        send = functools.partial(self._send, method, url, **kwargs)
+        try:
+            if self.rate_limiter is None:
+                return send()
+            # 只有幂等请求在连接错误及网关错误时重试, 授权code及refresh_token只能使用一次
+            idempotent = method == "GET"
+            retry_errors = (requests.ConnectionError,) if idempotent else ()
+            return self.rate_limiter.call(send, retry_errors, idempotent, app_quota)
+        except requests.Timeout as e:
+            # 超时由时间预算收紧导致时, 统一按超出预算处理
+            if not deadline.allows(0):
+                raise DeadlineExceeded("请求 %s 超出回调时间预算" % url) from e
+            raise
+
+    def _send(self, method: str, url: str, **kwargs) -> "requests.Response":
+        if self.breaker is None and not metrics.enabled():
+            return self.session.request(method, url, **kwargs)
+        if self.breaker is not None:
+            self.breaker.before_call()
+        started = time.monotonic()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+        except Exception:
+            self._record_call(method, None, time.monotonic() - started)
+            raise
+        self._record_call(method, resp.status_code, time.monotonic() - started)
+        return resp
+
+    def _record_call(self, method: str, status: t.Optional[int], elapsed: float) -> None:
+        """
+        记录平台请求结果, 用于熔断及指标统计; status为None表示请求异常
+        """
+        if self.breaker is not None:
+            self.breaker.record(status is not None and status < 500, elapsed)
+        if metrics.enabled():
+            metrics.inc("oauth2link_upstream_requests_total", self.Type, method=method,
+                        status=str(status or "error"))
+            metrics.observe("oauth2link_upstream_seconds", self.Type, elapsed, method=method)
+
+    async def _async_request(self, method: str, url: str, app_quota: bool = True, **kwargs):
+        """
+        通过异步连接池发起请求; app_quota为False表示请求使用用户token, 平台按用户计算额度
+        """
+        if deadline.remaining() is not None:
+            kwargs["timeout"] = transport.to_httpx_timeout(
+                deadline.clamp_timeout(kwargs.get("timeout", self.timeout)))
+        send = functools.partial(self._async_send, method, url, **kwargs)
+        import httpx
+
+        try:
+            if self.rate_limiter is None:
+                return await send()
+            idempotent = method == "GET"
+            retry_errors = (httpx.TransportError,) if idempotent else ()
+            return await self.rate_limiter.async_call(send, retry_errors, idempotent, app_quota)
+        except httpx.TimeoutException as e:
+            if not deadline.allows(0):
+                raise DeadlineExceeded("请求 %s 超出回调时间预算" % url) from e
+            raise
+
+    async def _async_send(self, method: str, url: str, **kwargs):
+        if self.breaker is None and not metrics.enabled():
+            return await self.async_session.request(method, url, **kwargs)
+        if self.breaker is not None:
+            self.breaker.before_call()
+        started = time.monotonic()
+        try:
+            resp = await self.async_session.request(method, url, **kwargs)
+        except Exception:
+            self._record_call(method, None, time.monotonic() - started)
+            raise
+        self._record_call(method, resp.status_code, time.monotonic() - started)
+        return resp
+
+    def callback_deadline(self):
+        """
+        回调处理的时间预算, 未配置时不限制
+
+            with links.callback_deadline():
+                ...
+        """
+        return deadline.deadline(self.callback_budget)
+
+    def admit(self):
+        """
+        回调并发控制, 超出并发及排队限制时抛出AdmissionRejected, 未配置时不限制
+
+            with links.callback_deadline(), links.admit():
+                ...
+        """
+        if self.admission is None:
+            return contextlib.nullcontext()
+        return self.admission.admit()
+
+    @contextlib.asynccontextmanager
+    async def async_admit(self) -> t.AsyncIterator[None]:
+        """
+        回调并发控制(异步)
+
+            async with links.async_admit():
+                ...
+        """
+        if self.admission is None:
+            yield
+            return
+        async with self.admission.async_admit():
+            yield
+
+    def make_url(self, arg_list: t.Iterable[str]) -> str:
+        url = urllib.parse.urlencode([(k, self.DEFAULT_CONFIG[k]) for k in arg_list
+                                      if k in self.DEFAULT_CONFIG],
+                                     quote_via=urllib.parse.quote)
         return url
 
+    def compile_urls(self) -> None:
+        """
+        预编译授权地址及token地址的静态部分, 请求时只需拼接动态参数
+        """
+        if self.API is None:
+            return
+        self._authorize_url = "%s/authorize?%s" % (self.API.OAUTH_API,
+                                                   self.make_url(self.AUTHORIZE_ARGS))
+        self._access_token_url = "%s/access_token?%s" % (self.API.OAUTH_API,
+                                                         self.make_url(self.ACCESS_TOKEN_ARGS))
+
+    @property
+    def authorize_url(self) -> str:
+        if self._authorize_url is None:
+            self.compile_urls()
+        return self._authorize_url
+
+    @property
+    def access_token_url(self) -> str:
+        if self._access_token_url is None:
+            self.compile_urls()
+        return self._access_token_url
+
     def get_callback_url(self) -> str:
         """
         获取回调地址
@@ -113,39 +645,130 @@ class Base:
             return "%s?%s" % (o.path, o.query)
         return o.path
 
-    def get_callback_code(self, req: Request) -> str:
+    def get_callback_code(self, req) -> str:
         """
-        获取回调code
+        获取回调code, 开启state校验时校验失败抛出StateError
         """
-        code = req.args.get("code")
+        if self.state_signer is not None:
+            # 开启合并时由实际发起token请求的回调标记state已使用, 重复回调共享其结果
+            payload = self.state_signer.loads(utils.get_query_arg(req, "state"),
+                                              check_replay=self.token_flight is None,
+                                              audience=self.state_audience,
+                                              browser_id=utils.get_cookie(req, self.STATE_COOKIE))
+            set_state(self._oauth_state_key, payload)
+        code = utils.get_query_arg(req, "code")
         return code
 
-    db = property(lambda *args: Base.__DB)  # 获取db对象
-    sql_session_model = property(lambda *args: Base.__Model)    # 获取表模型对象
+    def get_oauth_state(self) -> dict:
+        """
+        获取本次回调中已校验的state载荷
+        """
+        return get_state(self._oauth_state_key) or {}
+
+    def get_return_url(self) -> t.Optional[str]:
+        """
+        获取授权前记录的回跳地址
+        """
+        return self.get_oauth_state().get("r")
+
+    @property
+    def state_audience(self) -> str:
+        """
+        state绑定的平台及租户, 其他平台或租户的回调不接受该state
+        """
+        if self.tenant:
+            return "%s/%s" % (self.tenant, self.Type)
+        return self.Type
+
+    def get_browser_id(self, req) -> t.Optional[str]:
+        """
+        登录跳转时获取浏览器标识, 已有cookie时复用; 未开启state校验时返回None
+        """
+        if self.state_signer is None:
+            return None
+        browser_id = utils.get_cookie(req, self.STATE_COOKIE)
+        if browser_id and utils.is_token(browser_id):
+            return browser_id
+        return secrets.token_urlsafe(16)
+
+    def state_cookie(self, browser_id: str) -> dict:
+        """
+        浏览器标识cookie的参数(与Flask的set_cookie一致), 回调为跨站跳转, 需使用SameSite=Lax
+        """
+        return {"key": self.STATE_COOKIE, "value": browser_id, "max_age": self.state_signer.max_age,
+                "path": "/", "secure": self.DEFAULT_CONFIG.get("redirect_uri", "").startswith("https:"),
+                "httponly": True, "samesite": "Lax"}
+
+    def make_authorize_url(self, return_url: t.Optional[str] = None,
+                           browser_id: t.Optional[str] = None) -> str:
+        """
+        在预编译的授权地址后拼接state等动态参数; 传入browser_id时state绑定该浏览器,
+        需同时将其写入cookie(见state_cookie)
+        """
+        if self.state_signer is None:
+            return self.authorize_url
+        params = self.state_signer.authorize_params(return_url, self.pkce, self.state_audience, browser_id)
+        return "%s&%s" % (self.authorize_url, urllib.parse.urlencode(params))
+
+    def make_token_query(self, code: str) -> str:
+        """
+        token地址中的动态参数: code及PKCE的code_verifier
+        """
+        query = "code=%s" % urllib.parse.quote(code or "", safe="")
+        payload = self.get_oauth_state()
+        if payload.get("p") and self.state_signer is not None:
+            query += "&code_verifier=%s" % self.state_signer.code_verifier(payload)
+        return query
+
+    db = property(lambda *args: Base._bind_models()[0])  # 获取db对象
+    sql_session_model = property(lambda *args: Base._bind_models()[1])    # 获取表模型对象
+    engine = property(lambda *args: Base.__Engine)  # 获取非Flask环境的数据库引擎
+    sql_table = property(lambda *args: Base.__Table)    # 获取非Flask环境的表对象
 
 
 class BaseOauth2(Base):
 
     Type = None  # 平台类型
+    REFRESH_GRANT = False  # 是否支持refresh_token授权模式
+    INVALID_GRANT_ERRORS = ("invalid_grant", "bad_refresh_token")  # 表示refresh_token已失效的错误码
 
-    def redirect_url(self) -> str:
+    def redirect_url(self, return_url: t.Optional[str] = None, browser_id: t.Optional[str] = None) -> str:
         """
         重定向至第三方认证页面
         """
         raise NotImplementedError
 
-    def get_access_token(self, req: Request) -> dict:
+    def get_access_token(self, req) -> OAuthIdentity:
         """
         获取第三方授权token
         """
         raise NotImplementedError
 
-    def get_user_info(self) -> dict:
+    def get_user_info(self) -> OAuthIdentity:
         """
         获取用户信息
         """
         raise NotImplementedError
 
+    async def async_get_access_token(self, req) -> OAuthIdentity:
+        """
+        获取第三方授权token(异步)
+        """
+        raise NotImplementedError
+
+    def refresh_access_token(self, refresh_token: str) -> t.Optional[OAuthIdentity]:
+        """
+        使用refresh_token换取新的token, 不修改当前请求中的授权信息; 平台明确返回refresh_token失效
+        (INVALID_GRANT_ERRORS)时返回None, 限流、服务端错误等临时失败时抛出UpstreamUnavailable
+        """
+        raise NotImplementedError
+
+    async def async_get_user_info(self) -> OAuthIdentity:
+        """
+        获取用户信息(异步)
+        """
+        raise NotImplementedError
+
     def save_model(self, kwargs):
         """
         存储第三方用户信息至表中
@@ -159,80 +782,351 @@ class BaseOauth2(Base):
         raise NotImplementedError
 
 
+_EMPTY_IDENTITY = OAuthIdentity()
+
+
 class GetInfoMix:
 
+    def get_identity(self) -> t.Optional[OAuthIdentity]:
+        """
+        获取当前请求(或协程)中的授权信息
+        """
+        return get_state(self.name)
+
     def get_info(self, key: str) -> str:
         """
         获取当前线程对象信息
         """
-        return getattr(g, "_%s" % self.name, {}).get(key)
+        return (get_state(self.name) or _EMPTY_IDENTITY).get(key)
 
     def get_token(self):
         """
         获取授权token
         """
-        return self.get_info("access_token")
+        return (get_state(self.name) or _EMPTY_IDENTITY).token
+
+    def get_refresh_token(self):
+        """
+        获取刷新token, 平台不支持时为None
+        """
+        return (get_state(self.name) or _EMPTY_IDENTITY).refresh_token
 
     def get_expires(self):
         """
         获取授权过期时间
         """
-        return self.get_info("expires_in") or 0
+        return (get_state(self.name) or _EMPTY_IDENTITY).expires or 0
 
     def get_uid(self):
         """
         获取用户ID        
         """
-        return self.get_info("id")
+        return (get_state(self.name) or _EMPTY_IDENTITY).uid
 
     def get_username(self):
         """
         获取用户名
         """
-        return self.get_info("username")
+        return (get_state(self.name) or _EMPTY_IDENTITY).username
 
     def get_avatar(self):
         """
         获取用户头像
         """
-        return self.get_info("avatar_url")
+        return (get_state(self.name) or _EMPTY_IDENTITY).avatar
 
 
 class BaseOauth2Impl(GetInfoMix, BaseOauth2):
 
-    def redirect_url(self) -> str:
-        pass
+    def redirect_url(self, return_url: t.Optional[str] = None, browser_id: t.Optional[str] = None) -> str:
+        return self.make_authorize_url(return_url, browser_id)
 
-    def get_access_token(self, req: Request) -> dict:
+    def get_access_token(self, req) -> OAuthIdentity:
         pass
 
-    def get_user_info(self) -> dict:
+    def get_user_info(self) -> OAuthIdentity:
         pass
 
+    def _parse_access_token(self, data: dict) -> OAuthIdentity:
+        """
+        按TOKEN_SCHEMA提取授权信息, 保存至当前请求
+        """
+        identity = OAuthIdentity(self.Type, **(self.TOKEN_SCHEMA.extract(data) or {}))
+        set_state(self.name, identity)
+        return identity
+
+    def _parse_user_info(self, data: dict, token: t.Optional[str] = None) -> OAuthIdentity:
+        """
+        按PROFILE_SCHEMA提取用户信息, 合并至当前请求的授权信息
+        """
+        identity = get_state(self.name)
+        if identity is None:
+            identity = OAuthIdentity(self.Type, token=token)
+            set_state(self.name, identity)
+        return identity.update(self.PROFILE_SCHEMA.extract(data) or {}, raw=data)
+
+    def _check_state_replay(self) -> None:
+        if self.token_flight is not None and self.state_signer is not None:
+            self.state_signer.check_replay(self.get_oauth_state())
+
+    def _token_flight_key(self, method: str, url: str) -> str:
+        """
+        token请求的合并键: 除完整的请求外包含已校验state的随机数及浏览器标识,
+        其他浏览器或state携带相同code时不会命中其他用户的结果
+        """
+        payload = self.get_oauth_state()
+        return self.token_flight.key(method, url, payload.get("n"), payload.get("b"))
+
+    def _fetch_access_token(self, code: str) -> dict:
+        """
+        请求access_token接口, 开启合并时相同code的并发及短时间内的重复回调只请求一次
+        """
+        method, url, headers = self._access_token_request(code)
+
+        def fetch():
+            self._check_state_replay()
+            return schema.loads(self._request(method, url, headers=headers).content)
+
+        if self.token_flight is None:
+            return fetch()
+        # 重复回调需携带相同的code及state; 只保留成功的结果
+        return self.token_flight.do(self._token_flight_key(method, url), fetch,
+                                    remember=self.TOKEN_SCHEMA.extract)
+
+    async def _async_fetch_access_token(self, code: str) -> dict:
+        """
+        请求access_token接口(异步), 开启合并时相同code的并发及短时间内的重复回调只请求一次
+        """
+        method, url, headers = self._access_token_request(code)
+
+        async def fetch():
+            self._check_state_replay()
+            return schema.loads((await self._async_request(method, url, headers=headers)).content)
+
+        if self.token_flight is None:
+            return await fetch()
+        return await self.token_flight.ado(self._token_flight_key(method, url), fetch,
+                                           remember=self.TOKEN_SCHEMA.extract)
+
+    def _fetch_user_info(self, token: str, uid: t.Optional[str] = None, use_cache: bool = True) -> dict:
+        """
+        请求用户信息接口, 开启缓存时优先读取缓存(use_cache=False时跳过读取, 以最新结果更新缓存),
+        开启合并时相同token的并发请求只请求一次
+        """
+        cache = self.profile_cache
+        if cache is not None and use_cache:
+            data = cache.get(self.Type, token, uid)
+            metrics.inc("oauth2link_cache_requests_total", self.Type,
+                        result="miss" if data is MISSING else "hit")
+            if data is not MISSING:
+                return data
+        method, url, headers = self._user_info_request(token, uid)
+
+        def fetch():
+            resp = self._request(method, url, app_quota=False, headers=headers)
+            data = schema.loads(resp.content)
+            if cache is not None and resp.status_code == 200:
+                cache.set(self.Type, token, uid, self.PROFILE_SCHEMA.trim(data))
+            return data
+
+        if self.profile_flight is None:
+            return fetch()
+        return self.profile_flight.do(self.profile_flight.key(self.Type, token, uid), fetch)
+
+    async def _async_fetch_user_info(self, token: str, uid: t.Optional[str] = None) -> dict:
+        """
+        请求用户信息接口(异步), 开启缓存时优先读取缓存, 开启合并时相同token的并发请求只请求一次
+        """
+        cache = self.profile_cache
+        if cache is not None:
+            data = cache.get(self.Type, token, uid)
+            metrics.inc("oauth2link_cache_requests_total", self.Type,
+                        result="miss" if data is MISSING else "hit")
+            if data is not MISSING:
+                return data
+        method, url, headers = self._user_info_request(token, uid)
+
+        async def fetch():
+            resp = await self._async_request(method, url, app_quota=False, headers=headers)
+            data = schema.loads(resp.content)
+            if cache is not None and resp.status_code == 200:
+                cache.set(self.Type, token, uid, self.PROFILE_SCHEMA.trim(data))
+            return data
+
+        if self.profile_flight is None:
+            return await fetch()
+        return await self.profile_flight.ado(self.profile_flight.key(self.Type, token, uid), fetch)
+
+    def fetch_profile(self, token: str, uid: t.Optional[str] = None,
+                      use_cache: bool = True) -> t.Optional[dict]:
+        """
+        获取用户资料并映射为表字段, 不修改当前请求中的授权信息; 获取失败时返回None,
+        use_cache=False时不读取用户信息缓存
+        """
+        profile = self.PROFILE_SCHEMA.extract(self._fetch_user_info(token, uid, use_cache))
+        if profile is None:
+            return None
+        return {"realname": profile.get("username"), "avatar": profile.get("avatar")}
+
+    def invalidate_user_info(self, token: str, uid: t.Optional[str] = None) -> None:
+        """
+        清除用户信息缓存
+        """
+        if self.profile_cache is not None:
+            self.profile_cache.invalidate(self.Type, token, uid)
+
+    def get_model_values(self) -> dict:
+        """
+        获取待保存的账号字段
+        """
+        return dict(
+            username=self.get_uid(),
+            realname=self.get_username(),
+            source=self.Type,
+            access_token=self.get_token(),
+            refresh_token=self.get_refresh_token(),
+            avatar=self.get_avatar(),
+            expires=datetime.datetime.now() + datetime.timedelta(seconds=self.get_expires()),
+            modifytime=datetime.datetime.now(),
+        )
+
     def save_model(self):
         third_token = self.get_token()
         if not third_token:
             return None
-        
-        obj = self.get_model()
+        deadline.check()
+        # 账号缓存只用于读取: 写入前后都清除缓存, 避免其他进程缓存的"未绑定"记录残留
+        self.invalidate_account(self.get_uid())
+        with metrics.timer("oauth2link_db_seconds", self.Type, op="save"):
+            result = self._save_model()
+        self.invalidate_account(self.get_uid())
+        return result
+
+    def _save_model(self):
+        from oauth2link import models
+
+        if self.write_behind:
+            # 异步批量写入, 返回待保存的字段字典
+            values = self.get_model_values()
+            self.get_writer().put((values["source"], values["username"]), values)
+            return values
+
+        if self.db is None and self.engine is not None:
+            with self.engine.begin() as conn:
+                values = self.get_model_values()
+                if self.upsert and models.can_upsert(conn, self.sql_table):
+                    return models.upsert_account(conn, self.sql_table, values)
+                return models.save_account(conn, self.sql_table, values)
+
+        table = self.sql_session_model.__table__
+        if self.upsert and models.can_upsert(self.db.engine, table):
+            # 单语句upsert, 与ORM路径一样返回保存后的模型对象; 支持RETURNING时无需再查询
+            stmt = models.upsert_statement(self.db.engine.dialect.name, table)
+            if models.upsert_returning(self.db.engine.dialect):
+                import sqlalchemy as sa
+
+                query = sa.select(self.sql_session_model).from_statement(stmt.returning(*table.c))
+                obj = self.db.session.scalars(query.execution_options(populate_existing=True),
+                                              self.get_model_values()).one()
+                self.db.session.commit()
+                return obj
+            self.db.session.execute(stmt, self.get_model_values())
+            self.db.session.commit()
+            return self._query_model(self.get_uid())
+
+        # 直接查询数据库判断记录是否存在, 不经过账号缓存
+        obj = self._query_model(self.get_uid())
         if not obj:
-            obj = self.sql_session_model(
-                username=self.get_uid(),
-                realname=self.get_username(),
-                source=self.Type,
-                access_token=self.get_token(),
-                avatar=self.get_avatar(),
-                expires=datetime.datetime.now() + datetime.timedelta(seconds=self.get_expires()),
-            )
+            obj = self.sql_session_model(**self.get_model_values())
             self.db.session.add(obj)
         else:
             obj.access_token = self.get_token()
+            obj.refresh_token = self.get_refresh_token()
             obj.expires = datetime.datetime.now() + datetime.timedelta(seconds=self.get_expires())
             obj.avatar = self.get_avatar()
+            obj.modifytime = datetime.datetime.now()
         self.db.session.commit()
         return obj
 
+    async def async_save_model(self):
+        """
+        存储第三方用户信息至表中(异步), 数据库操作在线程池中执行
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.save_model)
+
     def get_model(self):
-        return self.db.session.query(self.sql_session_model).filter_by(username=self.get_uid(),
-                                                                       source=self.Type).first()
+        return self.get_model_by_uid(self.get_uid())
+
+    def get_model_by_uid(self, uid: str):
+        """
+        根据第三方用户ID查询当前平台的账号记录, 开启账号缓存时命中后按主键读取, 未绑定的账号直接返回None
+        """
+        cache = self.account_cache
+        if cache is None:
+            return self._query_model(uid)
+        value = cache.get(self.Type, uid)
+        if value is None:
+            return None
+        if value is not MISSING:
+            obj = self._query_model_by_id(value["id"])
+            if obj is not None:
+                return obj
+        obj = self._query_model(uid)
+        cache.set(self.Type, uid, obj)
+        return obj
+
+    def find_account(self, uid: str) -> t.Optional[dict]:
+        """
+        查询第三方账号是否已绑定及绑定的本地用户, 返回 id/user/source/username; 开启账号缓存时优先读取缓存
+        """
+        cache = self.account_cache
+        if cache is not None:
+            value = cache.get(self.Type, uid)
+            if value is not MISSING:
+                return value
+        obj = self._query_model(uid)
+        if cache is not None:
+            return cache.set(self.Type, uid, obj)
+        return None if obj is None else {name: getattr(obj, name) for name in AccountCache.FIELDS}
+
+    def invalidate_account(self, uid: str) -> None:
+        """
+        清除账号查询缓存, 在应用中修改账号绑定关系后调用
+        """
+        if self.account_cache is not None:
+            self.account_cache.invalidate(self.Type, uid)
+
+    def _query_model(self, uid: str):
+        with metrics.timer("oauth2link_db_seconds", self.Type, op="get"):
+            if self.db is None and self.engine is not None:
+                from oauth2link import models
+
+                with self.engine.connect() as conn:
+                    return models.get_account(conn, self.sql_table, self.Type, uid)
+            return self.db.session.query(self.sql_session_model).filter_by(username=uid,
+                                                                           source=self.Type).first()
+
+    def _query_model_by_id(self, account_id: int):
+        with metrics.timer("oauth2link_db_seconds", self.Type, op="get_by_id"):
+            if self.db is None and self.engine is not None:
+                from oauth2link import models
+
+                with self.engine.connect() as conn:
+                    return models.get_account_by_id(conn, self.sql_table, account_id)
+            # 会话中已加载的对象直接从identity map返回, 不查询数据库
+            return self.db.session.get(self.sql_session_model, account_id)
+
+    def get_models_by_user(self, user: int) -> list:
+        """
+        查询本地用户绑定的所有第三方账号(含其他平台)
+        """
+        if self.db is None and self.engine is not None:
+            from oauth2link import models
+
+            with self.engine.connect() as conn:
+                return models.get_accounts_by_user(conn, self.sql_table, user)
+        return self.db.session.query(self.sql_session_model).filter_by(user=user) \
+            .order_by(self.sql_session_model.id).all()
 
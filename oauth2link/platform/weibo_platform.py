@@ -21,10 +21,10 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-import requests
-from flask import g
-from flask.wrappers import Request
-from oauth2link import utils
+import urllib.parse
+
+from oauth2link import schema
+from oauth2link.identity import OAuthIdentity
 from oauth2link.types import PlatformType
 
 from .platform import BaseOauth2Impl
@@ -51,50 +51,40 @@ class WeiBoOauth2(BaseOauth2Impl):
     }
     API = WeiBoAccessApi
     Type = PlatformType.WeiBo
+    AUTHORIZE_ARGS = ("client_id", "response_type", "redirect_uri", "scope")
+    ACCESS_TOKEN_ARGS = ("client_id", "client_secret", "redirect_uri", "grant_type")
+    TOKEN_SCHEMA = schema.Schema("access_token", token="access_token",
+                                 expires="expires_in", uid="uid")
+    PROFILE_SCHEMA = schema.Schema("id", username="name", avatar="avatar_hd")
+
+    def _access_token_request(self, code: str) -> tuple:
+        full_url = "%s&%s" % (self.access_token_url, self.make_token_query(code))
+        return "POST", full_url, None
+
+    def get_access_token(self, req) -> OAuthIdentity:
+        return self._parse_access_token(self._fetch_access_token(self.get_callback_code(req)))
 
-    def redirect_url(self) -> str:
-        arg_list = ["client_id", "response_type", "redirect_uri", "scope"]
-        full_url = "%s/authorize?%s" % (self.API.OAUTH_API,
-                                        self.make_url(arg_list))
-        return full_url
-
-    def get_access_token(self, req: Request) -> dict:
-        arg_list = ["client_id", "client_secret", "redirect_uri", "grant_type"]
-        full_url = "%s/access_token?%s&code=%s" % (self.API.OAUTH_API,
-                                                   self.make_url(arg_list),
-                                                   self.get_callback_code(req))
-        resp = requests.post(full_url)
-        resp_dict = utils.parse_json(resp.json(), "access_token", (
-            "access_token",
-            "expires_in",
-            "uid",
-        ))
-        setattr(g, "_%s" % self.name, resp_dict)
-        return resp_dict
-
-    def get_user_info(self) -> dict:
+    async def async_get_access_token(self, req) -> OAuthIdentity:
+        return self._parse_access_token(await self._async_fetch_access_token(self.get_callback_code(req)))
+
+    def get_user_info(self) -> OAuthIdentity:
         return self.get_user_info_by_token(self.get_token(), self.get_uid())
 
-    def get_user_info_by_token(self, token: str, uid: str) -> dict:
+    async def async_get_user_info(self) -> OAuthIdentity:
+        return await self.async_get_user_info_by_token(self.get_token(), self.get_uid())
+
+    def _user_info_request(self, token: str, uid: str) -> tuple:
+        query = urllib.parse.urlencode({"access_token": token, "uid": uid})
+        return "GET", "%s?%s" % (self.API.GET_USER_INFO_API, query), None
+
+    def get_user_info_by_token(self, token: str, uid: str) -> OAuthIdentity:
         """
         获取用户信息
         """
-        resp = requests.get(self.API.GET_USER_INFO_API +
-                            "?access_token=%s&uid=%s" % (token, uid))
-        resp_dict = utils.parse_json(resp.json(), "id", (
-            "name",
-            "avatar_hd",
-        ))
-        origin_dict = getattr(g, "_%s" % self.name, {})
-        origin_dict.update(resp_dict)
-        setattr(g, "_%s" % self.name, origin_dict)
-        return resp.json()
-
-    def get_uid(self):
-        return self.get_info("uid")
-
-    def get_username(self):
-        return self.get_info("name")
-
-    def get_avatar(self):
-        return self.get_info("avatar_hd")
+        return self._parse_user_info(self._fetch_user_info(token, uid), token)
+
+    async def async_get_user_info_by_token(self, token: str, uid: str) -> OAuthIdentity:
+        """
+        获取用户信息(异步)
+        """
+        return self._parse_user_info(await self._async_fetch_user_info(token, uid), token)
@@ -0,0 +1,268 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import random
+import threading
+import time
+import typing as t
+
+from oauth2link import deadline, metrics
+from oauth2link.exceptions import RateLimitExceeded
+
+RETRY_STATUS = (429, 502, 503, 504)  # 幂等请求可重试的状态码
+MIN_RATE_RATIO = 0.1    # 按响应头调整后的速率下限(相对配置速率)
+
+
+async def _sleep(delay: float) -> None:
+    import asyncio
+
+    await asyncio.sleep(delay)
+
+
+class TokenBucket:
+    """
+    令牌桶, 速率可根据平台返回的限流响应头动态调整
+    """
+
+    def __init__(self, rate: float, capacity: t.Optional[float] = None,
+                 min_rate: t.Optional[float] = None):
+        self.base_rate = rate  # 配置的速率上限
+        self.min_rate = rate * MIN_RATE_RATIO if min_rate is None else min_rate    # 调整后的速率下限
+        self.rate = rate  # 每秒补充的令牌数
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.reset_at = None  # 平台额度重置时间(时间戳)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.reset_at is not None and time.time() >= self.reset_at:
+            # 平台额度已重置, 恢复配置的速率
+            self.rate = self.base_rate
+            self.tokens = self.capacity
+            self.reset_at = None
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        预占一个令牌, 返回需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            if self.rate > 0:
+                return -self.tokens / self.rate
+            if self.reset_at is not None:
+                return max(0.0, self.reset_at - time.time())
+            return float("inf")
+
+    def acquire(self, timeout: t.Optional[float] = None) -> bool:
+        wait = self.reserve()
+        if timeout is not None and wait > timeout:
+            self.release()
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def async_acquire(self, timeout: t.Optional[float] = None) -> bool:
+        wait = self.reserve()
+        if timeout is not None and wait > timeout:
+            self.release()
+            return False
+        if wait:
+            await _sleep(wait)
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def update_from_headers(self, headers: t.Mapping) -> None:
+        """
+        根据 X-RateLimit-Remaining/X-RateLimit-Reset 调整速率: 剩余额度平摊到重置前, 不低于min_rate;
+        只应传入按client计算额度的请求(token接口)的响应头, 按用户token计算额度的请求不影响共用的令牌桶
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            window = max(1.0, reset - time.time())
+            self.rate = max(self.min_rate, min(self.base_rate, remaining / window))
+            self.tokens = min(self.tokens, float(remaining))
+            self.reset_at = reset
+
+    def budget(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "tokens": self.tokens,
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "reset_at": self.reset_at,
+            }
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(platform: str, client_id: str, rate: float,
+               capacity: t.Optional[float] = None) -> TokenBucket:
+    """
+    获取 (平台, client_id) 共用的令牌桶
+    """
+    key = (platform, client_id)
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+
+class RateLimiter:
+    """
+    平台请求限流及重试: 请求前获取令牌, 按响应头调整速率, 可重试的错误按带抖动的指数退避重试
+    """
+
+    def __init__(self, bucket: TokenBucket, retries: int = 2, backoff: float = 0.2,
+                 max_backoff: float = 10.0, acquire_timeout: t.Optional[float] = 30.0,
+                 platform: str = ""):
+        self.bucket = bucket
+        self.platform = platform    # 平台类型, 用于指标标签
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.acquire_timeout = acquire_timeout
+        self.retried = 0    # 累计重试次数
+
+    def budget(self) -> dict:
+        """
+        当前剩余额度
+        """
+        return self.bucket.budget()
+
+    def should_retry(self, resp, idempotent: bool = True) -> bool:
+        """
+        非幂等请求(如使用授权code换取token)只在平台明确拒绝处理时重试: 429, 或带Retry-After的503
+        """
+        if idempotent:
+            if resp.status_code in RETRY_STATUS:
+                return True
+        elif resp.status_code == 429 or (resp.status_code == 503 and resp.headers.get("Retry-After")):
+            return True
+        # GitHub额度耗尽时返回403
+        return resp.status_code == 403 and resp.headers.get("X-RateLimit-Remaining") == "0"
+
+    def get_delay(self, attempt: int, resp=None) -> float:
+        """
+        计算重试等待时间: 优先使用Retry-After或额度重置时间, 否则使用全抖动指数退避
+        """
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(self.max_backoff, float(retry_after))
+            reset = resp.headers.get("X-RateLimit-Reset")
+            if resp.headers.get("X-RateLimit-Remaining") == "0" and reset:
+                try:
+                    return min(self.max_backoff, max(0.0, float(reset) - time.time()))
+                except ValueError:
+                    pass    # 格式错误的响应头按指数退避处理
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _acquired(self, ok: bool) -> None:
+        if not ok:
+            raise RateLimitExceeded("等待限流令牌超时")
+
+    def _acquire_timeout(self) -> t.Optional[float]:
+        left = deadline.remaining()
+        if left is None:
+            return self.acquire_timeout
+        if self.acquire_timeout is None:
+            return max(0.0, left)
+        return max(0.0, min(self.acquire_timeout, left))
+
+    def _can_retry(self, attempt: int, delay: float) -> bool:
+        return attempt < self.retries and deadline.allows(delay)
+
+    def call(self, func: t.Callable, retry_errors: t.Tuple = (),
+             idempotent: bool = True, app_quota: bool = True):
+        """
+        执行请求, retry_errors为可安全重试的异常类型(如幂等请求的连接错误);
+        app_quota为False时请求按用户token计算额度, 不按响应头调整共用的速率
+        """
+        attempt = 0
+        while True:
+            self._acquired(self.bucket.acquire(self._acquire_timeout()))
+            try:
+                resp = func()
+            except retry_errors:
+                delay = self.get_delay(attempt)
+                if not self._can_retry(attempt, delay):
+                    raise
+            else:
+                if app_quota:
+                    self.bucket.update_from_headers(resp.headers)
+                if not self.should_retry(resp, idempotent):
+                    return resp
+                delay = self.get_delay(attempt, resp)
+                if not self._can_retry(attempt, delay):
+                    return resp
+            time.sleep(delay)
+            attempt += 1
+            self.retried += 1
+            metrics.inc("oauth2link_retries_total", self.platform)
+
+    async def async_call(self, func: t.Callable, retry_errors: t.Tuple = (),
+                         idempotent: bool = True, app_quota: bool = True):
+        attempt = 0
+        while True:
+            self._acquired(await self.bucket.async_acquire(self._acquire_timeout()))
+            try:
+                resp = await func()
+            except retry_errors:
+                delay = self.get_delay(attempt)
+                if not self._can_retry(attempt, delay):
+                    raise
+            else:
+                if app_quota:
+                    self.bucket.update_from_headers(resp.headers)
+                if not self.should_retry(resp, idempotent):
+                    return resp
+                delay = self.get_delay(attempt, resp)
+                if not self._can_retry(attempt, delay):
+                    return resp
+            await _sleep(delay)
+            attempt += 1
+            self.retried += 1
+            metrics.inc("oauth2link_retries_total", self.platform)
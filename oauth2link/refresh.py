@@ -0,0 +1,138 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import datetime
+import logging
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from oauth2link import models
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    后台刷新token: 按批查询即将过期的账号, 并发调用平台的refresh_token授权, 结果批量写回
+
+        scheduler = RefreshScheduler(links, app=app, window=600)
+        scheduler.start()
+    """
+
+    def __init__(self, oauth_client, app=None, window: float = 600, interval: float = 60,
+                 batch_size: int = 100, workers: int = 8):
+        if not oauth_client.REFRESH_GRANT:
+            raise ValueError("%s 不支持refresh_token授权" % oauth_client.Type)
+        self.oauth_client = oauth_client
+        self.app = app
+        self.window = window
+        self.interval = interval
+        self.batch_size = batch_size
+        self.workers = workers
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = dict(refreshed=0, revoked=0, failed=0)    # 最近一轮的刷新结果
+
+    def _refresh(self, row) -> t.Tuple[str, t.Optional[dict]]:
+        """
+        返回 (结果, 待写入的字段), 结果为 refreshed、revoked(refresh_token已失效) 或 failed
+        """
+        try:
+            data = self.oauth_client.refresh_access_token(row.refresh_token)
+        except Exception:
+            # 网络错误、限流及服务端错误不修改记录, 下一轮重试
+            logger.exception("刷新token失败: id=%s", row.id)
+            return "failed", None
+        now = datetime.datetime.now()
+        if data is None:
+            # 平台明确返回refresh_token已失效, 清除后不再重试
+            return "revoked", dict(_id=row.id, _refresh_token=row.refresh_token,
+                                   access_token=row.access_token, refresh_token=None,
+                                   expires=row.expires, modifytime=now)
+        return "refreshed", dict(
+            _id=row.id,
+            _refresh_token=row.refresh_token,
+            access_token=data.token,
+            refresh_token=data.refresh_token or row.refresh_token,
+            expires=data.expires_at(now),
+            modifytime=now,
+        )
+
+    def run_once(self) -> int:
+        """
+        刷新一轮即将过期的token, 返回刷新成功的条数, 各结果的条数记录在stats中
+        """
+        before = datetime.datetime.now() + datetime.timedelta(seconds=self.window)
+        source = self.oauth_client.Type
+        stats = dict(refreshed=0, revoked=0, failed=0)
+        last_id = 0
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="oauth2link-refresh") as pool:
+            while not self._stop.is_set():
+                with self.oauth_client.begin(self.app) as (conn, table):
+                    rows = models.get_due_accounts(conn, table, source, before,
+                                                   last_id, self.batch_size)
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                updates = []
+                for result, update in pool.map(self._refresh, rows):
+                    stats[result] += 1
+                    if update is not None:
+                        updates.append(update)
+                if updates:
+                    # 只在refresh_token未被其他进程更新时写入, 避免覆盖已轮换的token
+                    with self.oauth_client.begin(self.app) as (conn, table):
+                        models.update_accounts(conn, table, updates, match=("refresh_token",))
+                if len(rows) < self.batch_size:
+                    break
+        self.stats = stats
+        return stats["refreshed"]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+                if any(self.stats.values()):
+                    logger.info("%s token刷新: 成功%d个, 已失效%d个, 失败%d个", self.oauth_client.Type,
+                                self.stats["refreshed"], self.stats["revoked"], self.stats["failed"])
+            except Exception:
+                logger.exception("刷新token任务异常")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self) -> None:
+        """
+        启动后台刷新线程
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="oauth2link-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: t.Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,82 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import json
+import typing as t
+
+_loads = None   # 首次解析时选择JSON解码函数
+
+
+def loads(body: t.Union[bytes, str]) -> t.Any:
+    """
+    解析JSON响应体, 安装orjson时使用orjson
+    """
+    global _loads
+    if _loads is None:
+        try:
+            import orjson
+            _loads = orjson.loads
+        except ImportError:
+            _loads = json.loads
+    return _loads(body)
+
+
+class Schema:
+    """
+    平台响应结构声明: 归一化字段 = 平台字段, required为判断响应有效的平台字段;
+    构造时编译为提取函数, 每次提取只遍历声明的字段
+
+        PROFILE_SCHEMA = Schema("id", uid="id", username="login", avatar="avatar_url")
+    """
+    __slots__ = ("required", "fields", "keys", "extract")
+
+    def __init__(self, required: str, **fields: str):
+        self.required = required
+        self.fields = fields
+        self.keys = tuple(dict.fromkeys((required, *fields.values())))     # 声明的平台字段
+        self.extract = self.compile()
+
+    def trim(self, data: t.Any) -> t.Any:
+        """
+        只保留声明的平台字段, 提取结果不变; 用于缓存平台响应
+        """
+        if not isinstance(data, dict):
+            return data
+        return {key: data[key] for key in self.keys if key in data}
+
+    def compile(self) -> t.Callable[[t.Any], t.Optional[dict]]:
+        """
+        生成提取函数, 响应无效时返回None
+        """
+        required = self.required
+        pairs = tuple(self.fields.items())
+
+        def extract(data: t.Any) -> t.Optional[dict]:
+            if not isinstance(data, dict) or required not in data:
+                return None
+            return {name: data[key] for name, key in pairs if key in data}
+
+        return extract
+
+    def __repr__(self) -> str:
+        return "Schema(%r, %s)" % (self.required, ", ".join("%s=%r" % i for i in self.fields.items()))
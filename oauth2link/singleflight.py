@@ -0,0 +1,185 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import hashlib
+import threading
+import typing as t
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from oauth2link import deadline
+from oauth2link.cache import MISSING, MemoryBackend
+from oauth2link.exceptions import DeadlineExceeded
+
+_RETRY = object()  # 首个调用被中断(如协程取消), 等待方重新发起调用
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用: 首个调用执行, 其余调用等待并共享其结果或异常;
+    ttl大于0时成功结果保留ttl秒, 期间的重复调用直接返回保留的结果
+
+        flight = SingleFlight(ttl=30)
+        data = flight.do(flight.key("token", url), fetch)
+    """
+
+    def __init__(self, ttl: float = 0, maxsize: int = 10000, backend=None):
+        self.ttl = ttl
+        if backend is None and ttl > 0:
+            backend = MemoryBackend(maxsize)
+        self.backend = backend
+        self._calls: t.Dict[t.Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.shared = 0     # 共享结果的调用次数(等待合并及命中保留结果)
+
+    @staticmethod
+    def key(*parts: t.Any) -> str:
+        """
+        生成调用键, 对code、token等敏感参数取摘要, 避免明文保存
+        """
+        return hashlib.sha256("\x00".join(map(str, parts)).encode()).hexdigest()
+
+    def _lookup(self, key: t.Hashable) -> t.Any:
+        if self.backend is None:
+            return MISSING
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self._share()
+        return value
+
+    def _share(self) -> None:
+        with self._lock:
+            self.shared += 1
+
+    def _claim(self, key: t.Hashable) -> t.Tuple[Future, bool]:
+        """
+        返回进行中的调用及当前调用是否为首个调用
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._calls[key] = Future()
+            future.set_running_or_notify_cancel()   # 等待方超时不会取消共享的调用
+            return future, True
+
+    def _finish(self, key: t.Hashable, future: Future, value: t.Any = _RETRY,
+                error: t.Optional[BaseException] = None, remember: bool = False) -> None:
+        # 先保留结果再移除进行中的调用, 避免间隙中的重复调用再次请求
+        if remember and self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def do(self, key: t.Hashable, fn: t.Callable[[], t.Any],
+           remember: t.Optional[t.Callable[[t.Any], t.Any]] = None) -> t.Any:
+        """
+        执行或等待相同键的调用; remember 判断结果是否保留, 默认保留所有成功结果
+        """
+        while True:
+            value = self._lookup(key)
+            if value is not MISSING:
+                return value
+            future, leader = self._claim(key)
+            if not leader:
+                try:
+                    value = future.result(deadline.remaining())
+                except FutureTimeout:
+                    raise DeadlineExceeded("等待合并的调用超出回调时间预算") from None
+                if value is _RETRY:
+                    continue
+                return value
+            value = self._lookup(key)
+            if value is not MISSING:
+                self._finish(key, future, value)
+                return value
+            try:
+                value = fn()
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            except BaseException:
+                self._finish(key, future)
+                raise
+            self._finish(key, future, value, remember=remember is None or bool(remember(value)))
+            return value
+
+    async def ado(self, key: t.Hashable, fn: t.Callable[[], t.Awaitable],
+                  remember: t.Optional[t.Callable[[t.Any], t.Any]] = None) -> t.Any:
+        """
+        异步版本的do, 同步及异步调用之间同样合并
+        """
+        import asyncio
+
+        while True:
+            value = self._lookup(key)
+            if value is not MISSING:
+                return value
+            future, leader = self._claim(key)
+            if not leader:
+                try:
+                    # shield避免等待方取消时连带取消共享的调用
+                    value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                                   deadline.remaining())
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded("等待合并的调用超出回调时间预算") from None
+                if value is _RETRY:
+                    continue
+                return value
+            value = self._lookup(key)
+            if value is not MISSING:
+                self._finish(key, future, value)
+                return value
+            try:
+                value = await fn()
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            except BaseException:
+                self._finish(key, future)
+                raise
+            self._finish(key, future, value, remember=remember is None or bool(remember(value)))
+            return value
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+
+_groups: t.Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_single_flight(name: str, ttl: float = 0, maxsize: int = 10000, backend=None) -> SingleFlight:
+    """
+    获取进程内按名称共用的SingleFlight, 各平台及租户的调用键互不相同, 可共用同一实例
+    """
+    with _groups_lock:
+        flight = _groups.get(name)
+        if flight is None:
+            flight = _groups[name] = SingleFlight(ttl=ttl, maxsize=maxsize, backend=backend)
+        return flight
@@ -0,0 +1,187 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import secrets
+import time
+import typing as t
+
+from oauth2link.cache import MISSING, MemoryBackend
+from oauth2link.exceptions import StateError
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class StateSigner:
+    """
+    无状态的state签名器: state自带过期时间及回跳地址并使用HMAC签名, 校验时无需访问存储;
+    PKCE的code_verifier由nonce派生, 同样无需存储
+
+    state格式: <密钥ID>.<载荷>.<签名>, 第一个密钥用于签名, 所有密钥均可用于校验(密钥轮换);
+    载荷绑定签发的平台/租户(audience)及浏览器标识(browser_id, 登录时写入cookie), 防止跨平台使用及登录CSRF
+    """
+
+    def __init__(self, keys: t.Union[str, bytes, t.Sequence[t.Union[str, bytes]]],
+                 max_age: int = 600, replay_cache=None):
+        if isinstance(keys, (str, bytes)):
+            keys = [keys]
+        self.keys = {}
+        for key in keys:
+            if isinstance(key, str):
+                key = key.encode("utf-8")
+            self.keys.setdefault(hashlib.sha256(key).hexdigest()[:8], key)
+        if not self.keys:
+            raise ValueError("至少需要一个签名密钥")
+        self.current_kid = next(iter(self.keys))
+        self.max_age = max_age
+        # 已使用的nonce, 只需保留到state过期
+        self.replay_cache = replay_cache if replay_cache is not None else MemoryBackend(100000)
+
+    def _sign(self, key: bytes, message: str) -> str:
+        return b64encode(hmac.new(key, message.encode("ascii"), hashlib.sha256).digest())
+
+    def _dumps(self, payload: dict) -> str:
+        body = b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        message = "%s.%s" % (self.current_kid, body)
+        return "%s.%s" % (message, self._sign(self.keys[self.current_kid], message))
+
+    @staticmethod
+    def browser_hash(browser_id: str) -> str:
+        """
+        载荷中只保存浏览器标识的摘要, 避免cookie值随state泄露给第三方平台
+        """
+        return b64encode(hashlib.sha256(browser_id.encode("utf-8")).digest()[:16])
+
+    def _payload(self, return_url: t.Optional[str], pkce: bool,
+                 audience: t.Optional[str], browser_id: t.Optional[str]) -> dict:
+        payload = {"n": secrets.token_urlsafe(12), "e": int(time.time()) + self.max_age}
+        if return_url:
+            payload["r"] = return_url
+        if pkce:
+            payload["p"] = 1
+        if audience:
+            payload["a"] = audience
+        if browser_id:
+            payload["b"] = self.browser_hash(browser_id)
+        return payload
+
+    def dumps(self, return_url: t.Optional[str] = None, pkce: bool = False,
+              audience: t.Optional[str] = None, browser_id: t.Optional[str] = None) -> str:
+        """
+        生成state
+        """
+        return self._dumps(self._payload(return_url, pkce, audience, browser_id))
+
+    def authorize_params(self, return_url: t.Optional[str] = None, pkce: bool = False,
+                         audience: t.Optional[str] = None, browser_id: t.Optional[str] = None) -> dict:
+        """
+        生成授权地址中的state参数, 开启PKCE时同时生成code_challenge
+        """
+        payload = self._payload(return_url, pkce, audience, browser_id)
+        params = {"state": self._dumps(payload)}
+        if pkce:
+            payload["k"] = self.current_kid
+            params["code_challenge"] = self.code_challenge(self.code_verifier(payload))
+            params["code_challenge_method"] = "S256"
+        return params
+
+    def loads(self, state: t.Optional[str], check_replay: bool = True,
+              audience: t.Optional[str] = None, browser_id: t.Optional[str] = None) -> dict:
+        """
+        校验并解析state, 失败时抛出StateError; 返回的载荷中k为签名所用的密钥ID
+
+        audience须与签发时一致; 签发时绑定了浏览器标识的state, 须提供相同的browser_id
+        """
+        try:
+            kid, body, signature = (state or "").split(".")
+        except ValueError:
+            raise StateError("state格式错误")
+        key = self.keys.get(kid)
+        if key is None:
+            raise StateError("state签名密钥不存在")
+        try:
+            message = ("%s.%s" % (kid, body)).encode("ascii")
+            signature = signature.encode("ascii")
+        except UnicodeEncodeError:
+            raise StateError("state格式错误")
+        expected = b64encode(hmac.new(key, message, hashlib.sha256).digest()).encode("ascii")
+        if not hmac.compare_digest(signature, expected):
+            raise StateError("state签名错误")
+
+        try:
+            payload = json.loads(b64decode(body))
+            remaining = payload["e"] - time.time()
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise StateError("state载荷错误")
+        if remaining <= 0:
+            raise StateError("state已过期")
+        if payload.get("a") != audience:
+            raise StateError("state不属于当前平台")
+        if "b" in payload and (not browser_id or not hmac.compare_digest(
+                payload["b"].encode("ascii"), self.browser_hash(browser_id).encode("ascii"))):
+            raise StateError("state与当前浏览器不匹配")
+        if check_replay:
+            self.check_replay(payload)
+        payload["k"] = kid
+        return payload
+
+    def check_replay(self, payload: dict) -> None:
+        """
+        校验state未被使用过并标记为已使用, 重复使用时抛出StateError
+        """
+        nonce_key = ("state", payload["n"])
+        ttl = max(1, payload["e"] - time.time())
+        add = getattr(self.replay_cache, "add", None)
+        if add is not None:
+            # 原子地写入, 并发回调同一state时只有一个成功
+            if not add(nonce_key, 1, ttl):
+                raise StateError("state已被使用")
+            return
+        if self.replay_cache.get(nonce_key) is not MISSING:
+            raise StateError("state已被使用")
+        self.replay_cache.set(nonce_key, 1, ttl)
+
+    def code_verifier(self, payload: dict) -> str:
+        """
+        由state载荷派生PKCE的code_verifier
+        """
+        key = self.keys[payload.get("k", self.current_kid)]
+        return b64encode(hmac.new(key, ("pkce:%s" % payload["n"]).encode("ascii"),
+                                  hashlib.sha256).digest())
+
+    @staticmethod
+    def code_challenge(verifier: str) -> str:
+        """
+        计算S256方式的code_challenge
+        """
+        return b64encode(hashlib.sha256(verifier.encode("ascii")).digest())
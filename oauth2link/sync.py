@@ -0,0 +1,107 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import datetime
+import logging
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from oauth2link import models
+
+logger = logging.getLogger(__name__)
+
+
+class SyncReport:
+    """
+    同步进度
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.processed = 0
+        self.updated = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """
+        每秒处理条数
+        """
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return "%s: 已处理%d条, 更新%d条, 失败%d条, 耗时%.1fs, %.1f条/秒" % (
+            self.source, self.processed, self.updated, self.failed, self.elapsed, self.rate)
+
+
+def sync_profiles(oauth_client, app=None, chunk_size: int = 500, workers: int = 8,
+                  progress: t.Optional[t.Callable[[SyncReport], None]] = None) -> SyncReport:
+    """
+    批量重新同步账号的第三方用户名及头像: 按id分批读取, 线程池并发请求用户信息, 每批批量写回
+    """
+    report = SyncReport(oauth_client.Type)
+
+    def fetch(row):
+        try:
+            # 同步需要平台的最新资料, 不读取缓存; 请求成功后缓存随之更新
+            return row, oauth_client.fetch_profile(row.access_token, row.username, use_cache=False)
+        except Exception:
+            logger.exception("获取用户信息失败: id=%s", row.id)
+            return row, None
+
+    after_id = 0
+    with ThreadPoolExecutor(workers, thread_name_prefix="oauth2link-sync") as pool:
+        while True:
+            # 每批单独查询, 读取期间不占用事务
+            with oauth_client.begin(app) as (conn, table):
+                rows = next(models.iter_account_chunks(conn, table, oauth_client.Type,
+                                                       chunk_size, after_id), [])
+            if not rows:
+                break
+            after_id = rows[-1].id
+
+            now = datetime.datetime.now()
+            updates = []
+            for row, profile in pool.map(fetch, rows):
+                if profile is None:
+                    report.failed += 1
+                    continue
+                updates.append(dict(_id=row.id, realname=profile.get("realname"),
+                                    avatar=profile.get("avatar"), modifytime=now))
+            if updates:
+                with oauth_client.begin(app) as (conn, table):
+                    models.update_accounts(conn, table, updates)
+
+            report.processed += len(rows)
+            report.updated += len(updates)
+            if progress is not None:
+                progress(report)
+            if len(rows) < chunk_size:
+                break
+    return report
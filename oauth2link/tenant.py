@@ -0,0 +1,234 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import collections
+import threading
+import typing as t
+
+from oauth2link import transport
+from oauth2link.cache import get_shared_backend
+from oauth2link.platform import get_platform
+from oauth2link.types import PlatformType
+
+if t.TYPE_CHECKING:
+    from flask import Flask
+
+TenantLoader = t.Callable[[str, str], t.Optional[t.Mapping[str, t.Any]]]
+
+
+class TenantRegistry:
+    """
+    多租户平台注册表: 按 (租户, 平台) 保存client_id/client_secret等配置, 平台实例按需创建并按LRU缓存;
+    同一平台的所有租户共用HTTP连接池及用户信息缓存, 回调路由只注册一条, 按路径中的租户分发
+
+        registry = TenantRegistry(app.config, redirect_uri="https://example.com/oauth2/{tenant}/{platform}/callback")
+        registry.register("acme", "github", client_id="...", client_secret="...")
+        registry.init_app(app)
+    """
+
+    def __init__(self, config: t.Optional[t.Mapping] = None, maxsize: int = 1024,
+                 redirect_uri: t.Optional[str] = None, loader: t.Optional[TenantLoader] = None,
+                 platforms: t.Optional[t.Mapping[str, type]] = None, prefix: str = "/oauth2"):
+        self.config = dict(config or {})    # 所有租户共用的全局配置(LINKS_*)
+        self.maxsize = maxsize              # 缓存的平台实例数上限
+        self.redirect_uri = redirect_uri    # 回调地址模板, 租户未配置redirect_uri时使用
+        self.loader = loader                # 未注册的租户按需加载配置, 如从数据库读取
+        self.platforms = dict(platforms) if platforms else None   # 默认使用全局注册的平台
+        self.prefix = prefix.rstrip("/")    # 回调及登录路由前缀: <prefix>/<tenant>/<platform>/callback
+        self._configs = {}                  # (tenant, platform) -> 租户配置
+        self._clients = collections.OrderedDict()
+        self._sessions = {}                 # platform -> 共用的HTTP会话
+        self._async_sessions = {}           # platform -> 共用的异步HTTP会话(每个事件循环一个)
+        self._caches = {}                   # platform -> 共用的用户信息缓存
+        self._state_signer = None           # 所有租户共用的state签名器及防重放缓存
+        self._lock = threading.Lock()
+
+    def register(self, tenant: str, platform: str, **config) -> None:
+        """
+        注册或更新租户的平台配置, 配置键与平台的DEFAULT_CONFIG一致(client_id、client_secret、redirect_uri、scope等)
+        """
+        if self.get_class(platform) is None:
+            raise ValueError("不支持的平台: %s" % platform)
+        key = (tenant, platform)
+        with self._lock:
+            self._configs[key] = config
+            self._clients.pop(key, None)
+
+    def unregister(self, tenant: str, platform: str) -> None:
+        key = (tenant, platform)
+        with self._lock:
+            self._configs.pop(key, None)
+            self._clients.pop(key, None)
+
+    def __contains__(self, key: t.Tuple[str, str]) -> bool:
+        return key in self._configs
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def get(self, tenant: str, platform: str):
+        """
+        获取租户的平台实例, 未注册时返回None
+        """
+        key = (tenant, platform)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            config = self._configs.get(key)
+        if config is None:
+            if self.loader is None or self.get_class(platform) is None:
+                return None
+            config = self.loader(tenant, platform)
+            if config is None:
+                return None
+            with self._lock:
+                config = self._configs.setdefault(key, dict(config))
+
+        client = self.build(tenant, platform, config)
+        with self._lock:
+            # 并发创建时保留先放入缓存的实例
+            client = self._clients.setdefault(key, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.maxsize:
+                self._clients.popitem(last=False)
+        return client
+
+    def build(self, tenant: str, platform: str, tenant_config: t.Mapping):
+        """
+        创建平台实例: 全局配置 + 租户配置, 预编译授权地址及token地址
+        """
+        cls = self.get_class(platform)
+        config = dict(self.config)
+        config.pop("LINKS_HTTP_PREWARM", None)
+        if "redirect_uri" not in tenant_config and self.redirect_uri:
+            config["%sREDIRECT_URI" % cls.DEFAULT_PREFIX] = self.redirect_uri.format(
+                tenant=tenant, platform=platform)
+        for k, v in tenant_config.items():
+            config[("%s%s" % (cls.DEFAULT_PREFIX, k)).upper()] = v
+
+        client = cls(session=self._get_session(platform), profile_cache=self._caches.get(platform))
+        client._async_sessions = self._async_sessions.setdefault(platform, transport.AsyncSessions())
+        client.tenant = tenant
+        client.state_signer = self._get_state_signer()
+        client.configure(config)
+        if client.profile_cache is not None:
+            self._caches.setdefault(platform, client.profile_cache)
+        return client
+
+    def get_class(self, platform: str) -> t.Optional[type]:
+        """
+        获取平台类, 不支持的平台返回None
+        """
+        if self.platforms is not None:
+            return self.platforms.get(platform)
+        try:
+            return get_platform(platform)
+        except ValueError:
+            return None
+
+    def _get_session(self, platform: str):
+        session = self._sessions.get(platform)
+        if session is None:
+            pool_size = int(self.config.get("LINKS_HTTP_POOL_SIZE", transport.DEFAULT_POOL_SIZE))
+            session = self._sessions.setdefault(platform, transport.build_session(pool_size))
+        return session
+
+    def _get_state_signer(self):
+        """
+        state签名器按注册表创建一次, 已使用的nonce不随平台实例被LRU淘汰而丢失;
+        state绑定了租户及平台, 共用签名器不会跨租户通过校验
+        """
+        if not self.config.get("LINKS_STATE_SECRET"):
+            return None
+        if self._state_signer is None:
+            from oauth2link.state import StateSigner
+
+            replay_cache = None
+            if self.config.get("LINKS_SHARED_CACHE"):
+                replay_cache = get_shared_backend(
+                    self.config["LINKS_SHARED_CACHE"],
+                    slots=int(self.config.get("LINKS_SHARED_CACHE_SLOTS", 16384)),
+                    slot_size=int(self.config.get("LINKS_SHARED_CACHE_SLOT_SIZE", 2048)))
+            signer = StateSigner(self.config["LINKS_STATE_SECRET"],
+                                 int(self.config.get("LINKS_STATE_MAX_AGE", 600)),
+                                 replay_cache=replay_cache)
+            with self._lock:
+                if self._state_signer is None:
+                    self._state_signer = signer
+        return self._state_signer
+
+    def callback_path(self, tenant: str, platform: str) -> str:
+        return "%s/%s/%s/callback" % (self.prefix, tenant, platform)
+
+    def login_path(self, tenant: str, platform: str) -> str:
+        return "%s/%s/%s/login" % (self.prefix, tenant, platform)
+
+    def parse_path(self, path: str) -> t.Optional[t.Tuple[str, str, str]]:
+        """
+        解析路由, 返回 (租户, 平台, callback或login)
+        """
+        if not path.startswith(self.prefix + "/"):
+            return None
+        parts = path[len(self.prefix) + 1:].split("/")
+        if len(parts) != 3 or parts[2] not in ("callback", "login"):
+            return None
+        return parts[0], parts[1], parts[2]
+
+    def init_app(self, app: "Flask", db=None) -> None:
+        """
+        注册到Flask应用: 回调及登录各一条路由, 并绑定账号表模型
+        """
+        from oauth2link.adapters import flask as flask_adapter
+
+        self.config = {**app.config, **self.config}
+        flask_adapter.register_state(app)
+        flask_adapter.register_tenant_routes(self, app)
+        # 账号表模型为所有平台共用, 任取一个平台完成绑定
+        cls = next(iter(self.platforms.values())) if self.platforms else get_platform(PlatformType.GitHub)
+        client = cls()
+        client.configure(self.config)
+        client.init_models(app, db)
+
+    def close(self) -> None:
+        """
+        关闭共用的HTTP会话
+        """
+        with self._lock:
+            self._clients.clear()
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    async def aclose(self) -> None:
+        """
+        关闭当前事件循环中共用的异步HTTP会话
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        for sessions in self._async_sessions.values():
+            session = sessions.pop(loop, None)
+            if session is not None:
+                await session.aclose()
@@ -0,0 +1,232 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import csv
+import datetime
+import json
+import os
+import time
+import typing as t
+
+import sqlalchemy as sa
+
+from oauth2link import models
+
+FORMATS = ("jsonl", "csv")
+
+
+class TransferReport:
+    """
+    导出/导入进度
+    """
+
+    def __init__(self, action: str, rows: int = 0):
+        self.action = action
+        self.rows = 0
+        self.resumed = rows     # 从断点恢复前已处理的行数
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """
+        每秒处理行数
+        """
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return "%s: 已处理%d行(累计%d行), 耗时%.1fs, %.1f行/秒" % (
+            self.action, self.rows, self.resumed + self.rows, self.elapsed, self.rate)
+
+
+def guess_format(path: str, fmt: t.Optional[str] = None) -> str:
+    """
+    未指定格式时按扩展名判断, 默认jsonl
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError("不支持的格式: %s, 可选: %s" % (fmt, ", ".join(FORMATS)))
+    return fmt
+
+
+def load_checkpoint(path: t.Optional[str]) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def save_checkpoint(path: t.Optional[str], **state: t.Any) -> None:
+    """
+    先写临时文件再替换, 中途退出时不会留下不完整的断点
+    """
+    if not path:
+        return
+    tmp = "%s.tmp" % path
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(state, fp)
+    os.replace(tmp, path)
+
+
+def _dump_value(value: t.Any) -> t.Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _converters(table: sa.Table, empty_as_none: bool = False) -> t.Dict[str, t.Callable[[t.Any], t.Any]]:
+    """
+    按列类型还原导出的值, empty_as_none为True时空字符串视为None(csv)
+    """
+    def make(parse):
+        def convert(value):
+            if value is None or (empty_as_none and value == ""):
+                return None
+            return parse(value)
+        return convert
+
+    converters = {}
+    for column in table.columns:
+        if isinstance(column.type, sa.DateTime):
+            converters[column.name] = make(datetime.datetime.fromisoformat)
+        elif isinstance(column.type, sa.Integer):
+            converters[column.name] = make(int)
+        else:
+            converters[column.name] = make(str)
+    return converters
+
+
+def export_accounts(oauth_client, path: str, fmt: t.Optional[str] = None, source: t.Optional[str] = None,
+                    chunk_size: int = 1000, checkpoint: t.Optional[str] = None, app=None,
+                    progress: t.Optional[t.Callable[[TransferReport], None]] = None) -> TransferReport:
+    """
+    按id顺序流式导出账号表至jsonl或csv文件, 每批写入后记录断点(最后的id及文件位置),
+    指定断点文件时从上次中断处继续, 文件中断点之后的不完整内容会被截断
+    """
+    fmt = guess_format(path, fmt)
+    state = load_checkpoint(checkpoint)
+    if not os.path.exists(path):
+        state = {}  # 输出文件不存在时重新导出
+    after_id = state.get("last_id", 0)
+    report = TransferReport("export", state.get("rows", 0))
+
+    if state:
+        os.truncate(path, state["offset"])
+        mode = "a"
+    else:
+        mode = "w"
+    with open(path, mode, encoding="utf-8", newline="") as fp, oauth_client.begin(app) as (conn, table):
+        columns = [c.name for c in table.columns]
+        writer = csv.writer(fp) if fmt == "csv" else None
+        if writer is not None and mode == "w":
+            writer.writerow(columns)
+        for rows in models.stream_accounts(conn, table, source, after_id, chunk_size):
+            if writer is not None:
+                writer.writerows(["" if v is None else _dump_value(v) for v in row] for row in rows)
+            else:
+                fp.writelines("%s\n" % json.dumps(dict(zip(columns, map(_dump_value, row))),
+                                                  ensure_ascii=False, separators=(",", ":"))
+                              for row in rows)
+            fp.flush()
+            report.rows += len(rows)
+            save_checkpoint(checkpoint, last_id=rows[-1].id, offset=fp.tell(),
+                            rows=report.resumed + report.rows)
+            if progress is not None:
+                progress(report)
+    return report
+
+
+class _LineReader:
+    """
+    按行读取并记录已读取的字节数, 用于记录导入断点
+    """
+
+    def __init__(self, fp: t.BinaryIO):
+        self.fp = fp
+        self.offset = fp.tell()
+
+    def __iter__(self) -> "_LineReader":
+        return self
+
+    def __next__(self) -> str:
+        line = self.fp.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8")
+
+
+def import_accounts(oauth_client, path: str, fmt: t.Optional[str] = None, chunk_size: int = 1000,
+                    checkpoint: t.Optional[str] = None, keep_ids: bool = False, app=None,
+                    progress: t.Optional[t.Callable[[TransferReport], None]] = None) -> TransferReport:
+    """
+    流式读取导出文件, 按批写入账号表, 已存在的账号(按 (source, username))更新导入的全部字段,
+    每批提交后记录断点(文件位置), 指定断点文件时从上次中断处继续;
+    keep_ids为True时保留原有id, 导入完成后调整PostgreSQL的id序列
+    """
+    fmt = guess_format(path, fmt)
+    state = load_checkpoint(checkpoint)
+    report = TransferReport("import", state.get("rows", 0))
+
+    with open(path, "rb") as fp:
+        lines = _LineReader(fp)
+        header = next(csv.reader(lines)) if fmt == "csv" else None
+        if state.get("offset"):
+            fp.seek(state["offset"])
+            lines.offset = state["offset"]
+        records = csv.reader(lines) if fmt == "csv" else (json.loads(line) for line in lines if line.strip())
+
+        converters = _converters(oauth_client.account_table, empty_as_none=fmt == "csv")
+        columns = None
+        chunk = []
+
+        def flush():
+            with oauth_client.begin(app) as (conn, table):
+                models.merge_accounts(conn, table, chunk)
+            report.rows += len(chunk)
+            save_checkpoint(checkpoint, offset=lines.offset, rows=report.resumed + report.rows)
+            chunk.clear()
+            if progress is not None:
+                progress(report)
+
+        for record in records:
+            if header is not None:
+                record = dict(zip(header, record))
+            if columns is None:
+                # 以第一行的字段为准, 保证同一批的字段一致
+                columns = [c for c in record if c in converters and (keep_ids or c != "id")]
+            chunk.append({c: converters[c](record.get(c)) for c in columns})
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+    if keep_ids:
+        with oauth_client.begin(app) as (conn, table):
+            models.reset_id_sequence(conn, table)
+    if oauth_client.account_cache is not None:
+        oauth_client.account_cache.clear()
+    return report
@@ -0,0 +1,151 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+import typing as t
+import urllib.parse
+
+if t.TYPE_CHECKING:
+    import requests
+
+DEFAULT_POOL_SIZE = 10  # 单个host的连接池大小
+DEFAULT_TIMEOUT = (3.05, 10)  # (连接超时, 读取超时)
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE) -> "requests.Session":
+    """
+    创建带连接池的会话, 连接在请求间保持复用(keep-alive)
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def parse_timeout(value: t.Any) -> t.Union[float, t.Tuple[float, float]]:
+    """
+    解析超时配置, 支持 `5`、`"3,10"`、`(3, 10)` 三种写法
+    """
+    if value is None:
+        return DEFAULT_TIMEOUT
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    if isinstance(value, (list, tuple)):
+        if len(value) == 1:
+            return float(value[0])
+        return float(value[0]), float(value[1])
+    return float(value)
+
+
+def get_origins(urls: t.Iterable[str]) -> t.List[str]:
+    """
+    获取地址列表中去重后的 scheme://host
+    """
+    origins = []
+    for url in urls:
+        o = urllib.parse.urlparse(url)
+        origin = "%s://%s" % (o.scheme, o.netloc)
+        if o.netloc and origin not in origins:
+            origins.append(origin)
+    return origins
+
+
+def prewarm(session: "requests.Session", urls: t.Iterable[str], timeout=DEFAULT_TIMEOUT,
+            background: bool = True) -> t.Optional[threading.Thread]:
+    """
+    预热连接: 提前完成DNS解析及TLS握手, 建立的连接放回连接池中
+    """
+    import requests
+
+    origins = get_origins(urls)
+
+    def _warm():
+        for origin in origins:
+            try:
+                session.head(origin, timeout=timeout, allow_redirects=False)
+            except requests.RequestException:
+                pass
+
+    if not background:
+        _warm()
+        return None
+    thread = threading.Thread(target=_warm, name="oauth2link-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def build_async_session(pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+    """
+    创建异步会话(基于httpx), 需要安装 `oauth2link[async]`
+    """
+    try:
+        import httpx
+    except ImportError as e:  # pragma: no cover
+        raise ImportError("异步接口依赖httpx, 请执行: pip install oauth2link[async]") from e
+
+    timeout = to_httpx_timeout(timeout)
+    limits = httpx.Limits(max_connections=pool_size,
+                          max_keepalive_connections=pool_size)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+class AsyncSessions:
+    """
+    按事件循环保存的异步会话, 异步连接不能跨事件循环复用;
+    会话持有事件循环的引用, 不能使用弱引用字典, 创建新会话时清理已关闭事件循环的会话
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, loop, factory: t.Callable[[], t.Any]):
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None:
+                for closed in [k for k in self._sessions if k.is_closed()]:
+                    del self._sessions[closed]
+                session = self._sessions[loop] = factory()
+            return session
+
+    def pop(self, loop, default=None):
+        with self._lock:
+            return self._sessions.pop(loop, default)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def to_httpx_timeout(timeout):
+    """
+    将 (连接超时, 读取超时) 转换为httpx的超时对象
+    """
+    if isinstance(timeout, tuple):
+        import httpx
+
+        return httpx.Timeout(timeout[1], connect=timeout[0])
+    return timeout
@@ -23,6 +23,9 @@ SOFTWARE.
 """
 
 
+DEFAULT_TABLE_NAME = "link_oauths"  # 默认账号表名
+
+
 class PlatformType:
     WeiBo = "weibo"
     GitHub = "github"
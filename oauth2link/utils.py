@@ -21,6 +21,7 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import re
 import typing as t
 
 
@@ -49,3 +50,56 @@ def replace_dict_key(json_data: dict, replace_keys: dict) -> dict:
         else:
             res[k] = v
     return res
+
+
+def safe_return_url(url: t.Optional[str]) -> t.Optional[str]:
+    """
+    只允许站内相对地址作为回跳地址, 避免开放重定向
+    """
+    if url and url.startswith("/") and not url.startswith("//") and "\\" not in url:
+        return url
+    return None
+
+
+def get_query_arg(req: t.Any, key: str) -> t.Optional[str]:
+    """
+    获取请求的查询参数, 兼容Flask(args)、Starlette(query_params)及普通字典
+    """
+    args = getattr(req, "args", None)
+    if args is None:
+        args = getattr(req, "query_params", None)
+    if args is None:
+        args = req
+    return args.get(key)
+
+
+def get_cookie(req: t.Any, key: str) -> t.Optional[str]:
+    """
+    获取请求的cookie, 兼容Flask及Starlette(cookies)
+    """
+    cookies = getattr(req, "cookies", None)
+    if cookies is None:
+        return None
+    return cookies.get(key)
+
+
+def is_token(value: str) -> bool:
+    """
+    是否为secrets.token_urlsafe生成的随机串
+    """
+    return re.fullmatch(r"[A-Za-z0-9_-]{16,64}", value) is not None
+
+
+def dump_cookie(key: str, value: str, max_age: int, path: str = "/", secure: bool = False,
+                httponly: bool = True, samesite: t.Optional[str] = "Lax") -> str:
+    """
+    生成Set-Cookie响应头的值
+    """
+    parts = ["%s=%s" % (key, value), "Max-Age=%d" % max_age, "Path=%s" % path]
+    if secure:
+        parts.append("Secure")
+    if httponly:
+        parts.append("HttpOnly")
+    if samesite:
+        parts.append("SameSite=%s" % samesite)
+    return "; ".join(parts)
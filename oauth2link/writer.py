@@ -0,0 +1,191 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindWriter:
+    """
+    异步批量写入器: 写入请求先进入有界队列, 由后台线程合并同一键的重复写入后批量落库,
+    达到batch_size条或间隔interval秒时触发写入
+
+    批量写入失败时逐条重写以隔离出错的数据, 出错的数据重新入队并退避重试,
+    同一键连续失败max_retries次后丢弃并交给dead_letter(默认只记录日志), 保证flush最终完成
+    """
+
+    def __init__(self, flush_func: t.Callable[[t.List[dict]], None], batch_size: int = 100,
+                 interval: float = 0.05, maxsize: int = 10000, put_timeout: float = 1.0,
+                 max_retries: int = 5, dead_letter: t.Optional[t.Callable[[t.List[dict]], None]] = None):
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.interval = interval
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.dead_letter = dead_letter
+        self.dropped = 0    # 超过重试次数被丢弃的条数
+        self._pending = OrderedDict()
+        self._attempts = {}     # 键 -> 连续失败次数
+        self._failures = 0      # 连续失败的批次数, 用于退避
+        self._inflight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="oauth2link-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, key: t.Hashable, row: dict) -> None:
+        """
+        加入写入队列, 同一键只保留最新的数据; 队列已满时阻塞等待, 超时抛出queue.Full
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("writer已关闭")
+            if key not in self._pending:
+                deadline = time.monotonic() + self.put_timeout
+                while len(self._pending) >= self.maxsize:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Full("写入队列已满")
+                    self._cond.wait(remaining)
+            self._pending[key] = row
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    def _take(self) -> t.List[t.Tuple[t.Hashable, dict]]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False))
+        self._inflight += len(batch)
+        self._cond.notify_all()
+        return batch
+
+    def _write(self, batch: t.List[t.Tuple[t.Hashable, dict]]) -> bool:
+        try:
+            try:
+                self.flush_func([row for _, row in batch])
+                failed = []
+            except Exception:
+                logger.exception("批量写入失败, %d条数据将逐条重试", len(batch))
+                failed = batch if len(batch) == 1 else self._write_each(batch)
+            self._requeue(batch, failed)
+            return not failed
+        finally:
+            with self._cond:
+                self._inflight -= len(batch)
+                self._cond.notify_all()
+
+    def _write_each(self, batch: t.List[t.Tuple[t.Hashable, dict]]) -> t.List[t.Tuple[t.Hashable, dict]]:
+        failed = []
+        for key, row in batch:
+            try:
+                self.flush_func([row])
+            except Exception:
+                failed.append((key, row))
+        if failed:
+            logger.warning("%d条数据写入失败", len(failed))
+        return failed
+
+    def _requeue(self, batch: t.List[t.Tuple[t.Hashable, dict]],
+                 failed: t.List[t.Tuple[t.Hashable, dict]]) -> None:
+        dropped = []
+        failed_keys = {key for key, _ in failed}
+        with self._cond:
+            for key, _ in batch:
+                if key not in failed_keys:
+                    self._attempts.pop(key, None)
+            for key, row in failed:
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_retries:
+                    self._attempts.pop(key, None)
+                    dropped.append(row)
+                    continue
+                self._attempts[key] = attempts
+                # 期间有更新的数据时以新数据为准
+                self._pending.setdefault(key, row)
+            self.dropped += len(dropped)
+        if dropped:
+            logger.error("%d条数据连续写入失败%d次, 已丢弃", len(dropped), self.max_retries)
+            if self.dead_letter is not None:
+                try:
+                    self.dead_letter(dropped)
+                except Exception:
+                    logger.exception("dead_letter处理失败")
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.interval)
+                if self._closed and not self._pending:
+                    return
+                batch = self._take()
+            if not batch:
+                continue
+            if self._write(batch):
+                self._failures = 0
+                continue
+            self._failures += 1
+            if self._closed:
+                logger.error("writer已关闭, %d条数据未写入", len(self._pending))
+                return
+            time.sleep(min(self.interval * 2 ** self._failures, 1.0))
+
+    def flush(self, timeout: t.Optional[float] = None) -> bool:
+        """
+        等待队列中的数据全部写入, 返回是否在超时前完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._inflight:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else self.interval)
+        return True
+
+    def close(self, timeout: t.Optional[float] = 5) -> None:
+        """
+        关闭写入器, 写入剩余数据; 进程退出时自动调用
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
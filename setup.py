@@ -28,6 +28,15 @@ setup(
         "Flask-SQLAlchemy>=3.0.5",
         "requests>=2.31.0",
     ],
+    extras_require={
+        "async": [
+            "Flask[async]>=2.3.2",
+            "httpx>=0.24.0",
+        ],
+        "speedups": [
+            "orjson>=3.9.0",
+        ],
+    },
 
     classifiers=[
         'License :: OSI Approved :: MIT License',
@@ -0,0 +1,104 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+import sqlalchemy as sa
+
+from oauth2link.bench import StubProvider
+from oauth2link.context import reset_state
+from oauth2link.platform import GitHubOauth2
+from oauth2link.platform.platform import Base
+
+
+@pytest.fixture(scope="session")
+def stub():
+    with StubProvider() as provider:
+        yield provider
+
+
+@pytest.fixture(autouse=True)
+def reset_stub(request):
+    """
+    每个用例使用默认配置的模拟平台
+    """
+    if "stub" in request.fixturenames:
+        provider = request.getfixturevalue("stub")
+        provider.latency = provider.jitter = provider.error_rate = 0.0
+        provider.rate_limit = None
+        provider.revoked.clear()
+    reset_state()
+    yield
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    每个用例使用新的SQLite数据库, 以非Flask方式绑定账号表
+    """
+    engine = sa.create_engine("sqlite:///%s" % (tmp_path / "links.db"))
+    Base.bind_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_client(stub, engine, request):
+    """
+    创建指向模拟平台的GitHub客户端, 每个用例使用不同的client_id, 限流及熔断状态互不影响
+    """
+
+    def make(**config):
+        client = GitHubOauth2()
+        client.configure(dict({
+            "LINKS_GITHUB_CLIENT_ID": "test-%s" % request.node.name,
+            "LINKS_GITHUB_CLIENT_SECRET": "secret",
+            "LINKS_GITHUB_REDIRECT_URI": "http://localhost/github/callback",
+        }, **config))
+        stub.attach(client)
+        return client
+
+    return make
+
+
+@pytest.fixture
+def login():
+    """
+    完成一次 token -> 用户信息 -> 保存账号 流程, 返回save_model的结果
+    """
+
+    def run(client, code: str):
+        reset_state()
+        client.get_access_token({"code": code})
+        client.get_user_info()
+        return client.save_model()
+
+    return run
+
+
+@pytest.fixture
+def count_accounts():
+    def count(client) -> int:
+        with client.begin() as (conn, table):
+            return conn.execute(sa.select(sa.func.count()).select_from(table)).scalar()
+
+    return count
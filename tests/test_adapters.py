@@ -0,0 +1,106 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import urllib.parse
+
+import pytest
+
+from oauth2link.adapters.asgi import OAuth2App
+from oauth2link.platform import GitHubOauth2
+
+
+def config(request, **extra):
+    return dict({
+        "LINKS_GITHUB_CLIENT_ID": "test-%s" % request.node.name,
+        "LINKS_GITHUB_CLIENT_SECRET": "secret",
+        "LINKS_GITHUB_REDIRECT_URI": "http://localhost/github/callback",
+        "LINKS_GITHUB_LOGIN_URI": "/github/login",
+        "LINKS_STATE_SECRET": "secret",
+    }, **extra)
+
+
+def asgi_get(app, path, query="", cookie=None):
+    """
+    发送一个GET请求, 返回 (状态码, 响应头, 响应体)
+    """
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+             "headers": [(b"cookie", cookie.encode())] if cookie else []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, body = messages
+    return start["status"], dict(start["headers"]), body["body"]
+
+
+def login_query(location: bytes) -> str:
+    state = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(location.decode()).query))["state"]
+    return urllib.parse.urlencode({"code": "adapter", "state": state})
+
+
+def test_asgi_login_and_callback(stub, engine, request, count_accounts):
+    pytest.importorskip("httpx")
+    client = GitHubOauth2()
+    app = OAuth2App(config(request), client)
+    stub.attach(client)
+
+    status, headers, _ = asgi_get(app, "/github/login")
+    assert status == 302
+    cookie = headers[b"set-cookie"].decode().split(";")[0]
+    status, _, body = asgi_get(app, "/github/callback", login_query(headers[b"location"]), cookie)
+    assert (status, body) == (200, b"login successful")
+    assert count_accounts(client) == 1
+
+    # 其他浏览器使用同一state时拒绝
+    status, _, body = asgi_get(app, "/github/callback", login_query(headers[b"location"]))
+    assert (status, body) == (400, b"invalid state")
+    assert asgi_get(app, "/missing")[0] == 404
+
+
+def test_flask_login_and_callback(stub, engine, request, count_accounts):
+    flask = pytest.importorskip("flask")
+    from oauth2link.adapters import flask as flask_adapter
+
+    client = GitHubOauth2()
+    client.configure(config(request))
+    stub.attach(client)
+    app = flask.Flask(__name__)
+    flask_adapter.register_state(app)
+    flask_adapter.register_callback(client, app)
+    flask_adapter.register_login(client, app)
+
+    http = app.test_client()
+    resp = http.get("/github/login?next=/home")
+    assert resp.status_code == 302
+    assert http.get_cookie(client.STATE_COOKIE) is not None
+    resp = http.get("/github/callback?" + login_query(resp.headers["Location"].encode()))
+    assert resp.status_code == 200
+    assert resp.get_data(as_text=True) == "login successful"
+    assert client.get_return_url() == "/home"
+    assert count_accounts(client) == 1
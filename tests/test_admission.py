@@ -0,0 +1,96 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from oauth2link.admission import AdmissionController
+from oauth2link.exceptions import AdmissionRejected
+
+
+def test_rejects_when_queue_full():
+    controller = AdmissionController(limit=1, queue_size=0, retry_after=3)
+    with controller.admit():
+        with pytest.raises(AdmissionRejected) as e:
+            controller.acquire()
+    assert e.value.retry_after == 3
+    assert controller.rejected == 1
+    assert controller.active == 0
+
+
+def test_queued_callback_rejected_after_timeout():
+    controller = AdmissionController(limit=1, queue_size=1, queue_timeout=0.05)
+    with controller.admit():
+        with pytest.raises(AdmissionRejected):
+            controller.acquire()
+    assert controller.waiting == 0
+    assert controller.active == 0
+
+
+def test_released_slot_handed_to_waiter():
+    controller = AdmissionController(limit=1, queue_size=1, queue_timeout=5)
+    controller.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        with controller.admit():
+            admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while controller.waiting == 0:
+        time.sleep(0.001)
+    controller.release()
+    thread.join(5)
+    assert admitted.is_set()
+    assert controller.active == 0
+
+
+def test_async_admit_shares_slots():
+    controller = AdmissionController(limit=1, queue_size=1, queue_timeout=0.05)
+
+    async def main():
+        async with controller.async_admit():
+            with pytest.raises(AdmissionRejected):
+                await controller.async_acquire()
+        async with controller.async_admit():
+            assert controller.active == 1
+
+    asyncio.run(main())
+    assert controller.active == 0
+    assert controller.rejected == 1
+
+
+def test_callback_returns_503_when_rejected(make_client):
+    flask = pytest.importorskip("flask")
+    from oauth2link.callback import BaseCallBackHandler
+
+    client = make_client()
+    client.admission = AdmissionController(client.Type, limit=1, queue_size=0, retry_after=2)
+    app = flask.Flask(__name__)
+    with client.admission.admit(), app.test_request_context("/github/callback?code=busy"):
+        result = BaseCallBackHandler(oauth_client=client).get()
+    assert result == ("service unavailable", 503, {"Retry-After": "2"})
@@ -0,0 +1,76 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+
+def test_async_login_flow(make_client, count_accounts):
+    client = make_client()
+
+    async def main():
+        try:
+            identity = await client.async_get_access_token({"code": "async"})
+            assert identity.token == "tok-async"
+            profile = await client.async_get_user_info()
+            await client.async_save_model()
+            return profile.uid
+        finally:
+            await client.async_close()
+
+    uid = asyncio.run(main())
+    assert client.find_account(str(uid)) is not None
+    assert count_accounts(client) == 1
+    assert len(client._async_sessions) == 0
+
+
+def test_concurrent_tasks_keep_own_identity(make_client):
+    client = make_client()
+
+    async def login(code):
+        await client.async_get_access_token({"code": code})
+        await asyncio.sleep(0)
+        return (await client.async_get_user_info()).token
+
+    async def main():
+        try:
+            return await asyncio.gather(*(login("task-%d" % i) for i in range(5)))
+        finally:
+            await client.async_close()
+
+    assert asyncio.run(main()) == ["tok-task-%d" % i for i in range(5)]
+
+
+def test_sessions_of_closed_loops_pruned(make_client):
+    client = make_client()
+
+    async def fetch():
+        await client.async_get_access_token({"code": "loop"})
+
+    # 未调用async_close时, 下一个事件循环创建会话时清理已关闭事件循环的会话
+    asyncio.run(fetch())
+    asyncio.run(fetch())
+    assert len(client._async_sessions) == 1
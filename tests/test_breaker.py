@@ -0,0 +1,82 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import time
+
+import pytest
+
+from oauth2link.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from oauth2link.exceptions import CircuitOpenError
+
+
+def open_breaker(**options) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", window=4, min_calls=4, **options)
+    for _ in range(4):
+        breaker.before_call()
+        breaker.record(False, 0.01)
+    return breaker
+
+
+def test_opens_on_error_rate():
+    breaker = open_breaker()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker("test", window=4, min_calls=4, slow_call=0.5, slow_rate=0.5)
+    for latency in (0.1, 1.0, 0.1, 1.0):
+        breaker.record(True, latency)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = open_breaker(reset_timeout=0.05)
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True, 0.01)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_reopens_on_failure():
+    breaker = open_breaker(reset_timeout=0.05)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(False, 0.01)
+    assert breaker.state == OPEN
+
+
+def test_failing_platform_is_short_circuited(stub, make_client):
+    client = make_client()
+    client.breaker = CircuitBreaker("github", window=4, min_calls=4, reset_timeout=60)
+    stub.error_rate = 1.0
+    for _ in range(4):
+        assert client._fetch_user_info("tok").get("id") is None
+    before = stub.requests
+    with pytest.raises(CircuitOpenError):
+        client._fetch_user_info("tok")
+    assert stub.requests == before
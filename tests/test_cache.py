@@ -0,0 +1,150 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import multiprocessing
+import sys
+import threading
+import time
+
+import pytest
+
+from oauth2link.cache import (MISSING, AccountCache, KeyValueBackend, LocalKeyValueClient, MemoryBackend,
+                              SharedMemoryBackend)
+
+shm_only = pytest.mark.skipif(sys.platform == "win32", reason="共享缓存依赖fcntl")
+
+
+@pytest.fixture
+def shm(tmp_path):
+    backend = SharedMemoryBackend(str(tmp_path / "links.cache"), slots=64, slot_size=256, stripes=4)
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize("make", [lambda: MemoryBackend(), lambda: KeyValueBackend(LocalKeyValueClient())])
+def test_add_is_set_if_absent(make):
+    backend = make()
+    assert backend.add("k", 1, 10)
+    assert not backend.add("k", 2, 10)
+    assert backend.get("k") == 1
+
+
+@shm_only
+def test_shared_memory_roundtrip(shm):
+    shm.set(("profile", "a"), {"name": "a"}, 10)
+    assert shm.get(("profile", "a")) == {"name": "a"}
+    assert shm.add("n", 1, 10)
+    assert not shm.add("n", 1, 10)
+    shm.delete(("profile", "a"))
+    assert shm.get(("profile", "a")) is MISSING
+
+
+@shm_only
+def test_shared_memory_expiry_and_oversize(shm):
+    shm.set("short", 1, 0.01)
+    shm.set("big", "x" * 1024, 10)
+    time.sleep(0.02)
+    assert shm.get("short") is MISSING
+    assert shm.get("big") is MISSING
+    assert shm.oversize == 1
+    assert shm.add("short", 2, 10)
+
+
+@shm_only
+def test_shared_memory_errors_become_miss(tmp_path):
+    backend = SharedMemoryBackend(str(tmp_path / "links.cache"), slots=64, slot_size=256, stripes=4)
+    backend.set("k", 1, 10)
+    backend.close()
+    assert backend.get("k") is MISSING
+    backend.set("k", 2, 10)
+    backend.delete("k")
+    # 防重放依赖add, 读写失败时按已存在处理
+    assert not backend.add("k", 2, 10)
+
+
+@shm_only
+def test_shared_memory_locks_per_stripe(shm):
+    keys = {}
+    for i in range(64):
+        keys.setdefault(shm._locate(i)[1] % shm.stripes, i)
+    assert len(keys) == shm.stripes
+    done = threading.Event()
+    # 持有一个条带的线程锁时, 其他条带仍可读写
+    with shm._locks[0]:
+        thread = threading.Thread(target=lambda: (shm.set(keys[1], 1, 10), done.set()))
+        thread.start()
+        assert done.wait(5)
+    thread.join()
+    assert shm.get(keys[1]) == 1
+
+
+def _hammer(path: str, errors) -> None:
+    backend = SharedMemoryBackend(path, slots=64, slot_size=256, stripes=4)
+
+    def work(n):
+        for i in range(300):
+            try:
+                backend._set(("k", (n * 7 + i) % 40), {"i": i}, 10)
+                backend._get(("k", (n * 3 + i) % 40))
+            except OSError as e:
+                errors.put(repr(e))
+                return
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@shm_only
+def test_shared_memory_concurrent_processes_do_not_deadlock(tmp_path):
+    path = str(tmp_path / "links.cache")
+    SharedMemoryBackend(path, slots=64, slot_size=256, stripes=4).close()
+    ctx = multiprocessing.get_context("fork")
+    errors = ctx.Queue()
+    procs = [ctx.Process(target=_hammer, args=(path, errors)) for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(30)
+    assert all(proc.exitcode == 0 for proc in procs)
+    assert errors.empty()
+
+
+def test_account_cache_negative_entry():
+    cache = AccountCache(ttl=60, negative_ttl=60)
+    cache.set("github", "1", None)
+    assert cache.get("github", "1") is None
+    cache.invalidate("github", "1")
+    assert cache.get("github", "1") is MISSING
+
+
+def test_profile_cache_stores_schema_fields(stub, make_client):
+    client = make_client(LINKS_PROFILE_CACHE_TTL=60)
+    identity = client.get_access_token({"code": "trim"})
+    client.get_user_info()
+    cached = client.profile_cache.get(client.Type, identity.token, None)
+    assert set(cached) <= set(client.PROFILE_SCHEMA.keys)
+    assert client.PROFILE_SCHEMA.extract(cached)["uid"] == client.get_identity().uid
+    assert client.PROFILE_SCHEMA.trim({"id": 1, "login": "a", "bio": "x" * 4096}) == {"id": 1, "login": "a"}
@@ -0,0 +1,49 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+
+from oauth2link.identity import OAuthIdentity
+
+
+def test_identity_compatible_with_dict():
+    identity = OAuthIdentity("github", token="tok", expires=3600, uid=1).update(
+        {"username": "octocat"}, raw={"id": 1, "login": "octocat", "email": None})
+    assert identity["access_token"] == "tok"
+    assert identity.get("expires_in") == 3600
+    assert identity["login"] == "octocat"
+    assert identity.get("missing", "default") == "default"
+    assert "access_token" in identity
+    assert identity.to_dict() == {"access_token": "tok", "expires_in": 3600, "uid": 1, "username": "octocat"}
+
+
+def test_identity_null_fields_return_none():
+    identity = OAuthIdentity("github", token="tok", raw={"id": 1, "email": None})
+    # 字段存在但为None时与旧版字典一致返回None, 不存在的键抛出KeyError
+    assert identity["refresh_token"] is None
+    assert identity["avatar"] is None
+    assert identity["email"] is None
+    with pytest.raises(KeyError):
+        identity["missing"]
+    with pytest.raises(KeyError):
+        OAuthIdentity()["login"]
@@ -0,0 +1,59 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+
+from oauth2link import platform
+from oauth2link.bench import importtime
+
+
+def test_platform_import_skips_heavy_dependencies():
+    assert importtime.imported_modules() == []
+
+
+def test_importtime_check():
+    from click.testing import CliRunner
+
+    total, modules = importtime.measure()
+    assert total > 0
+    assert "oauth2link.platform" in modules
+    result = CliRunner().invoke(importtime.main, ["--runs", "1", "--budget-ms", "100000"])
+    assert result.exit_code == 0, result.output
+    result = CliRunner().invoke(importtime.main, ["--runs", "1", "-s", "import oauth2link, requests"])
+    assert result.exit_code == 1
+
+
+def test_register_platform_by_path():
+    platform.register_platform("github-copy", "oauth2link.platform.github_platform:GitHubOauth2")
+    try:
+        assert platform.get_platform("github-copy") is platform.GitHubOauth2
+        assert "github-copy" in platform.platform_types()
+    finally:
+        platform.PLATFORMS.pop("github-copy")
+    with pytest.raises(ValueError):
+        platform.get_platform("github-copy")
+
+
+def test_unknown_export():
+    with pytest.raises(AttributeError):
+        platform.Missing
@@ -0,0 +1,77 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from oauth2link import models
+
+
+def test_ensure_indexes_reports_duplicates(engine):
+    table = models.make_table(sa.MetaData())
+    legacy = sa.Table(table.name, sa.MetaData(), *[c._copy() for c in table.columns])
+    with engine.begin() as conn:
+        legacy.drop(conn)
+        legacy.create(conn)
+        conn.execute(sa.insert(legacy), [dict(source="github", username="1", user=None),
+                                         dict(source="github", username="1", user=7)])
+    from oauth2link.exceptions import DuplicateAccountsError
+
+    try:
+        models.ensure_indexes(engine, table)
+    except DuplicateAccountsError as e:
+        assert e.duplicates == [("github", "1", 2)]
+    else:
+        raise AssertionError("应报告重复记录")
+    models.ensure_indexes(engine, table, dedupe=True)
+    with engine.connect() as conn:
+        assert [tuple(r) for r in conn.execute(sa.select(table.c.user))] == [(7,)]
+
+
+def test_dedupe_keeps_most_recently_modified(engine):
+    table = models.make_table(sa.MetaData())
+    legacy = sa.Table(table.name, sa.MetaData(), *[c._copy() for c in table.columns])
+    old, new = datetime.datetime(2020, 1, 1), datetime.datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        legacy.drop(conn)
+        legacy.create(conn)
+        conn.execute(sa.insert(legacy), [dict(source="github", username="1", realname="new", modifytime=new),
+                                         dict(source="github", username="1", realname="old", modifytime=old)])
+    assert models.dedupe_accounts(engine, table) == 1
+    with engine.connect() as conn:
+        assert [tuple(r) for r in conn.execute(sa.select(table.c.realname))] == [("new",)]
+
+
+@pytest.mark.parametrize("upsert", [False, True])
+def test_save_updates_modifytime(make_client, login, upsert):
+    client = make_client(LINKS_UPSERT=upsert)
+    uid = login(client, "modified").username
+    old = datetime.datetime(2020, 1, 1)
+    with client.begin() as (conn, table):
+        conn.execute(sa.update(table).values(modifytime=old))
+    login(client, "modified")
+    with client.begin() as (conn, table):
+        modifytime = conn.execute(sa.select(table.c.modifytime).where(table.c.username == uid)).scalar()
+    assert modifytime > old
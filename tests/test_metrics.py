@@ -0,0 +1,45 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pathlib
+import re
+
+import oauth2link
+from oauth2link import metrics
+
+
+def test_all_metrics_have_help():
+    source = pathlib.Path(oauth2link.__file__).parent
+    names = set()
+    for path in source.rglob("*.py"):
+        names.update(re.findall(r'"(oauth2link_[a-z_]+_(?:total|seconds))"', path.read_text(encoding="utf-8")))
+    assert names
+    assert names <= set(metrics.HELP)
+
+
+def test_render_admission_rejected():
+    registry = metrics.PrometheusRegistry()
+    registry.inc("oauth2link_admission_rejected_total", (("platform", "github"),))
+    text = registry.render()
+    assert "# TYPE oauth2link_admission_rejected_total counter" in text
+    assert 'oauth2link_admission_rejected_total{platform="github"} 1' in text
@@ -0,0 +1,67 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import time
+
+from oauth2link.cache import MISSING, MemoryBackend, ProfileCache
+
+
+def test_memory_backend_lru_and_expiry():
+    backend = MemoryBackend(maxsize=2)
+    backend.set("a", 1, 10)
+    backend.set("b", 2, 10)
+    assert backend.get("a") == 1
+    backend.set("c", 3, 10)     # b最久未使用, 被淘汰
+    assert backend.get("b") is MISSING
+    backend.set("short", None, 0.01)
+    assert backend.get("short") is None
+    time.sleep(0.02)
+    assert backend.get("short") is MISSING
+
+
+def test_per_platform_ttl():
+    cache = ProfileCache(ttl={"github": 60})
+    cache.set("github", "tok", None, {"id": 1})
+    cache.set("weibo", "tok", "1", {"id": "1"})
+    assert cache.get("github", "tok") == {"id": 1}
+    assert cache.get("weibo", "tok", "1") is MISSING
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_repeated_lookups_hit_cache(stub, make_client):
+    client = make_client(LINKS_PROFILE_CACHE_TTL=60)
+    token = client.get_access_token({"code": "profile"}).token
+    before = stub.requests
+    for _ in range(3):
+        assert client.get_user_info().username == client.get_identity().username
+    assert stub.requests - before == 1
+
+    client.invalidate_user_info(token)
+    client.get_user_info()
+    assert stub.requests - before == 2
+
+
+def test_error_response_not_cached(stub, make_client):
+    client = make_client(LINKS_PROFILE_CACHE_TTL=60)
+    assert "id" not in client._fetch_user_info("")
+    assert client.profile_cache.get(client.Type, "", None) is MISSING
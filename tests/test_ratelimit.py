@@ -0,0 +1,93 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import time
+
+import pytest
+
+from oauth2link.ratelimit import RateLimiter, TokenBucket
+
+
+class Response:
+    def __init__(self, status_code: int, headers: dict = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_exhausted_quota_keeps_rate_floor():
+    bucket = TokenBucket(10)
+    bucket.update_from_headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 3600)})
+    assert bucket.rate == pytest.approx(1.0)
+
+
+def test_remaining_quota_spread_until_reset():
+    bucket = TokenBucket(10)
+    bucket.update_from_headers({"X-RateLimit-Remaining": "100", "X-RateLimit-Reset": str(time.time() + 50)})
+    assert bucket.rate == pytest.approx(2.0, rel=0.05)
+
+
+@pytest.mark.parametrize("status, headers, idempotent, expected", [
+    (502, {}, True, True),
+    (504, {}, True, True),
+    (502, {}, False, False),
+    (504, {}, False, False),
+    (503, {}, False, False),
+    (503, {"Retry-After": "1"}, False, True),
+    (429, {}, False, True),
+    (403, {"X-RateLimit-Remaining": "0"}, False, True),
+    (200, {}, True, False),
+])
+def test_should_retry(status, headers, idempotent, expected):
+    limiter = RateLimiter(TokenBucket(100))
+    assert limiter.should_retry(Response(status, headers), idempotent) is expected
+
+
+@pytest.mark.parametrize("reset", ["soon", "", "1.5e"])
+def test_malformed_reset_header_falls_back_to_backoff(reset):
+    limiter = RateLimiter(TokenBucket(10), backoff=0.5, max_backoff=8)
+    resp = Response(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})
+    assert 0 <= limiter.get_delay(2, resp) <= 2.0
+
+
+def test_user_quota_headers_do_not_throttle_app():
+    limiter = RateLimiter(TokenBucket(10))
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 3600)}
+    limiter.call(lambda: Response(200, headers), app_quota=False)
+    assert limiter.bucket.rate == 10
+
+
+def test_token_request_not_retried_on_gateway_error(stub, make_client):
+    client = make_client(LINKS_RATE_LIMIT=100, LINKS_HTTP_RETRIES=2)
+    stub.error_rate = 1.0
+    before = stub.requests
+    client._fetch_access_token("code")
+    assert stub.requests - before == 1
+
+
+def test_profile_request_retried_on_gateway_error(stub, make_client):
+    client = make_client(LINKS_RATE_LIMIT=100, LINKS_HTTP_RETRIES=2)
+    client.rate_limiter.backoff = 0.001
+    stub.error_rate = 1.0
+    before = stub.requests
+    client._fetch_user_info("tok")
+    assert stub.requests - before == 3
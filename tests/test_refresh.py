@@ -0,0 +1,97 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from oauth2link.refresh import RefreshScheduler
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+def add_account(client, username: str, refresh_token: str) -> None:
+    with client.begin() as (conn, table):
+        conn.execute(sa.insert(table).values(
+            source=client.Type, username=username, access_token="old-" + username,
+            refresh_token=refresh_token, expires=datetime.datetime.now() + datetime.timedelta(seconds=60)))
+
+
+def get_tokens(client, username: str) -> tuple:
+    with client.begin() as (conn, table):
+        row = conn.execute(sa.select(table.c.access_token, table.c.refresh_token).where(
+            table.c.username == username)).first()
+    return tuple(row)
+
+
+def test_refresh_rotates_tokens(client):
+    add_account(client, "1", "r1")
+    scheduler = RefreshScheduler(client)
+    assert scheduler.run_once() == 1
+    assert get_tokens(client, "1") == ("tok-r1", "ref-r1")
+
+
+def test_revoked_refresh_token_is_cleared(stub, client):
+    add_account(client, "1", "r1")
+    stub.revoked.add("r1")
+    scheduler = RefreshScheduler(client)
+    scheduler.run_once()
+    assert scheduler.stats == dict(refreshed=0, revoked=1, failed=0)
+    assert get_tokens(client, "1") == ("old-1", None)
+
+
+def test_upstream_errors_keep_refresh_token(stub, client):
+    add_account(client, "1", "r1")
+    stub.error_rate = 1.0
+    scheduler = RefreshScheduler(client)
+    scheduler.run_once()
+    assert scheduler.stats == dict(refreshed=0, revoked=0, failed=1)
+    assert get_tokens(client, "1") == ("old-1", "r1")
+
+
+def test_throttled_refresh_keeps_refresh_token(stub, client):
+    add_account(client, "1", "r1")
+    stub.rate_limit = 0
+    scheduler = RefreshScheduler(client)
+    scheduler.run_once()
+    assert scheduler.stats["failed"] == 1
+    assert get_tokens(client, "1") == ("old-1", "r1")
+
+
+def test_concurrent_rotation_is_not_overwritten(client):
+    add_account(client, "1", "r1")
+    refresh = client.refresh_access_token
+
+    def rotate_during_refresh(refresh_token):
+        # 刷新期间其他进程已写入新的token
+        with client.begin() as (conn, table):
+            conn.execute(sa.update(table).values(access_token="login", refresh_token="r-login"))
+        return refresh(refresh_token)
+
+    client.refresh_access_token = rotate_during_refresh
+    RefreshScheduler(client).run_once()
+    assert get_tokens(client, "1") == ("login", "r-login")
@@ -0,0 +1,35 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from oauth2link.context import reset_state
+
+
+def test_save_ignores_cached_unbound_account(make_client, login, count_accounts):
+    client = make_client(LINKS_ACCOUNT_CACHE_TTL=60, LINKS_ACCOUNT_CACHE_NEGATIVE_TTL=60)
+    client.get_access_token({"code": "negative"})
+    uid = str(client.get_user_info().uid)
+    assert client.find_account(uid) is None
+    assert login(client, "negative").username == uid
+    assert login(client, "negative").username == uid
+    assert count_accounts(client) == 1
+    assert client.find_account(uid)["username"] == uid
@@ -0,0 +1,43 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from oauth2link import schema
+from oauth2link.platform import GitHubOauth2, WeiBoOauth2
+
+
+def test_schema_extracts_declared_fields():
+    data = {"id": 1, "login": "octocat", "avatar_url": None, "bio": "x"}
+    assert GitHubOauth2.PROFILE_SCHEMA.extract(data) == {"uid": 1, "username": "octocat", "avatar": None}
+    assert GitHubOauth2.PROFILE_SCHEMA.extract({"message": "Bad credentials"}) is None
+    assert GitHubOauth2.PROFILE_SCHEMA.extract(None) is None
+    assert WeiBoOauth2.PROFILE_SCHEMA.extract({"id": 2, "name": "weibo"}) == {"username": "weibo"}
+
+
+def test_token_schema():
+    fields = GitHubOauth2.TOKEN_SCHEMA.extract({"access_token": "tok", "scope": "", "token_type": "bearer"})
+    assert fields["token"] == "tok"
+    assert GitHubOauth2.TOKEN_SCHEMA.extract({"error": "bad_verification_code"}) is None
+
+
+def test_loads_accepts_bytes_and_str():
+    assert schema.loads(b'{"id": 1}') == schema.loads('{"id": 1}') == {"id": 1}
@@ -0,0 +1,120 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+import time
+
+import pytest
+
+from oauth2link.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ["value"] * 8
+    assert flight.shared == 7
+
+
+def test_error_is_shared_and_not_remembered():
+    flight = SingleFlight(ttl=30)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError("upstream")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: "ok") == "ok"
+    assert len(calls) == 1
+
+
+def test_ttl_remembers_success_unless_rejected():
+    flight = SingleFlight(ttl=30)
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 1
+    assert flight.do("other", lambda: None, remember=lambda v: v is not None) is None
+    assert flight.do("other", lambda: 3) == 3
+
+
+def test_key_hides_parts():
+    key = SingleFlight.key("token", "secret-code")
+    assert "secret-code" not in key
+    assert key != SingleFlight.key("token", "other-code")
+
+
+def test_duplicate_callbacks_request_token_once(stub, make_client):
+    client = make_client(LINKS_SINGLE_FLIGHT=True)
+    stub.latency = 0.1
+    before = stub.requests
+    tokens = []
+
+    def callback():
+        from oauth2link.context import reset_state
+
+        reset_state()
+        tokens.append(client.get_access_token({"code": "same"}).token)
+
+    threads = [threading.Thread(target=callback) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tokens == ["tok-same"] * 4
+    assert stub.requests - before == 1
+
+
+def test_different_state_cannot_reuse_code(stub, make_client):
+    from types import SimpleNamespace
+
+    from oauth2link.context import reset_state
+
+    client = make_client(LINKS_SINGLE_FLIGHT=True, LINKS_STATE_SECRET="secret")
+
+    def callback(browser_id):
+        reset_state()
+        state = client.state_signer.dumps(audience=client.state_audience, browser_id=browser_id)
+        req = SimpleNamespace(args={"code": "same", "state": state},
+                              cookies={client.STATE_COOKIE: browser_id})
+        return client.get_access_token(req).token
+
+    before = stub.requests
+    callback("victim-browser-id")
+    callback("other-browser-id")
+    assert stub.requests - before == 2
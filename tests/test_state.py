@@ -0,0 +1,133 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+import urllib.parse
+
+import pytest
+
+from oauth2link.exceptions import StateError
+from oauth2link.state import StateSigner
+
+
+def test_roundtrip_with_return_url():
+    signer = StateSigner("secret")
+    payload = signer.loads(signer.dumps("/home", audience="github"), audience="github")
+    assert payload["r"] == "/home"
+
+
+@pytest.mark.parametrize("state", [None, "", "a.b", "x.y.z", "é.é.é"])
+def test_malformed_state(state):
+    with pytest.raises(StateError):
+        StateSigner("secret").loads(state)
+
+
+def test_non_ascii_signature_raises_state_error():
+    signer = StateSigner("secret")
+    state = signer.dumps()
+    with pytest.raises(StateError):
+        signer.loads(state.rsplit(".", 1)[0] + ".签名")
+
+
+def test_tampered_payload():
+    signer = StateSigner("secret")
+    kid, body, signature = signer.dumps("/home").split(".")
+    with pytest.raises(StateError):
+        signer.loads("%s.%s.%s" % (kid, body[:-2] + "AA", signature))
+
+
+def test_expired():
+    signer = StateSigner("secret", max_age=-1)
+    with pytest.raises(StateError):
+        signer.loads(signer.dumps())
+
+
+def test_bound_to_audience():
+    signer = StateSigner("secret")
+    state = signer.dumps(audience="tenant-a/github")
+    with pytest.raises(StateError):
+        signer.loads(state, audience="tenant-a/weibo")
+    assert signer.loads(state, audience="tenant-a/github")
+
+
+def test_bound_to_browser():
+    signer = StateSigner("secret")
+    state = signer.dumps(browser_id="browser-a")
+    with pytest.raises(StateError):
+        signer.loads(state, check_replay=False)
+    with pytest.raises(StateError):
+        signer.loads(state, check_replay=False, browser_id="browser-b")
+    assert signer.loads(state, browser_id="browser-a")
+
+
+def test_key_rotation():
+    state = StateSigner("old").dumps()
+    assert StateSigner(["new", "old"]).loads(state)
+    with pytest.raises(StateError):
+        StateSigner("new").loads(state)
+
+
+def test_replay_is_atomic():
+    signer = StateSigner("secret")
+    state = signer.dumps()
+    accepted = []
+    barrier = threading.Barrier(16)
+
+    def callback():
+        barrier.wait()
+        try:
+            signer.loads(state)
+            accepted.append(1)
+        except StateError:
+            pass
+
+    threads = [threading.Thread(target=callback) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(accepted) == 1
+
+
+def test_pkce_verifier_matches_challenge():
+    signer = StateSigner("secret")
+    params = signer.authorize_params(pkce=True)
+    payload = signer.loads(params["state"])
+    assert signer.code_challenge(signer.code_verifier(payload)) == params["code_challenge"]
+
+
+def test_login_and_callback_bind_state_to_browser(stub, make_client):
+    client = make_client(LINKS_STATE_SECRET="secret")
+    browser_id = client.get_browser_id({})
+    url = client.redirect_url("/home", browser_id)
+    state = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)["state"][0]
+
+    class Request(dict):
+        cookies = {}
+
+    with pytest.raises(StateError):
+        client.get_callback_code(Request(code="c", state=state))
+    request = Request(code="c", state=state)
+    request.cookies = {client.STATE_COOKIE: browser_id}
+    assert client.get_callback_code(request) == "c"
+    assert client.get_return_url() == "/home"
@@ -0,0 +1,69 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import sqlalchemy as sa
+
+from oauth2link.sync import sync_profiles
+
+
+def get_row(client, uid):
+    with client.begin() as (conn, table):
+        return conn.execute(sa.select(table).where(table.c.username == uid)).one()
+
+
+def test_sync_updates_profiles(make_client, login, count_accounts):
+    client = make_client()
+    uids = [login(client, "sync-%d" % i).username for i in range(5)]
+    with client.begin() as (conn, table):
+        conn.execute(sa.update(table).values(realname="old", avatar=None))
+
+    reports = []
+    report = sync_profiles(client, chunk_size=2, workers=2, progress=lambda r: reports.append(r.processed))
+    assert (report.processed, report.updated, report.failed) == (5, 5, 0)
+    assert reports == [2, 4, 5]
+    for uid in uids:
+        row = get_row(client, uid)
+        assert row.realname == "user%s" % uid
+        assert row.avatar == "https://avatars.example.com/u/%s" % uid
+    assert count_accounts(client) == 5
+
+
+def test_sync_bypasses_profile_cache(make_client, login):
+    client = make_client(LINKS_PROFILE_CACHE_TTL=300)
+    account = login(client, "cached")
+    uid = account.username
+    stale = {"id": int(uid), "login": "stale", "avatar_url": "https://avatars.example.com/stale"}
+    client.profile_cache.set(client.Type, account.access_token, uid, stale)
+
+    assert sync_profiles(client).updated == 1
+    assert get_row(client, uid).realname == "user%s" % uid
+    # 缓存随同步结果更新
+    assert client.fetch_profile(account.access_token, uid)["realname"] == "user%s" % uid
+
+
+def test_sync_counts_failures(stub, make_client, login):
+    client = make_client(LINKS_HTTP_RETRIES=0)
+    login(client, "failing")
+    stub.error_rate = 1.0
+    report = sync_profiles(client)
+    assert (report.processed, report.updated, report.failed) == (1, 0, 1)
@@ -0,0 +1,89 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from oauth2link.exceptions import StateError
+from oauth2link.platform import GitHubOauth2
+from oauth2link.tenant import TenantRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = TenantRegistry({"LINKS_STATE_SECRET": "secret"}, maxsize=1,
+                              redirect_uri="http://localhost/oauth2/{tenant}/{platform}/callback",
+                              platforms={"github": GitHubOauth2})
+    registry.register("acme", "github", client_id="acme-id", client_secret="acme-secret")
+    registry.register("globex", "github", client_id="globex-id", client_secret="globex-secret")
+    yield registry
+    registry.close()
+
+
+def callback(client, state, browser_id="browser-id-0000000"):
+    req = SimpleNamespace(args={"code": "c", "state": state}, cookies={client.STATE_COOKIE: browser_id})
+    return client.get_callback_code(req)
+
+
+def issue_state(client, browser_id="browser-id-0000000"):
+    return client.state_signer.dumps(audience=client.state_audience, browser_id=browser_id)
+
+
+def test_dispatch_by_tenant(registry):
+    assert registry.parse_path("/oauth2/acme/github/callback") == ("acme", "github", "callback")
+    assert registry.parse_path("/oauth2/acme/github") is None
+    acme = registry.get("acme", "github")
+    assert acme.tenant == "acme"
+    assert acme.DEFAULT_CONFIG["client_id"] == "acme-id"
+    assert acme.DEFAULT_CONFIG["redirect_uri"] == "http://localhost/oauth2/acme/github/callback"
+    assert registry.get("globex", "github").DEFAULT_CONFIG["client_id"] == "globex-id"
+    assert registry.get("initech", "github") is None
+    assert registry.get("acme", "weibo") is None
+
+
+def test_loader_on_demand():
+    registry = TenantRegistry(platforms={"github": GitHubOauth2},
+                              loader=lambda tenant, platform: {"client_id": tenant} if tenant == "acme" else None)
+    assert registry.get("acme", "github").DEFAULT_CONFIG["client_id"] == "acme"
+    assert ("acme", "github") in registry
+    assert registry.get("globex", "github") is None
+
+
+def test_state_rejected_across_tenants(registry):
+    state = issue_state(registry.get("acme", "github"))
+    with pytest.raises(StateError):
+        callback(registry.get("globex", "github"), state)
+
+
+def test_replay_rejected_after_eviction(registry):
+    acme = registry.get("acme", "github")
+    state = issue_state(acme)
+    assert callback(acme, state) == "c"
+    # maxsize=1, 创建其他租户的实例后acme的实例被淘汰
+    registry.get("globex", "github")
+    rebuilt = registry.get("acme", "github")
+    assert rebuilt is not acme
+    assert rebuilt.state_signer is acme.state_signer
+    with pytest.raises(StateError):
+        callback(rebuilt, state)
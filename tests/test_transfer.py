@@ -0,0 +1,126 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+import sqlalchemy as sa
+
+from oauth2link import models
+from oauth2link.platform.platform import Base
+from oauth2link.transfer import export_accounts, import_accounts
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(n):
+    def progress(report):
+        if report.rows >= n:
+            raise Interrupted
+    return progress
+
+
+def read_accounts(client):
+    with client.begin() as (conn, table):
+        return [tuple(r) for r in conn.execute(sa.select(table).order_by(table.c.id))]
+
+
+@pytest.fixture
+def accounts(make_client, login):
+    client = make_client()
+    for i in range(5):
+        login(client, "transfer-%d" % i)
+    return client
+
+
+@pytest.fixture
+def target(tmp_path):
+    """
+    导入使用的新数据库
+    """
+    engine = sa.create_engine("sqlite:///%s" % (tmp_path / "target.db"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_roundtrip(accounts, target, tmp_path, fmt):
+    path = str(tmp_path / ("accounts." + fmt))
+    expected = read_accounts(accounts)
+    assert export_accounts(accounts, path, chunk_size=2).rows == 5
+    Base.bind_engine(target)
+    assert import_accounts(accounts, path, chunk_size=2, keep_ids=True).rows == 5
+    assert read_accounts(accounts) == expected
+
+
+def test_import_updates_existing(accounts, tmp_path):
+    path = str(tmp_path / "accounts.jsonl")
+    expected = read_accounts(accounts)
+    export_accounts(accounts, path)
+    with accounts.begin() as (conn, table):
+        conn.execute(sa.update(table).values(realname="changed", access_token="changed"))
+    import_accounts(accounts, path)
+    assert read_accounts(accounts) == expected
+
+
+def test_export_resumes_from_checkpoint(accounts, tmp_path):
+    full, path, checkpoint = (str(tmp_path / name) for name in ("full.csv", "part.csv", "export.ck"))
+    export_accounts(accounts, full)
+    with pytest.raises(Interrupted):
+        export_accounts(accounts, path, chunk_size=2, checkpoint=checkpoint, progress=interrupt_after(2))
+    # 断点之后写入的不完整内容会被截断
+    with open(path, "a", encoding="utf-8") as fp:
+        fp.write("partial")
+    report = export_accounts(accounts, path, chunk_size=2, checkpoint=checkpoint)
+    assert (report.resumed, report.rows) == (2, 3)
+    with open(full, encoding="utf-8") as a, open(path, encoding="utf-8") as b:
+        assert a.read() == b.read()
+
+
+def test_import_resumes_from_checkpoint(accounts, target, tmp_path):
+    path, checkpoint = str(tmp_path / "accounts.jsonl"), str(tmp_path / "import.ck")
+    export_accounts(accounts, path)
+    expected = read_accounts(accounts)
+    Base.bind_engine(target)
+    with pytest.raises(Interrupted):
+        import_accounts(accounts, path, chunk_size=2, checkpoint=checkpoint, keep_ids=True,
+                        progress=interrupt_after(2))
+    assert len(read_accounts(accounts)) == 2
+    report = import_accounts(accounts, path, chunk_size=2, checkpoint=checkpoint, keep_ids=True)
+    assert (report.resumed, report.rows) == (2, 3)
+    assert read_accounts(accounts) == expected
+
+
+def test_reset_id_sequence_only_on_postgresql(engine):
+    table = models.make_table(sa.MetaData())
+    statements = []
+    sa.event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with engine.begin() as conn:
+        models.reset_id_sequence(conn, table)
+    assert statements == []
+
+    pg = sa.create_mock_engine("postgresql://", lambda sql, *args, **kwargs: statements.append(sql))
+    models.reset_id_sequence(pg, table)
+    sql = str(statements[0].compile(dialect=pg.dialect))
+    assert "setval(pg_get_serial_sequence" in sql
+    assert "FROM link_oauths" in sql
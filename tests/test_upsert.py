@@ -0,0 +1,63 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import logging
+
+import sqlalchemy as sa
+
+from oauth2link.platform.platform import Base
+
+
+def test_upsert_returns_saved_row(make_client, login, count_accounts):
+    client = make_client(LINKS_UPSERT=True)
+    first = login(client, "upsert")
+    second = login(client, "upsert")
+    assert first.id == second.id
+    assert second.access_token == "tok-upsert"
+    assert count_accounts(client) == 1
+
+
+def test_upsert_uses_returning(make_client, engine, login):
+    client = make_client(LINKS_UPSERT=True)
+    login(client, "returning")
+    client.get_access_token({"code": "returning"})
+    client.get_user_info()
+    statements = []
+    sa.event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert client.save_model().access_token == "tok-returning"
+    assert len(statements) == 1
+    assert "RETURNING" in statements[0]
+
+
+def test_upsert_without_unique_index_falls_back(make_client, tmp_path, caplog, login, count_accounts):
+    client = make_client(LINKS_UPSERT=True)
+    engine = sa.create_engine("sqlite:///%s" % (tmp_path / "legacy.db"))
+    legacy = sa.Table(client.sql_table.name, sa.MetaData(), *[c._copy() for c in client.sql_table.columns])
+    legacy.create(engine)
+    Base.bind_engine(engine, create=False)
+    with caplog.at_level(logging.WARNING, logger="oauth2link.models"):
+        login(client, "legacy")
+        login(client, "legacy")
+    assert count_accounts(client) == 1
+    assert "唯一索引" in caplog.text
+    engine.dispose()
@@ -0,0 +1,85 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import urllib.parse
+
+import pytest
+
+from oauth2link import utils
+from oauth2link.platform import GitHubOauth2, WeiBoOauth2
+
+REDIRECT_URI = "https://example.com/weibo/callback?next=/a b&x=1"
+
+
+def query(url):
+    return urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+
+
+@pytest.fixture
+def weibo():
+    client = WeiBoOauth2()
+    client.configure({
+        "LINKS_WEIBO_CLIENT_ID": "id&1",
+        "LINKS_WEIBO_CLIENT_SECRET": "s+e/c",
+        "LINKS_WEIBO_REDIRECT_URI": REDIRECT_URI,
+        "LINKS_WEIBO_SCOPE": "all email",
+    })
+    return client
+
+
+def test_authorize_url_encodes_params(weibo):
+    url = weibo.redirect_url()
+    assert " " not in url
+    assert query(url) == {"client_id": ["id&1"], "response_type": ["code"],
+                          "redirect_uri": [REDIRECT_URI], "scope": ["all email"]}
+
+
+def test_token_url_encodes_code(weibo):
+    _, url, _ = weibo._access_token_request("a&b=c d")
+    params = query(url)
+    assert params["code"] == ["a&b=c d"]
+    assert params["client_secret"] == ["s+e/c"]
+    assert params["redirect_uri"] == [REDIRECT_URI]
+
+
+def test_state_appended_to_precompiled_url():
+    client = GitHubOauth2()
+    client.configure({"LINKS_GITHUB_CLIENT_ID": "id", "LINKS_GITHUB_CLIENT_SECRET": "secret",
+                      "LINKS_GITHUB_REDIRECT_URI": "/github/callback", "LINKS_STATE_SECRET": "secret"})
+    url = client.redirect_url("/home?a=1", "browser-id-0000000")
+    assert url.startswith(client.authorize_url + "&")
+    payload = client.state_signer.loads(query(url)["state"][0], audience=client.state_audience,
+                                        browser_id="browser-id-0000000")
+    assert payload["r"] == "/home?a=1"
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("/home", "/home"),
+    ("/a?b=c", "/a?b=c"),
+    ("//evil.com", None),
+    ("https://evil.com", None),
+    ("/\\evil.com", None),
+    (None, None),
+])
+def test_safe_return_url(url, expected):
+    assert utils.safe_return_url(url) == expected
@@ -0,0 +1,100 @@
+"""
+MIT License
+
+Copyright (c) 2023 Bean-jun
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+
+from oauth2link.writer import WriteBehindWriter
+
+
+def test_poison_row_is_dropped_and_flush_drains():
+    written, dead = [], []
+
+    def flush(rows):
+        if any(row["bad"] for row in rows):
+            raise ValueError("constraint")
+        written.extend(rows)
+
+    writer = WriteBehindWriter(flush, batch_size=10, interval=0.001, max_retries=3, dead_letter=dead.extend)
+    try:
+        for i in range(25):
+            writer.put(i, {"i": i, "bad": i == 7})
+        assert writer.flush(5)
+        assert sorted(row["i"] for row in written) == [i for i in range(25) if i != 7]
+        assert [row["i"] for row in dead] == [7]
+        assert writer.dropped == 1
+    finally:
+        writer.close()
+
+
+def test_transient_failure_is_retried():
+    written = []
+    failures = [2]
+
+    def flush(rows):
+        if failures[0]:
+            failures[0] -= 1
+            raise OSError("database unavailable")
+        written.extend(rows)
+
+    writer = WriteBehindWriter(flush, batch_size=5, interval=0.001, max_retries=5)
+    try:
+        for i in range(5):
+            writer.put(i, {"i": i})
+        assert writer.flush(5)
+        assert sorted(row["i"] for row in written) == list(range(5))
+        assert writer.dropped == 0
+    finally:
+        writer.close()
+
+
+def test_duplicate_keys_are_merged():
+    written = []
+    writer = WriteBehindWriter(written.extend, batch_size=100, interval=0.05)
+    try:
+        for i in range(10):
+            writer.put("same", {"i": i})
+        assert writer.flush(5)
+        assert written[-1] == {"i": 9}
+        assert len(written) <= 10
+    finally:
+        writer.close()
+
+
+def test_concurrent_get_writer_creates_one_writer(make_client):
+    client = make_client(LINKS_WRITE_BEHIND=True)
+    writers = []
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        writers.append(client.get_writer())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len({id(writer) for writer in writers}) == 1
+    finally:
+        client.close_writer()